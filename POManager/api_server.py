@@ -0,0 +1,475 @@
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from POManager.cli import add_db_arguments, db_handler_from_args
+from POManager.connection_pool import ConnectionPool
+from POManager.purchase_order import PurchaseOrder
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def plain(value):
+    """json.dumps default for the date and Decimal values the database returns."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return None  # Blobs are never sent inline
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(document):
+    return json.dumps(document, default=plain, separators=(",", ":")).encode()
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(header, etag):
+    """True if an If-None-Match header lists `etag`; weak validators compare equal for GET."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def purchase_order_document(purchase_order, statuses):
+    return {
+        "id": purchase_order.id,
+        "po_number": purchase_order.po_number,
+        "order_date": purchase_order.added_date,
+        "total_qty": purchase_order.total_qty,
+        "total_amount": purchase_order.total_amount,
+        "archived": purchase_order.archived,
+        "items": [
+            {
+                "id": item.id,
+                "cart_part_no": item.cart_part_no,
+                "nomenclature": item.nomenclature,
+                "country_of_origin": item.country_of_origin,
+                "a_unit": item.a_unit,
+                "qty": item.qty,
+                "rate_include_gst": item.rate_include_gst,
+                "status": {
+                    key: value for key, value in statuses.get(item.id, {}).items() if key not in ("id", "item_id")
+                } or None
+            }
+            for item in purchase_order.items
+        ]
+    }
+
+
+class ResponseCache:
+    """LRU cache of encoded GET responses with their ETags.
+
+    Entries expire after `ttl` seconds, which bounds how stale data changed without a change
+    log entry (delivery postings, reconciliation) can get. PO detail entries are keyed by
+    PO number so a change to one PO only drops its own entry; listing and search entries
+    depend on many POs and are dropped on any change.
+
+    Every invalidation bumps `generation`. A response loaded before an invalidation is not
+    stored, so a read that raced a write cannot put the old body back after it was dropped.
+    """
+
+    def __init__(self, max_entries=1000, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (kind, key) -> (expires, etag, body)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, etag, body, generation=None):
+        """Store a response; pass the `generation` read before loading it to skip it if it is stale."""
+        if not self.max_entries:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, po_numbers):
+        """Drop the detail entries of these POs and every listing and search entry."""
+        with self.lock:
+            self.generation += 1
+            for key in list(self.entries):
+                if key[0] != "po" or key[1] in po_numbers:
+                    del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+class ChangeWatcher(threading.Thread):
+    """Polls the change log on its own connection and invalidates the cached POs that changed."""
+
+    def __init__(self, db_handler, cache, interval=2.0):
+        super().__init__(name="api-change-watcher", daemon=True)
+        self.db_handler = db_handler
+        self.cache = cache
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.token = db_handler.get_change_token(target="primary")
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling for changes: {e}", file=sys.stderr)
+
+    def poll(self):
+        while True:
+            changes = self.db_handler.get_changes_since(self.token, target="primary")
+            po_numbers = {row["po_number"] for row in changes["inserted"] + changes["updated"] + changes["deleted"]}
+            if po_numbers:
+                self.cache.invalidate(po_numbers)
+            self.token = changes["token"]
+            if not changes["has_more"]:
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+
+class APIServer(ThreadingHTTPServer):
+    """HTTP server whose handler threads share a ConnectionPool and a ResponseCache."""
+
+    daemon_threads = True
+
+    def __init__(self, address, db_handler, pool_size=8, cache_size=1000, cache_ttl=30.0, poll_interval=2.0,
+                 max_upload=50 * 1024 * 1024, pool_timeout=10.0, quiet=False):
+        super().__init__(address, APIRequestHandler)
+        self.pool = ConnectionPool(db_handler, pool_size)
+        self.pool_timeout = pool_timeout
+        self.cache = ResponseCache(cache_size, cache_ttl)
+        self.max_upload = max_upload
+        self.quiet = quiet
+        self.watcher = None
+        if poll_interval:
+            self.watcher = ChangeWatcher(db_handler.clone(), self.cache, poll_interval)
+            self.watcher.start()
+
+    def server_close(self):
+        super().server_close()
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher.join(5)
+            self.watcher.db_handler.close_connection()
+        self.pool.close()
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over DBHandler.
+
+    GET  /purchase-orders?page_size=&token=&sort=&desc=&date_from=&date_to=&po_prefix=
+    GET  /purchase-orders/<po_number>
+    GET  /search?q=&limit=
+    GET  /ocr-jobs/<id>
+    POST /deliveries                        JSON {item_id, challan_no, delivery_date, delivered_qty, ...}
+    POST /purchase-orders/<po_number>/scans the image bytes; ?name= sets the file name
+    POST /ocr-jobs/<id>/apply               adds the items of a finished scan job to its PO
+
+    Writes drop the cache entries of the PO they change. The pooled connections share the
+    write clock of the server's DBHandler, so the reads that follow a write go to the primary
+    for its read-your-writes window rather than to a replica that may not have the write yet.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients are not paying a TCP handshake per request
+    server_version = "POManagerAPI/1.0"
+    disable_nagle_algorithm = True  # Headers and body are separate writes; don't hold the body for an ACK
+
+    ROUTES = [
+        ("GET", re.compile(r"/purchase-orders"), "list_purchase_orders"),
+        ("GET", re.compile(r"/purchase-orders/([^/]+)"), "get_purchase_order"),
+        ("GET", re.compile(r"/search"), "search"),
+        ("GET", re.compile(r"/ocr-jobs/(\d+)"), "get_ocr_job"),
+        ("POST", re.compile(r"/deliveries"), "post_delivery"),
+        ("POST", re.compile(r"/purchase-orders/([^/]+)/scans"), "post_scan"),
+        ("POST", re.compile(r"/ocr-jobs/(\d+)/apply"), "apply_ocr_job"),
+    ]
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            allowed = False
+            for route_method, pattern, name in self.ROUTES:
+                match = pattern.fullmatch(url.path.rstrip("/") or "/")
+                if match is None:
+                    continue
+                if route_method != method:
+                    allowed = True
+                    continue
+                getattr(self, name)(*(unquote(group) for group in match.groups()))
+                return
+            raise HTTPError(405, "Method not allowed.") if allowed else HTTPError(404, "Not found.")
+        except HTTPError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        except (TimeoutError, ConnectionError) as e:
+            self.send_json(503, {"error": str(e)})
+        except Exception as e:
+            print(f"Error handling {method} {self.path}: {e}", file=sys.stderr)
+            self.send_json(500, {"error": "Internal server error."})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def pooled_connection(self):
+        return self.server.pool.connection(self.server.pool_timeout)
+
+    def send_body(self, status, body, etag=None, content_type="application/json"):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Clients may keep it but must revalidate
+        if body is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def send_json(self, status, document):
+        self.send_body(status, encode(document))
+
+    def send_cached(self, key, load):
+        """Answer a GET from the cache or from load(db_handler), honouring If-None-Match."""
+        entry = self.server.cache.get(key)
+        if entry is None:
+            generation = self.server.cache.generation
+            with self.pooled_connection() as db_handler:
+                document = load(db_handler)
+            body = encode(document)
+            etag = make_etag(body)
+            self.server.cache.put(key, etag, body, generation)
+        else:
+            etag, body = entry
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_body(304, None, etag)
+        else:
+            self.send_body(200, body, etag)
+
+    def int_param(self, name, default, maximum):
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise ValueError(f"{name} must be a number.")
+        if not 1 <= value <= maximum:
+            raise ValueError(f"{name} must be between 1 and {maximum}.")
+        return value
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.server.max_upload:
+            self.close_connection = True  # The rest of the upload is not read
+            raise HTTPError(413, "Request body is too large.")
+        return self.rfile.read(length)
+
+    def list_purchase_orders(self):
+        page_size = self.int_param("page_size", 100, 1000)
+        key = ("list", self.path)
+
+        def load(db_handler):
+            rows, next_token = db_handler.get_purchase_orders_page(
+                page_size, self.query.get("token"), self.query.get("sort", "order_date"),
+                self.query.get("desc") in ("1", "true"), self.query.get("date_from"), self.query.get("date_to"),
+                po_prefix=self.query.get("po_prefix")
+            )
+            return {"purchase_orders": rows, "next_token": next_token}
+
+        self.send_cached(key, load)
+
+    def get_purchase_order(self, po_number):
+        def load(db_handler):
+            purchase_order = db_handler.get_purchase_order_by_po_number(po_number)
+            if purchase_order is None:
+                raise HTTPError(404, f"Purchase order {po_number} not found.")
+            statuses = {} if purchase_order.archived else db_handler.get_item_statuses(purchase_order.id)
+            return purchase_order_document(purchase_order, statuses)
+
+        self.send_cached(("po", po_number), load)
+
+    def search(self):
+        term = self.query.get("q", "").strip()
+        if not term:
+            raise ValueError("q is required.")
+        limit = self.int_param("limit", 50, 500)
+        self.send_cached(("search", term, limit), lambda db_handler: {
+            "purchase_orders": db_handler.search_purchase_orders(term, limit)
+        })
+
+    def get_ocr_job(self, job_id):
+        # Not cached: a client polls this until the job finishes
+        with self.pooled_connection() as db_handler:
+            jobs = db_handler.get_ocr_jobs([int(job_id)])
+        if not jobs:
+            raise HTTPError(404, f"OCR job {job_id} not found.")
+        job = jobs[0]
+        items_json = job.pop("items_json")
+        job["items"] = json.loads(items_json) if items_json else None
+        self.send_json(200, job)
+
+    def post_delivery(self):
+        try:
+            delivery = json.loads(self.read_body() or b"null")
+        except ValueError:
+            raise ValueError("Body must be JSON.")
+        if not isinstance(delivery, dict):
+            raise ValueError("Body must be a JSON object.")
+        missing = [field for field in ("item_id", "challan_no", "delivery_date", "delivered_qty") if field not in delivery]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        delivery_date = date.fromisoformat(str(delivery["delivery_date"]))
+
+        with self.pooled_connection() as db_handler:
+            row = db_handler.fetch_one_query(
+                "SELECT PurchaseOrder.po_number FROM Item JOIN PurchaseOrder ON PurchaseOrder.id = Item.purchase_order_id "
+                "WHERE Item.id = %s", (delivery["item_id"],)
+            )
+            if row is None:
+                raise HTTPError(404, f"Item {delivery['item_id']} not found.")
+            delivery_id = db_handler.insert_delivery_tracking(
+                delivery["item_id"], delivery["challan_no"], delivery_date, delivery["delivered_qty"],
+                delivery.get("rejected_qty", 0), delivery.get("approved_qty", 0)
+            )
+        # Deliveries are not in the change log, so this server drops the PO itself
+        self.server.cache.invalidate({row["po_number"]})
+        self.send_json(201, {"id": delivery_id, "po_number": row["po_number"]})
+
+    def post_scan(self, po_number):
+        image = self.read_body()
+        if not image:
+            raise ValueError("Body must hold the scan image.")
+        with self.pooled_connection() as db_handler:
+            if db_handler.get_purchase_order_by_po_number(po_number, target="primary") is None:
+                raise HTTPError(404, f"Purchase order {po_number} not found.")
+            job_id = db_handler.enqueue_ocr_image(
+                po_number, self.query.get("name") or f"{po_number}.png", image, requested_by="api"
+            )
+        self.send_json(202, {"job_id": job_id, "status": "queued"})
+
+    def apply_ocr_job(self, job_id):
+        """Add the items of a finished scan job to its PO and collect the job.
+
+        Items whose part number the PO already has are skipped, so applying the scan of a PO
+        that was entered by hand does not double its items. `review` lists the added items
+        whose part number the part catalog corrected or could not match.
+        """
+        with self.pooled_connection() as db_handler:
+            jobs = db_handler.get_ocr_jobs([int(job_id)])
+            if not jobs:
+                raise HTTPError(404, f"OCR job {job_id} not found.")
+            job = jobs[0]
+            if job["status"] != "done":
+                raise HTTPError(409, f"OCR job {job_id} is {job['status']}, not done.")
+            purchase_order = db_handler.get_purchase_order_by_po_number(job["po_number"], target="primary")
+            if purchase_order is None:
+                raise HTTPError(404, f"Purchase order {job['po_number']} not found.")
+            if purchase_order.archived:
+                raise HTTPError(409, f"Purchase order {job['po_number']} is archived.")
+
+            known = {item.cart_part_no for item in purchase_order.items}
+            items = db_handler.ocr_job_items(job)
+            new_items = [item for item in items if item.cart_part_no not in known]
+            if not db_handler.collect_ocr_job(job["id"]):
+                raise HTTPError(409, f"OCR job {job_id} was already applied.")
+            addition = PurchaseOrder(purchase_order.po_number)
+            addition.id = purchase_order.id
+            addition.items = new_items
+            db_handler.add_purchase_order_items(addition)  # Commits the collection with the items
+
+            for item in new_items:
+                if item.qty and item.rate_include_gst:
+                    purchase_order.total_qty = (purchase_order.total_qty or 0) + int(item.qty)
+                    purchase_order.total_amount = float(purchase_order.total_amount or 0) + \
+                        int(item.qty) * float(item.rate_include_gst)
+            db_handler.update_purchase_order(purchase_order)
+        self.server.cache.invalidate({purchase_order.po_number})
+        review = [{"cart_part_no": item.cart_part_no, "part_status": item.part_status,
+                   "ocr_cart_part_no": item.ocr_cart_part_no} for item in new_items if item.needs_review()]
+        self.send_json(200, {"po_number": purchase_order.po_number, "added": len(new_items),
+                             "skipped": len(items) - len(new_items), "review": review})
+
+
+def main(argv=None):
+    """Serve the PO data over HTTP, e.g. `python -m POManager.api_server --port 8765`.
+
+    OCR uploads are only queued; run POManager.ocr_worker to process them, then
+    POST /ocr-jobs/<id>/apply to add the extracted items to the PO.
+    """
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API over the purchase order database")
+    parser.add_argument("--bind", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=8, help="Database connections shared by the request threads")
+    parser.add_argument("--cache-size", type=int, default=1000, help="Cached responses; 0 disables the cache")
+    parser.add_argument("--cache-ttl", type=float, default=30.0, help="Seconds a cached response is served")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between change log polls that invalidate the cache; 0 disables polling")
+    parser.add_argument("--max-upload-mb", type=float, default=50.0, help="Largest accepted scan upload")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        sys.exit(1)
+    server = APIServer(
+        (args.bind, args.port), db_handler, args.pool_size, args.cache_size, args.cache_ttl, args.poll_interval,
+        int(args.max_upload_mb * 1024 * 1024), quiet=args.quiet
+    )
+    print(f"Serving on http://{args.bind}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db_handler.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+from POManager.cli import add_db_arguments, db_handler_from_args
+
+
+def archive_before(db_handler, cutoff, batch_size=50, pause=0.1, limit=None):
+    """Move every fully delivered PO ordered before `cutoff` to the archive tables, `batch_size` POs at a time.
+
+    Each batch is its own short transaction and the loop sleeps `pause` seconds between
+    batches, so the app and the OCR workers keep getting the write lock. Returns the number of
+    POs archived; a failed batch is rolled back and its error raised, earlier batches stay archived.
+    """
+    archived = 0
+    after_id = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids = db_handler.get_archivable_purchase_order_ids(cutoff, after_id, size)
+        if not ids:
+            break
+        archived += db_handler.archive_purchase_orders(ids)
+        after_id = ids[-1]
+        print(f"Archived {archived} purchase orders (up to id {after_id})")
+        time.sleep(pause)
+    return archived
+
+
+def main(argv=None):
+    """Archive old, fully delivered POs, e.g. `python -m POManager.archive --older-than-days 730`.
+
+    Archived POs disappear from the PO list but are still found by PO number, and they keep
+    counting in the reports.
+    """
+    parser = argparse.ArgumentParser(description="Move fully delivered historical POs to the archive tables")
+    cutoff = parser.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", type=date.fromisoformat, help="Archive POs ordered before this date (YYYY-MM-DD)")
+    cutoff.add_argument("--older-than-days", type=int, help="Archive POs ordered more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=50, help="POs moved per transaction")
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to wait between batches")
+    parser.add_argument("--limit", type=int, help="Stop after archiving this many POs")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        sys.exit(1)
+    before = args.before or date.today() - timedelta(days=args.older_than_days)
+    started = time.perf_counter()
+    try:
+        archived = archive_before(db_handler, before, args.batch_size, args.pause, args.limit)
+    except db_handler.backend.Error as e:
+        print(f"Archiving failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db_handler.close_connection()
+    print(f"Archived {archived} purchase orders ordered before {before} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
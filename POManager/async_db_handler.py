@@ -0,0 +1,168 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from POManager.connection_pool import ConnectionPool
+from POManager.purchase_order import PurchaseOrder
+
+
+def extract_scan_items(image_path, po_number, low_memory=False):
+    """Run OCR on one scan and return its Items; module level so it can run in a worker process."""
+    from POManager.image_processor import ImageProcessor
+    return ImageProcessor(image_path, low_memory=low_memory).process_and_extract_items(po_number)
+
+
+def save_purchase_order_with_items(db_handler, purchase_order):
+    """Insert a PO and its items in one transaction and return the new PO id; nothing is kept if either fails."""
+    try:
+        purchase_order.id = db_handler.add_purchase_order(purchase_order, commit=False)
+        if purchase_order.items:
+            db_handler.add_purchase_order_items(purchase_order, commit=False)
+        db_handler.connection.commit()
+    except Exception as e:
+        db_handler.connection.rollback()
+        purchase_order.id = 0
+        raise e
+    return purchase_order.id
+
+
+class AsyncDBHandler:
+    """asyncio front end to DBHandler for headless jobs such as batch imports and exports.
+
+    Every call runs the blocking DBHandler method on a worker thread with a connection from a
+    ConnectionPool, so up to `pool_size` queries overlap. `max_concurrency` caps how many PO
+    imports are in flight at once (OCR included); OCR runs in a process pool so it does not
+    hold the GIL while the database calls proceed. With `low_memory` the OCR processes use
+    ImageProcessor's low-memory mode, so `ocr_workers` caps the memory OCR takes.
+    """
+
+    def __init__(self, db_handler, pool_size=4, max_concurrency=16, ocr_workers=None, low_memory=False):
+        self.pool = ConnectionPool(db_handler, pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="async-db")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.ocr_workers = ocr_workers or os.cpu_count()
+        self.low_memory = low_memory
+        self.ocr_executor = None  # Started on the first OCR job
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(db_handler, *args, **kwargs) on a pooled connection without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self._run_pooled, func, args, kwargs))
+
+    def _run_pooled(self, func, args, kwargs):
+        with self.pool.connection() as db_handler:
+            return func(db_handler, *args, **kwargs)
+
+    async def call(self, method, *args, **kwargs):
+        """Run the DBHandler method called `method` on a pooled connection."""
+        return await self.run(lambda db_handler: getattr(db_handler, method)(*args, **kwargs))
+
+    async def add_purchase_order(self, purchase_order):
+        return await self.call("add_purchase_order", purchase_order)
+
+    async def add_purchase_order_items(self, purchase_order):
+        return await self.call("add_purchase_order_items", purchase_order)
+
+    async def update_purchase_order(self, purchase_order):
+        return await self.call("update_purchase_order", purchase_order)
+
+    async def update_purchase_order_items(self, purchase_order, items=None):
+        return await self.call("update_purchase_order_items", purchase_order, items)
+
+    async def delete_purchase_order(self, po_number):
+        return await self.call("delete_purchase_order", po_number)
+
+    async def delete_purchase_orders(self, po_numbers):
+        return await self.call("delete_purchase_orders", po_numbers)
+
+    async def update_purchase_order_dates(self, po_numbers, order_date):
+        return await self.call("update_purchase_order_dates", po_numbers, order_date)
+
+    async def purchase_order_exists(self, po_number):
+        return await self.call("purchase_order_exists", po_number)
+
+    async def get_purchase_order_by_po_number(self, po_number):
+        return await self.call("get_purchase_order_by_po_number", po_number)
+
+    async def get_items_by_purchase_order_id(self, purchase_order_id):
+        return await self.call("get_items_by_purchase_order_id", purchase_order_id)
+
+    async def get_changes_since(self, token, limit=1000):
+        return await self.call("get_changes_since", token, limit)
+
+    async def save_purchase_order(self, purchase_order):
+        """Insert a PO together with its items; returns the new PO id."""
+        async with self.semaphore:
+            return await self.run(save_purchase_order_with_items, purchase_order)
+
+    async def save_purchase_orders(self, purchase_orders):
+        """Insert many POs with their items concurrently; returns their ids in the same order."""
+        return await asyncio.gather(*(self.save_purchase_order(po) for po in purchase_orders))
+
+    async def iter_purchase_orders(self, page_size=500, **filters):
+        """Yield PurchaseOrder rows page by page; the next page is fetched while the current one is consumed."""
+        async for row in self._iter_pages("get_purchase_orders_page", page_size=page_size, **filters):
+            yield row
+
+    async def iter_items(self, purchase_order_id=None, page_size=1000):
+        """Yield Item rows in id order, optionally for one purchase order."""
+        async for row in self._iter_pages("get_items_page", purchase_order_id=purchase_order_id, page_size=page_size):
+            yield row
+
+    async def _iter_pages(self, method, **kwargs):
+        pending = asyncio.ensure_future(self.call(method, token=None, **kwargs))
+        try:
+            while pending is not None:
+                rows, token = await pending
+                pending = asyncio.ensure_future(self.call(method, token=token, **kwargs)) if token else None
+                for row in rows:
+                    yield row
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def extract_items(self, image_path, po_number):
+        """Run OCR on a scan in the process pool and return the extracted Items."""
+        if self.ocr_executor is None:
+            self.ocr_executor = ProcessPoolExecutor(max_workers=self.ocr_workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.ocr_executor, extract_scan_items, image_path, po_number,
+                                          self.low_memory)
+
+    async def import_scan(self, image_path, po_number=None):
+        """OCR a scanned PO and save it with its items, like the Add Purchase Order dialog.
+
+        `po_number` defaults to the file name without extension. Returns the saved
+        PurchaseOrder; raises ValueError for a duplicate PO or a scan without items.
+        """
+        po_number = po_number or os.path.splitext(os.path.basename(image_path))[0]
+        async with self.semaphore:
+            if await self.purchase_order_exists(po_number):
+                raise ValueError(f"Purchase Order {po_number} already exists.")
+
+            items = await self.extract_items(image_path, po_number)
+            if not items:
+                raise ValueError(f"No items were extracted from {image_path}.")
+
+            purchase_order = PurchaseOrder(po_number)
+            for item in items:
+                purchase_order.add_item(item)
+                if item.qty and item.rate_include_gst:
+                    purchase_order.total_qty += item.qty
+                    purchase_order.total_amount += item.qty * item.rate_include_gst
+
+            await self.run(save_purchase_order_with_items, purchase_order)
+            return purchase_order
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.ocr_executor is not None:
+            self.ocr_executor.shutdown(wait=True)
+        self.pool.close()
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from POManager.async_db_handler import AsyncDBHandler
+from POManager.cli import add_db_arguments, db_handler_from_args
+
+
+async def import_scans(async_db, image_paths):
+    """Import every scan concurrently; returns (imported POs, {path: error message})."""
+    imported = []
+    failed = {}
+
+    async def import_one(image_path):
+        try:
+            purchase_order = await async_db.import_scan(image_path)
+            imported.append(purchase_order)
+            print(f"{image_path}: PO {purchase_order.po_number} with {len(purchase_order.items)} items")
+        except Exception as e:
+            failed[image_path] = str(e)
+            print(f"{image_path}: {e}", file=sys.stderr)
+
+    await asyncio.gather(*(import_one(image_path) for image_path in image_paths))
+    return imported, failed
+
+
+def main(argv=None):
+    """Import scanned POs without the GUI, e.g. `python -m POManager.batch_import scans/*.png --concurrency 8`.
+
+    The PO number of each scan is taken from its file name.
+    """
+    parser = argparse.ArgumentParser(description="Headless batch import of scanned purchase orders")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--concurrency", type=int, default=16, help="Imports in flight at once")
+    parser.add_argument("--pool-size", type=int, default=4, help="Database connections")
+    parser.add_argument("--ocr-workers", type=int, help="OCR processes (default: one per CPU)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Decode scans to reduced grayscale and OCR them in tiles, for very large scans")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        sys.exit(1)
+
+    async def run():
+        async with AsyncDBHandler(db_handler, pool_size=args.pool_size, max_concurrency=args.concurrency,
+                                  ocr_workers=args.ocr_workers, low_memory=args.low_memory) as async_db:
+            return await import_scans(async_db, args.images)
+
+    started = time.perf_counter()
+    imported, failed = asyncio.run(run())
+    db_handler.close_connection()
+    print(f"Imported {len(imported)} of {len(args.images)} scans in {time.perf_counter() - started:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from POManager.db_handler import DBHandler
+from POManager.storage_backends import create_backend
+
+
+def add_db_arguments(parser, database="purchase_order_app", sqlite_path="purchase_order_app.sqlite3"):
+    """Add the database connection options shared by the command line tools."""
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql", help="Storage backend")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default=database, help="MySQL database name")
+    parser.add_argument("--sqlite-path", default=sqlite_path, help="Database file for the sqlite backend")
+    parser.add_argument("--replica-host", help="Read replica host that serves the read-only queries (mysql backend)")
+    parser.add_argument("--replica-port", type=int, help="Port of the read replica, e.g. a second local instance")
+    parser.add_argument("--replica-sqlite-path", help="Read replica database file (sqlite backend)")
+
+
+def db_handler_from_args(args, backend=None, **kwargs):
+    """Open a DBHandler for options added by add_db_arguments; `backend` overrides --backend."""
+    name = backend or args.backend
+    backend = create_backend(
+        name, host=args.host, user=args.user, password=args.password, database=args.database, path=args.sqlite_path
+    )
+    replica_backend = None
+    if name == "mysql" and args.replica_host:
+        replica_backend = create_backend(
+            name, host=args.replica_host, port=args.replica_port, user=args.user, password=args.password,
+            database=args.database
+        )
+    elif name == "sqlite" and args.replica_sqlite_path:
+        replica_backend = create_backend(name, path=args.replica_sqlite_path)
+    return DBHandler(backend=backend, replica_backend=replica_backend, **kwargs)
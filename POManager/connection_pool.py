@@ -0,0 +1,77 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """A bounded set of DBHandler connections shared by worker threads.
+
+    Connections are clones of `db_handler`, opened on first use up to `size`. A connection is
+    used by one thread at a time and is rolled back when returned, so the next user starts
+    with a fresh snapshot and no half-finished transaction.
+    """
+
+    def __init__(self, db_handler, size=4):
+        self.db_handler = db_handler
+        self.size = size
+        self.idle = queue.LifoQueue()  # Most recently used first; its connection is least likely to have timed out
+        self.created = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    @contextmanager
+    def connection(self, timeout=None):
+        db_handler = self.acquire(timeout)
+        try:
+            yield db_handler
+        finally:
+            self.release(db_handler)
+
+    def acquire(self, timeout=None):
+        """Take an idle connection, open a new one if the pool is not full, or wait for one."""
+        if self.closed:
+            raise RuntimeError("Connection pool is closed.")
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            db_handler = self.db_handler.clone()
+            if db_handler.connection is None:
+                with self.lock:
+                    self.created -= 1
+                raise ConnectionError("Could not open a database connection.")
+            return db_handler
+
+        try:
+            return self.idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No database connection became available.")
+
+    def release(self, db_handler):
+        if self.closed:
+            db_handler.close_connection()
+            return
+        try:
+            db_handler.connection.rollback()
+        except Exception as e:
+            # Broken connection; drop it so the next acquire opens a new one
+            print(f"Discarding pooled connection: {e}")
+            with self.lock:
+                self.created -= 1
+            return
+        self.idle.put(db_handler)
+
+    def close(self):
+        """Close the idle connections; connections still in use are closed when released."""
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close_connection()
+            except queue.Empty:
+                break
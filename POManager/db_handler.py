@@ -1,54 +1,462 @@
-import mysql.connector
-from mysql.connector import Error
+import base64
+import functools
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from POManager.purchase_order import PurchaseOrder
 from POManager.item import Item
+from POManager.storage_backends import MySQLBackend
+
+# Schema changes made after the initial tables, as (version, statements). Append a new entry
+# for every change; databases behind the last version get the missing statements on connect.
+SCHEMA_MIGRATIONS = [
+    (1, []),
+    (2, [
+        # Keyset pagination over (order_date, id) and PO number lookups
+        "CREATE INDEX idx_purchase_order_date ON PurchaseOrder (order_date, id)",
+        "CREATE INDEX idx_purchase_order_number ON PurchaseOrder (po_number)",
+    ]),
+    (3, [
+        # Change log read by get_changes_since so clients can refresh incrementally
+        """
+        CREATE TABLE IF NOT EXISTS ChangeLog (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(64) NOT NULL,
+            row_id INT NOT NULL,
+            purchase_order_id INT NOT NULL,
+            po_number VARCHAR(255),
+            operation VARCHAR(10) NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_change_log_changed_at ON ChangeLog (changed_at)",
+    ]),
+    (4, [
+        # Durable OCR job queue worked by POManager.ocr_worker processes
+        """
+        CREATE TABLE IF NOT EXISTS OcrJob (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            po_number VARCHAR(255) NOT NULL,
+            image_name VARCHAR(255),
+            image LONGBLOB NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'queued',
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 3,
+            requested_by VARCHAR(255),
+            worker VARCHAR(255),
+            available_at DATETIME,
+            lease_expires_at DATETIME,
+            started_at DATETIME,
+            finished_at DATETIME,
+            items_json LONGTEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_ocr_job_status ON OcrJob (status, id)",
+    ]),
+    (5, [
+        # Perceptual hashes of processed scans, searched by POManager.image_hash.ImageHashIndex
+        """
+        CREATE TABLE IF NOT EXISTS ImageHash (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            phash CHAR(16) NOT NULL,
+            po_number VARCHAR(255),
+            image_name VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_image_hash_po_number ON ImageHash (po_number)",
+    ]),
+    (6, [
+        # Daily spend and delivery rollups kept current by adjust_report_rollup, read by POManager.reporting
+        """
+        CREATE TABLE IF NOT EXISTS ReportRollup (
+            day DATE NOT NULL,
+            country_of_origin VARCHAR(100) NOT NULL,
+            a_unit VARCHAR(100) NOT NULL,
+            item_count INT NOT NULL DEFAULT 0,
+            total_qty BIGINT NOT NULL DEFAULT 0,
+            spend DECIMAL(16, 2) NOT NULL DEFAULT 0,
+            delivered_qty BIGINT NOT NULL DEFAULT 0,
+            approved_qty BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, country_of_origin, a_unit)
+        )
+        """,
+        # The rollup sums the deliveries of each item it adds or removes
+        "CREATE INDEX idx_delivery_tracking_item ON DeliveryTracking (item_id)",
+        lambda db_handler: db_handler.rebuild_report_rollup(),
+    ]),
+    (7, [
+        # Fully delivered POs moved out of the hot tables by archive_purchase_orders; ids are kept
+        """
+        CREATE TABLE IF NOT EXISTS PurchaseOrderArchive (
+            id INT PRIMARY KEY,
+            po_number VARCHAR(255) NOT NULL,
+            order_date DATE,
+            total_qty INT,
+            total_amount DECIMAL(10, 2),
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_purchase_order_archive_number ON PurchaseOrderArchive (po_number)",
+        """
+        CREATE TABLE IF NOT EXISTS ItemArchive (
+            id INT PRIMARY KEY,
+            purchase_order_id INT,
+            cart_part_no VARCHAR(255),
+            country_of_origin VARCHAR(100),
+            a_unit VARCHAR(100),
+            qty INT,
+            rate_include_gst DECIMAL(10, 2),
+            nomenclature TEXT
+        )
+        """,
+        "CREATE INDEX idx_item_archive_purchase_order ON ItemArchive (purchase_order_id)",
+        """
+        CREATE TABLE IF NOT EXISTS DeliveryTrackingArchive (
+            id INT PRIMARY KEY,
+            item_id INT,
+            challan_no VARCHAR(255),
+            delivery_date DATE,
+            delivered_qty INT,
+            rejected_qty INT,
+            approved_qty INT
+        )
+        """,
+        "CREATE INDEX idx_delivery_tracking_archive_item ON DeliveryTrackingArchive (item_id)",
+        """
+        CREATE TABLE IF NOT EXISTS ItemStatusArchive (
+            id INT PRIMARY KEY,
+            item_id INT,
+            remaining_qty INT
+        )
+        """,
+    ]),
+    (8, [
+        # Original scans kept by POManager.document_store.DocumentStore, stored once per SHA-256
+        """
+        CREATE TABLE IF NOT EXISTS ScanBlob (
+            sha256 CHAR(64) PRIMARY KEY,
+            data LONGBLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ScanDocument (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            po_number VARCHAR(255) NOT NULL,
+            sha256 CHAR(64) NOT NULL,
+            image_name VARCHAR(255),
+            width INT,
+            height INT,
+            size_bytes INT,
+            thumbnail MEDIUMBLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_scan_document_po_number ON ScanDocument (po_number)",
+    ]),
+    (9, [
+        # Quantities and fulfilment state written by reconcile_purchase_orders (POManager.reconciliation)
+        "ALTER TABLE ItemStatus ADD COLUMN delivered_qty INT",
+        "ALTER TABLE ItemStatus ADD COLUMN approved_qty INT",
+        "ALTER TABLE ItemStatus ADD COLUMN rejected_qty INT",
+        "ALTER TABLE ItemStatus ADD COLUMN reconciled_at DATETIME",
+        "ALTER TABLE PurchaseOrder ADD COLUMN fulfilment_status VARCHAR(16)",
+        "ALTER TABLE PurchaseOrder ADD COLUMN reconciled_at DATETIME",
+        "CREATE INDEX idx_item_status_item ON ItemStatus (item_id)",
+        "CREATE INDEX idx_item_purchase_order ON Item (purchase_order_id)",
+    ]),
+    (10, [
+        # 256-bit hash of the item table, confirming page hash matches (POManager.image_hash.table_hash)
+        "ALTER TABLE ImageHash ADD COLUMN table_hash CHAR(64)",
+    ]),
+    (11, [
+        # The archive tables keep what reconcile_purchase_orders wrote (migration 9)
+        "ALTER TABLE ItemStatusArchive ADD COLUMN delivered_qty INT",
+        "ALTER TABLE ItemStatusArchive ADD COLUMN approved_qty INT",
+        "ALTER TABLE ItemStatusArchive ADD COLUMN rejected_qty INT",
+        "ALTER TABLE ItemStatusArchive ADD COLUMN reconciled_at DATETIME",
+        "ALTER TABLE PurchaseOrderArchive ADD COLUMN fulfilment_status VARCHAR(16)",
+        "ALTER TABLE PurchaseOrderArchive ADD COLUMN reconciled_at DATETIME",
+    ]),
+]
+
+# Hot table -> archive table and the columns archive_purchase_orders copies, children first
+ARCHIVE_TABLES = {
+    "DeliveryTracking": ("DeliveryTrackingArchive",
+                         "id, item_id, challan_no, delivery_date, delivered_qty, rejected_qty, approved_qty"),
+    "ItemStatus": ("ItemStatusArchive",
+                   "id, item_id, remaining_qty, delivered_qty, approved_qty, rejected_qty, reconciled_at"),
+    "Item": ("ItemArchive",
+             "id, purchase_order_id, cart_part_no, country_of_origin, a_unit, qty, rate_include_gst, nomenclature"),
+    "PurchaseOrder": ("PurchaseOrderArchive",
+                      "id, po_number, order_date, total_qty, total_amount, fulfilment_status, reconciled_at"),
+}
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Item attributes set by the part catalog check that OCR jobs keep with the extracted items
+OCR_ITEM_FIELDS = ("part_status", "ocr_cart_part_no")
+
+# Sort orders supported by get_purchase_orders_page; the id column makes every key unique
+PURCHASE_ORDER_SORT_KEYS = {
+    "id": ("id",),
+    "order_date": ("order_date", "id"),
+    "po_number": ("po_number", "id"),
+}
+
+# ChangeLog ids are handed out at INSERT time but become visible at COMMIT, so a poll can see
+# id 12 before id 11 commits. The ids skipped that way are carried in the change token and
+# read again on later polls until they show up or are this many seconds old (rolled back).
+CHANGE_LOG_GAP_TIMEOUT = 300
+CHANGE_LOG_MAX_GAPS = 500  # Oldest gaps are dropped beyond this, so the token stays small
+
+# Group-by columns and measures of the ReportRollup table
+REPORT_ROLLUP_KEYS = ("day", "country_of_origin", "a_unit")
+REPORT_ROLLUP_MEASURES = ("item_count", "total_qty", "spend", "delivered_qty", "approved_qty")
+
+# Hot queries run as prepared statements through fetch_rows; they return tuples for Item/PurchaseOrder.from_row
+STATEMENTS = {
+    "purchase_order_by_po_number":
+        f"SELECT {', '.join(PurchaseOrder.ROW_COLUMNS)} FROM PurchaseOrder WHERE po_number = %s",
+    "items_by_purchase_order_id":
+        f"SELECT {', '.join(Item.ROW_COLUMNS)} FROM Item WHERE purchase_order_id = %s",
+    "archived_purchase_order_by_po_number":
+        f"SELECT {', '.join(PurchaseOrder.ROW_COLUMNS)} FROM PurchaseOrderArchive WHERE po_number = %s",
+    "archived_items_by_purchase_order_id":
+        f"SELECT {', '.join(Item.ROW_COLUMNS)} FROM ItemArchive WHERE purchase_order_id = %s",
+}
+
+def parse_change_token(token):
+    """Split a change token into the last ChangeLog id read and {skipped id: time first skipped}."""
+    last_id, _, gap_text = (token or "0").partition(";")
+    gaps = {}
+    for gap in filter(None, gap_text.split(",")):
+        gap_id, _, seen = gap.partition(":")
+        gaps[int(gap_id)] = int(seen)
+    return int(last_id), gaps
+
+
+def format_change_token(last_id, gaps):
+    if not gaps:
+        return str(last_id)
+    return f"{last_id};" + ",".join(f"{gap_id}:{seen}" for gap_id, seen in sorted(gaps.items()))
+
+
+def read_only(method):
+    """Mark a DBHandler method as safe to serve from the read replica.
+
+    The method gains a `target` keyword: "primary", "replica", or None to let DBHandler.reader decide.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, target=None, **kwargs):
+        return method(self.reader(target), *args, **kwargs)
+    return wrapper
+
+class WriteClock:
+    """Time of the last write, shared by a DBHandler and its clones.
+
+    A save on one connection keeps the reads of every clone (prefetcher, loader, pooled
+    connections) on the primary for the read-your-writes window, not just its own.
+    """
+
+    def __init__(self):
+        self.last_write = float("-inf")
 
 class DBHandler:
-    def __init__(self, host, user, password, database):
+    def __init__(self, host=None, user=None, password=None, database=None, instrumentation=None, check_schema=True,
+                 backend=None, replica_backend=None, read_your_writes_window=5.0, target="primary", write_clock=None):
+        # Optional QueryInstrumentation; when None the query helpers skip all timing
+        self.instrumentation = instrumentation
+        # A StorageBackend from POManager.storage_backends; MySQL with the given settings by default
+        self.backend = backend or MySQLBackend(host, user, password, database)
+        self.statements = {}  # STATEMENTS name -> cursor holding it prepared on this connection
+        self.target = target  # Connection label reported to the instrumentation
+        # After a write, reads stay on the primary this many seconds so a save is never followed by stale data
+        self.read_your_writes_window = read_your_writes_window
+        self.write_clock = write_clock or WriteClock()
+        self.replica = None
+        if replica_backend is not None:
+            self.replica = DBHandler(backend=replica_backend, instrumentation=instrumentation, check_schema=False,
+                                     target="replica")
         try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database
-            )
+            self.connection = self.backend.connect()
             if self.connection.is_connected():
-                print("Connected to MySQL database")
-                self.create_tables_if_not_exists()
-        except Error as e:
+                print(f"Connected to {self.backend.describe()}")
+                # The DDL only runs when the stored schema version is behind SCHEMA_VERSION
+                if check_schema and not self.schema_is_current():
+                    self.create_tables_if_not_exists()
+        except self.backend.Error as e:
             print(f"Error: {e}")
+            if getattr(self, "connection", None) is not None:
+                self.connection.close()  # A failed migration; the next connect retries it
             self.connection = None
 
+    @property
+    def last_write(self):
+        return self.write_clock.last_write
+
+    @last_write.setter
+    def last_write(self, value):
+        self.write_clock.last_write = value
+
     def execute_query(self, query, params=None):
+        self.last_write = time.monotonic()
         cursor = self.connection.cursor()
+        started = time.perf_counter() if self.instrumentation else None
         try:
             cursor.execute(query, params)
             self.connection.commit()
-        except Error as e:
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, cursor.rowcount, target=self.target)
+        except self.backend.Error as e:
             print(f"Error: {e}")
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
+
+    def execute_many(self, query, params_list):
+        """Run one statement for a batch of parameter tuples without committing.
+
+        Unlike execute_query, errors are raised so the caller can roll the whole batch back.
+        """
+        if not params_list:
+            return
+        self.last_write = time.monotonic()
+        cursor = self.connection.cursor()
+        started = time.perf_counter() if self.instrumentation else None
+        try:
+            cursor.executemany(query, params_list)
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, cursor.rowcount, batch_size=len(params_list), target=self.target)
+        except self.backend.Error as e:
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
+            raise
+
+    def execute_statement(self, query, params=None):
+        """Run one statement inside the caller's transaction without committing; errors are raised.
+
+        Use this rather than execute_many for a single parameter set: mysql.connector rewrites
+        executemany INSERTs into a multi-row VALUES list, which fails for INSERT ... SELECT
+        statements that end in ON DUPLICATE KEY UPDATE ... VALUES(...).
+        """
+        self.last_write = time.monotonic()
+        cursor = self.connection.cursor()
+        started = time.perf_counter() if self.instrumentation else None
+        try:
+            cursor.execute(query, params)
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, cursor.rowcount, target=self.target)
+            return cursor.rowcount
+        except self.backend.Error as e:
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
+            raise
 
     def fetch_query(self, query, params=None):
         cursor = self.connection.cursor(dictionary=True)
+        started = time.perf_counter() if self.instrumentation else None
         try:
             cursor.execute(query, params)
-            return cursor.fetchall()
-        except Error as e:
+            result = cursor.fetchall()
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, len(result), target=self.target)
+            return result
+        except self.backend.Error as e:
             print(f"Error: {e}")
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
             return None
         
     def fetch_one_query(self, query, params=None):
         cursor = self.connection.cursor(dictionary=True)
+        started = time.perf_counter() if self.instrumentation else None
         try:
             cursor.execute(query, params)
-            return cursor.fetchone()
-        except Error as e:
+            result = cursor.fetchone()
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, 1 if result else 0, target=self.target)
+            return result
+        except self.backend.Error as e:
             print(f"Error: {e}")
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
             return None
 
+    def prepared_cursor(self, name):
+        cursor = self.statements.get(name)
+        if cursor is None:
+            cursor = self.statements[name] = self.backend.prepared_cursor(self.connection)
+        return cursor
+
+    def fetch_rows(self, name, params=()):
+        """Run the STATEMENTS query `name` on its prepared cursor and return the rows as tuples."""
+        query = STATEMENTS[name]
+        cursor = self.prepared_cursor(name)
+        started = time.perf_counter() if self.instrumentation else None
+        try:
+            cursor.execute(query, params)
+            result = cursor.fetchall()
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, len(result), target=self.target)
+            return result
+        except self.backend.Error as e:
+            print(f"Error: {e}")
+            self.statements.pop(name, None)  # Prepare it again next time
+            if started is not None:
+                self.instrumentation.record(query, time.perf_counter() - started, error=e, target=self.target)
+            return None
+
+    def clone(self):
+        """Open a second connection with the same settings, e.g. for use on a worker thread."""
+        return DBHandler(
+            backend=self.backend,
+            replica_backend=self.replica.backend if self.replica else None,
+            read_your_writes_window=self.read_your_writes_window,
+            instrumentation=self.instrumentation,
+            check_schema=False,
+            write_clock=self.write_clock
+        )
+
+    def reader(self, target=None):
+        """Return the handler a read_only method runs on.
+
+        Reads go to the replica when one is connected, except right after a write through this
+        handler or one of its clones (see read_your_writes_window). `target` forces "primary" or "replica".
+        """
+        if target == "primary" or self.replica is None or self.replica.connection is None:
+            return self
+        if target != "replica" and time.monotonic() - self.last_write < self.read_your_writes_window:
+            return self
+        return self.replica
+
+    def get_schema_version(self):
+        """Return the schema version stored in the database, or 0 for a fresh database."""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT version FROM SchemaVersion")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except self.backend.Error:
+            return 0  # Fresh database without the version table
+        finally:
+            # End the read so later queries on this connection see fresh data
+            self.connection.rollback()
+
+    def schema_is_current(self):
+        """Return True if the database was already set up by this SCHEMA_VERSION."""
+        return self.get_schema_version() >= SCHEMA_VERSION
+
     def close_connection(self):
-        if self.connection.is_connected():
+        self.statements.clear()
+        if self.replica is not None:
+            self.replica.close_connection()
+        if self.connection and self.connection.is_connected():
             self.connection.close()
-            print("MySQL connection closed.")
+            print("Database connection closed.")
 
     def create_tables_if_not_exists(self):
         # SQL queries to create tables if they don't exist
@@ -99,86 +507,262 @@ class DBHandler:
         """
 
         # Execute table creation queries
-        self.execute_query(create_purchase_order_table)
-        self.execute_query(create_item_table)
-        self.execute_query(create_delivery_tracking_table)
-        self.execute_query(create_item_status_table)
+        self.execute_ddl(create_purchase_order_table)
+        self.execute_ddl(create_item_table)
+        self.execute_ddl(create_delivery_tracking_table)
+        self.execute_ddl(create_item_status_table)
+
+        self.execute_ddl("CREATE TABLE IF NOT EXISTS SchemaVersion (version INT NOT NULL)")
+        self.apply_migrations()
+
+    def apply_migrations(self):
+        """Run the SCHEMA_MIGRATIONS the database has not seen yet, storing the version after each one.
+
+        A failing migration raises, so the version stays at the last migration that completed
+        and the next connect retries from there.
+        """
+        current_version = self.get_schema_version()
+        for version, statements in SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(self)  # Data migration, e.g. a backfill of a new table
+                else:
+                    self.execute_ddl(statement)
+            self.set_schema_version(version)
+
+    def set_schema_version(self, version):
+        try:
+            self.execute_statement("DELETE FROM SchemaVersion")
+            self.execute_statement("INSERT INTO SchemaVersion (version) VALUES (%s)", (version,))
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    def execute_ddl(self, statement):
+        """Run a DDL statement written for MySQL, adapted to the backend's dialect.
+
+        Errors are raised, except that the table, column or index already existing counts as
+        success, so a migration interrupted part way through can run again.
+        """
+        try:
+            self.execute_statement(self.backend.translate_ddl(statement))
+            self.connection.commit()
+        except self.backend.Error as e:
+            self.connection.rollback()
+            if not self.backend.is_duplicate_object_error(e):
+                raise
+
+    def last_insert_id(self):
+        """Return the id generated by the last INSERT on this connection."""
+        return self.fetch_query(self.backend.last_insert_id_query)[0]['id']
+
+    def log_purchase_order_changes(self, operation, condition, params=(), commit=True):
+        """Record a change log entry for every PurchaseOrder row matching `condition`.
+
+        With commit=False the entries join the caller's transaction.
+        """
+        query = f"""
+        INSERT INTO ChangeLog (table_name, row_id, purchase_order_id, po_number, operation)
+        SELECT 'PurchaseOrder', id, id, po_number, %s FROM PurchaseOrder WHERE {condition}
+        """
+        if commit:
+            self.execute_query(query, (operation, *params))
+        else:
+            self.execute_statement(query, (operation, *params))
+
+    def log_item_changes(self, operation, condition, params=(), commit=True):
+        """Record a change log entry for every Item row matching `condition`; see log_purchase_order_changes."""
+        query = f"""
+        INSERT INTO ChangeLog (table_name, row_id, purchase_order_id, po_number, operation)
+        SELECT 'Item', Item.id, Item.purchase_order_id, PurchaseOrder.po_number, %s
+        FROM Item JOIN PurchaseOrder ON PurchaseOrder.id = Item.purchase_order_id
+        WHERE {condition}
+        """
+        if commit:
+            self.execute_query(query, (operation, *params))
+        else:
+            self.execute_statement(query, (operation, *params))
+
+    @read_only
+    def get_change_token(self):
+        """Return a token for the current end of the change log, to pass to get_changes_since."""
+        self.connection.commit()  # Start a fresh snapshot so the token is current
+        result = self.fetch_query("SELECT MAX(id) AS last_id FROM ChangeLog")
+        last_id = (result[0]['last_id'] or 0) if result else 0
+        # Ids below the end that are not visible yet may belong to transactions still in flight
+        recent = {row['id'] for row in self.fetch_query(
+            "SELECT id FROM ChangeLog WHERE id > %s", (last_id - CHANGE_LOG_MAX_GAPS,)
+        ) or []}
+        now = int(time.time())
+        gaps = set(range(min(recent, default=last_id) + 1, last_id)) - recent
+        return format_change_token(last_id, {gap_id: now for gap_id in gaps})
+
+    @read_only
+    def get_changes_since(self, token, limit=1000):
+        """Return the purchase orders inserted, updated or deleted since `token`.
+
+        Several changes to the same PO are collapsed, and item changes are reported as an
+        update of their PO. The result holds the current rows for inserted/updated POs,
+        {id, po_number} for deleted ones, and the token to pass in on the next call.
+        """
+        # With REPEATABLE READ a long-lived connection keeps reading the snapshot of its
+        # first query; ending the transaction lets this poll see other clients' commits.
+        self.connection.commit()
+        last_id, gaps = parse_change_token(token)
+        query = "SELECT id, table_name, purchase_order_id, po_number, operation FROM ChangeLog WHERE id > %s"
+        params = [last_id]
+        if gaps:
+            # Entries of transactions that committed after a later id was read
+            query += f" OR id IN ({', '.join(['%s'] * len(gaps))})"
+            params.extend(sorted(gaps))
+        entries = self.fetch_query(query + " ORDER BY id LIMIT %s", (*params, limit)) or []
+
+        now = int(time.time())
+        operations = {}
+        po_numbers = {}
+        for entry in entries:
+            if entry['id'] in gaps:
+                del gaps[entry['id']]
+            else:
+                gaps.update((gap_id, now) for gap_id in range(last_id + 1, entry['id']))
+                last_id = entry['id']
+            po_numbers[entry['purchase_order_id']] = entry['po_number']
+            ops = operations.setdefault(entry['purchase_order_id'], set())
+            if entry['table_name'] == 'PurchaseOrder':
+                ops.add(entry['operation'])
+            else:
+                ops.add('update')
+
+        deleted_ids = {po_id for po_id, ops in operations.items() if 'delete' in ops}
+        changed_ids = [po_id for po_id in operations if po_id not in deleted_ids]
+        rows = {}
+        if changed_ids:
+            placeholders = ", ".join(["%s"] * len(changed_ids))
+            for row in self.fetch_query(f"SELECT * FROM PurchaseOrder WHERE id IN ({placeholders})", tuple(changed_ids)) or []:
+                rows[row['id']] = row
+
+        gaps = {gap_id: seen for gap_id, seen in gaps.items() if now - seen < CHANGE_LOG_GAP_TIMEOUT}
+        gaps = dict(sorted(gaps.items())[-CHANGE_LOG_MAX_GAPS:])
+        changes = {"token": format_change_token(last_id, gaps), "inserted": [], "updated": [], "deleted": [],
+                   "has_more": len(entries) == limit}
+        for po_id, ops in operations.items():
+            if po_id in deleted_ids or po_id not in rows:
+                changes["deleted"].append({"id": po_id, "po_number": po_numbers[po_id]})
+            elif 'insert' in ops:
+                changes["inserted"].append(rows[po_id])
+            else:
+                changes["updated"].append(rows[po_id])
+        return changes
+
+    def prune_change_log(self, before):
+        """Delete change log entries older than `before`; clients with older tokens should do a full reload."""
+        self.execute_query("DELETE FROM ChangeLog WHERE changed_at < %s", (before,))
 
     def insert_purchase_order(self, po_number, order_date, total_qty, total_amount):
         query = "INSERT INTO PurchaseOrder (po_number, order_date, total_qty, total_amount) VALUES (%s, %s, %s, %s)"
         params = (po_number, order_date, total_qty, total_amount)
-        self.execute_query(query, params)
+        try:
+            self.execute_statement(query, params)
+            self.log_purchase_order_changes('insert', "id = %s", (self.last_insert_id(),), commit=False)
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise e
 
     def purchase_order_exists(self, po_number):
         """Check if a purchase order exists in the database."""
-        query = "SELECT COUNT(*) FROM PurchaseOrder WHERE po_number = %s"
-        result = self.fetch_query(query, (po_number,))
-        return result[0]['COUNT(*)'] > 0
+        # Not read_only: it guards an insert, so a lagging replica must not answer it
+        # Archived POs count too, so a PO number is never reused
+        query = """
+        SELECT (SELECT COUNT(*) FROM PurchaseOrder WHERE po_number = %s)
+             + (SELECT COUNT(*) FROM PurchaseOrderArchive WHERE po_number = %s) AS matches
+        """
+        result = self.fetch_query(query, (po_number, po_number))
+        return result[0]['matches'] > 0
 
-    def add_purchase_order_items(self, purchase_order):
+    def add_purchase_order_items(self, purchase_order, commit=True):
+        """Insert the items of a saved PO; with commit=False the inserts join the caller's transaction."""
         try:
-            # Insert items into the items table
-            for item in purchase_order.items:
-                item_query = """
-                INSERT INTO Item (purchase_order_id, cart_part_no, country_of_origin, a_unit, qty, rate_include_gst, nomenclature)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-                self.execute_query(item_query, (
-                    purchase_order.id,
-                    item.cart_part_no,
-                    item.country_of_origin,
-                    item.a_unit,
-                    item.qty,
-                    item.rate_include_gst,
-                    item.nomenclature
-                ))
-            self.connection.commit()
+            # Insert all items in one batch and one transaction
+            item_query = """
+            INSERT INTO Item (purchase_order_id, cart_part_no, country_of_origin, a_unit, qty, rate_include_gst, nomenclature)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """
+            self.adjust_report_rollup("Item.purchase_order_id = %s", (purchase_order.id,), sign=-1)
+            self.execute_many(item_query, [(
+                purchase_order.id,
+                item.cart_part_no,
+                item.country_of_origin,
+                item.a_unit,
+                item.qty,
+                item.rate_include_gst,
+                item.nomenclature
+            ) for item in purchase_order.items])
+            self.log_item_changes('insert', "Item.purchase_order_id = %s", (purchase_order.id,), commit=False)
+            self.adjust_report_rollup("Item.purchase_order_id = %s", (purchase_order.id,))
+            if commit:
+                self.connection.commit()
         except Exception as e:
-            self.connection.rollback()
+            if commit:
+                self.connection.rollback()
             raise e
         
-    def update_purchase_order_items(self, purchase_order):
+    def update_purchase_order_items(self, purchase_order, items=None):
+        """Update items of a purchase order in one batch; pass `items` to write only the changed ones."""
+        items = purchase_order.items if items is None else items
         try:
             # Update items in the items table
-            for item in purchase_order.items:
-                item_query = """
-                UPDATE Item 
-                SET 
-                    cart_part_no = %s,
-                    country_of_origin = %s,
-                    a_unit = %s,
-                    qty = %s,
-                    rate_include_gst = %s,
-                    nomenclature = %s
-                WHERE id = %s
-                """
-                self.execute_query(item_query, (
-                    item.cart_part_no,
-                    item.country_of_origin,
-                    item.a_unit,
-                    item.qty,
-                    item.rate_include_gst,
-                    item.nomenclature,
-                    item.id  # Assuming each item has a unique `id`
-                ))
+            item_query = """
+            UPDATE Item 
+            SET 
+                cart_part_no = %s,
+                country_of_origin = %s,
+                a_unit = %s,
+                qty = %s,
+                rate_include_gst = %s,
+                nomenclature = %s
+            WHERE id = %s
+            """
+            item_ids = tuple(item.id for item in items)
+            item_condition = f"Item.id IN ({', '.join(['%s'] * len(items))})"
+            if items:
+                self.adjust_report_rollup(item_condition, item_ids, sign=-1)
+            self.execute_many(item_query, [(
+                item.cart_part_no,
+                item.country_of_origin,
+                item.a_unit,
+                item.qty,
+                item.rate_include_gst,
+                item.nomenclature,
+                item.id  # Assuming each item has a unique `id`
+            ) for item in items])
+            if items:
+                self.log_item_changes('update', item_condition, item_ids, commit=False)
+                self.adjust_report_rollup(item_condition, item_ids)
             self.connection.commit()
         except Exception as e:
             self.connection.rollback()
             raise e
 
-    def add_purchase_order(self, purchase_order):
+    def add_purchase_order(self, purchase_order, commit=True):
+        """Insert a PO header and return its id; with commit=False the insert joins the caller's transaction."""
         try:
             # Insert into the purchase_orders table
             query = "INSERT INTO PurchaseOrder (po_number, order_date, total_qty, total_amount) VALUES (%s, %s, %s, %s)"
-            self.execute_query(query, (purchase_order.po_number, purchase_order.added_date, purchase_order.total_qty, purchase_order.total_amount))
+            self.execute_statement(query, (purchase_order.po_number, purchase_order.added_date, purchase_order.total_qty, purchase_order.total_amount))
 
-            purchase_order_id_query = "SELECT LAST_INSERT_ID()"
-            purchase_order_id = self.fetch_query(purchase_order_id_query)[0]['LAST_INSERT_ID()']
+            purchase_order_id = self.last_insert_id()
+            self.log_purchase_order_changes('insert', "id = %s", (purchase_order_id,), commit=False)
 
-            self.connection.commit()
+            if commit:
+                self.connection.commit()
             return purchase_order_id
         except Exception as e:
-            self.connection.rollback()
+            if commit:
+                self.connection.rollback()
             raise e
 
     def update_purchase_order(self, purchase_order):
@@ -191,12 +775,16 @@ class DBHandler:
                 total_amount = %s 
             WHERE po_number = %s
             """
-            self.execute_query(query, (
+            # The order date decides which day of the rollup the PO's items count towards
+            self.adjust_report_rollup("PurchaseOrder.po_number = %s", (purchase_order.po_number,), sign=-1)
+            self.execute_statement(query, (
                 purchase_order.added_date,
                 purchase_order.total_qty,
                 purchase_order.total_amount,
                 purchase_order.po_number
             ))
+            self.log_purchase_order_changes('update', "po_number = %s", (purchase_order.po_number,), commit=False)
+            self.adjust_report_rollup("PurchaseOrder.po_number = %s", (purchase_order.po_number,))
 
             self.connection.commit()  # Commit the transaction
         except Exception as e:
@@ -206,55 +794,50 @@ class DBHandler:
     def insert_delivery_tracking(self, item_id, challan_no, delivery_date, delivered_qty, rejected_qty, approved_qty):
         query = "INSERT INTO DeliveryTracking (item_id, challan_no, delivery_date, delivered_qty, rejected_qty, approved_qty) VALUES (%s, %s, %s, %s, %s, %s)"
         params = (item_id, challan_no, delivery_date, delivered_qty, rejected_qty, approved_qty)
-        self.execute_query(query, params)
+        try:
+            self.adjust_report_rollup("Item.id = %s", (item_id,), sign=-1)
+            self.execute_statement(query, params)
+            delivery_id = self.last_insert_id()  # Read before the rollup upsert runs
+            self.adjust_report_rollup("Item.id = %s", (item_id,))
+            self.connection.commit()
+            return delivery_id
+        except Exception as e:
+            self.connection.rollback()
+            raise e
 
     def insert_item_status(self, item_id, remaining_qty):
         query = "INSERT INTO ItemStatus (item_id, remaining_qty) VALUES (%s, %s)"
         params = (item_id, remaining_qty)
         self.execute_query(query, params)
 
+    @read_only
     def get_purchase_order_by_po_number(self, po_number):
-        # Fetch the Purchase Order details
-        query = "SELECT id, po_number, order_date, total_qty, total_amount FROM PurchaseOrder WHERE po_number = %s"
-        params = (po_number,)
-        result = self.fetch_query(query, params)
-
+        """Return the PurchaseOrder with its items, or None if the Purchase Order is not found.
 
+        POs moved to the archive tables are found too; they come back with `archived` set.
+        """
+        result = self.fetch_rows("purchase_order_by_po_number", (po_number,))
         if result:
-            # Create a PurchaseOrder object
-            po_data = result[0]
-            purchase_order = PurchaseOrder(po_number)
-            purchase_order.id = po_data['id']
-            purchase_order.added_date = po_data['order_date']
-            purchase_order.total_qty = po_data['total_qty']
-            purchase_order.total_amount = po_data['total_amount']
-            # Fetch all items associated with the Purchase Order
-            item_query = """
-                SELECT id,cart_part_no, country_of_origin, a_unit, qty, rate_include_gst, nomenclature 
-                FROM Item 
-                WHERE purchase_order_id = %s
-            """
-            item_params = (purchase_order.id,)
-            items_result = self.fetch_query(item_query, item_params)
-
-            # Add each item to the PurchaseOrder object
-            for item_data in items_result:
-                id,cart_part_no, country_of_origin, a_unit, qty, rate_include_gst, nomenclature = item_data.values()
-                item = Item(
-                    cart_part_no=cart_part_no,
-                    country_of_origin=country_of_origin,
-                    a_unit=a_unit,
-                    qty=qty,
-                    rate_include_gst=rate_include_gst,
-                    nomenclature=nomenclature
-                )
-                item.id =id
-                purchase_order.add_item(item)           
+            purchase_order = PurchaseOrder.from_row(result[0])
+            purchase_order.items = self.get_items(purchase_order.id)
+            return purchase_order
 
-            return purchase_order  # Return the fully populated PurchaseOrder object
+        result = self.fetch_rows("archived_purchase_order_by_po_number", (po_number,))
+        if not result:
+            return None
+        purchase_order = PurchaseOrder.from_row(result[0])
+        purchase_order.archived = True
+        rows = self.fetch_rows("archived_items_by_purchase_order_id", (purchase_order.id,)) or []
+        purchase_order.items = [Item.from_row(row) for row in rows]
+        return purchase_order
 
-        return None  # Return None if the Purchase Order is not found
+    @read_only
+    def get_items(self, purchase_order_id):
+        """Return the items of a purchase order as Item objects."""
+        rows = self.fetch_rows("items_by_purchase_order_id", (purchase_order_id,)) or []
+        return [Item.from_row(row) for row in rows]
 
+    @read_only
     def get_purchase_orders(self):
         query = "SELECT * FROM PurchaseOrder"
         result = self.fetch_query(query)
@@ -262,35 +845,642 @@ class DBHandler:
             return result
         return []
 
+    @staticmethod
+    def encode_page_token(sort, descending, row, columns):
+        """Encode the sort key of the last row of a page as an opaque continuation token."""
+        def plain(value):
+            if isinstance(value, (date, datetime)):
+                return value.isoformat()
+            if isinstance(value, Decimal):
+                return str(value)
+            return value
+
+        state = {"sort": sort, "desc": descending, "last": [plain(row[column]) for column in columns]}
+        return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+    @staticmethod
+    def decode_page_token(token):
+        try:
+            return json.loads(base64.urlsafe_b64decode(token.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid page token.")
+
+    @staticmethod
+    def seek_condition(columns, last_values, descending):
+        """Build the WHERE clause that continues after `last_values` for a one or two column sort key.
+
+        The first column of a two column key may be NULL; NULLs sort first ascending and last descending.
+        """
+        operator = "<" if descending else ">"
+        if len(columns) == 1:
+            return f"{columns[0]} {operator} %s", [last_values[0]]
+
+        column, tie_breaker = columns
+        value, tie_value = last_values
+        if value is None:
+            condition = f"({column} IS NULL AND {tie_breaker} {operator} %s)"
+            if not descending:
+                condition = f"({condition} OR {column} IS NOT NULL)"
+            return condition, [tie_value]
+
+        condition = f"({column} {operator} %s OR ({column} = %s AND {tie_breaker} {operator} %s))"
+        if descending:
+            condition = f"({condition} OR {column} IS NULL)"
+        return condition, [value, value, tie_value]
+
+    @read_only
+    def get_purchase_orders_page(self, page_size=100, token=None, sort="order_date", descending=False,
+                                 date_from=None, date_to=None, min_amount=None, max_amount=None, po_prefix=None):
+        """Fetch one page of purchase orders using keyset pagination.
+
+        Returns (rows, next_token); next_token is None on the last page. Pass the token back
+        with the same filters to get the next page. Sort and direction are taken from the token.
+        """
+        if token:
+            state = self.decode_page_token(token)
+            sort, descending = state["sort"], state["desc"]
+        if sort not in PURCHASE_ORDER_SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort}")
+        columns = PURCHASE_ORDER_SORT_KEYS[sort]
+
+        conditions = []
+        params = []
+        if date_from is not None:
+            conditions.append("order_date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("order_date <= %s")
+            params.append(date_to)
+        if min_amount is not None:
+            conditions.append("total_amount >= %s")
+            params.append(min_amount)
+        if max_amount is not None:
+            conditions.append("total_amount <= %s")
+            params.append(max_amount)
+        if po_prefix:
+            escaped = po_prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+            conditions.append("po_number LIKE %s ESCAPE '!'")
+            params.append(escaped + "%")
+        if token:
+            condition, seek_params = self.seek_condition(columns, state["last"], descending)
+            conditions.append(condition)
+            params.extend(seek_params)
+
+        direction = "DESC" if descending else "ASC"
+        query = "SELECT * FROM PurchaseOrder"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in columns) + " LIMIT %s"
+        params.append(page_size + 1)  # One extra row tells us whether another page exists
+
+        rows = self.fetch_query(query, tuple(params)) or []
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_token = self.encode_page_token(sort, descending, rows[-1], columns)
+        return rows, next_token
+
+    @read_only
+    def search_purchase_orders(self, term, limit=None, part_numbers=True):
+        """Return POs whose number contains `term`, or with part_numbers, the part number of one of their items."""
+        escaped = "%" + term.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+        query = "SELECT * FROM PurchaseOrder WHERE po_number LIKE %s ESCAPE '!'"
+        params = [escaped]
+        if part_numbers:
+            query += " OR id IN (SELECT purchase_order_id FROM Item WHERE cart_part_no LIKE %s ESCAPE '!')"
+            params.append(escaped)
+        query += " ORDER BY po_number"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return self.fetch_query(query, tuple(params)) or []
+
+    @read_only
+    def get_items_page(self, purchase_order_id=None, page_size=500, token=None):
+        """Fetch one page of items in id order, optionally for a single purchase order.
+
+        Returns (rows, next_token) like get_purchase_orders_page.
+        """
+        conditions = []
+        params = []
+        if purchase_order_id is not None:
+            conditions.append("purchase_order_id = %s")
+            params.append(purchase_order_id)
+        if token:
+            conditions.append("id > %s")
+            params.append(self.decode_page_token(token)["last"][0])
+
+        query = "SELECT * FROM Item"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id LIMIT %s"
+        params.append(page_size + 1)
+
+        rows = self.fetch_query(query, tuple(params)) or []
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_token = self.encode_page_token("id", False, rows[-1], ("id",))
+        return rows, next_token
+
+    @read_only
     def get_items_by_purchase_order_id(self, purchase_order_id):
         query = "SELECT * FROM Item WHERE purchase_order_id = %s"
         params = (purchase_order_id,)
         result = self.fetch_query(query, params)
         return result
 
+    @read_only
+    def get_part_numbers(self, after_id=0, limit=50000):
+        """Return (id, cart_part_no, nomenclature) of items with an id above `after_id`, for the part catalog."""
+        query = "SELECT id, cart_part_no, nomenclature FROM Item WHERE id > %s ORDER BY id LIMIT %s"
+        return self.fetch_query(query, (after_id, limit))
+
+    @read_only
     def get_delivery_tracking_by_item_id(self, item_id):
         query = "SELECT * FROM DeliveryTracking WHERE item_id = %s"
         params = (item_id,)
         result = self.fetch_query(query, params)
         return result
 
+    @read_only
     def get_item_status_by_item_id(self, item_id):
         query = "SELECT * FROM ItemStatus WHERE item_id = %s"
         params = (item_id,)
         result = self.fetch_query(query, params)
         return result
 
-    def delete_items_for_po(self, po_number):
-        query = "DELETE FROM Item WHERE purchase_order_id = (SELECT id FROM PurchaseOrder WHERE po_number = %s)"
-        self.execute_query(query, (po_number,))
+    @read_only
+    def get_item_statuses(self, purchase_order_id):
+        """Return the ItemStatus rows of a PO's items by item id."""
+        query = """
+        SELECT ItemStatus.* FROM ItemStatus JOIN Item ON Item.id = ItemStatus.item_id
+        WHERE Item.purchase_order_id = %s
+        """
+        return {row['item_id']: row for row in self.fetch_query(query, (purchase_order_id,)) or []}
+
+    def reconcile_purchase_orders(self, after_id=0, limit=500):
+        """Recompute the item quantities and fulfilment state of the next `limit` POs after `after_id`.
+
+        Three set-based statements in one short transaction: replace the ItemStatus rows of
+        the batch's items with the delivered/approved/rejected/remaining quantities summed from
+        DeliveryTracking, then set each PO's fulfilment_status from them: 'fulfilled' when
+        nothing remains, 'partial' once anything was delivered, else 'open' ('no_items' for an
+        empty PO). Returns (last PO id, POs, items), or None when there is no PO after `after_id`.
+        """
+        rows = self.fetch_query("SELECT id FROM PurchaseOrder WHERE id > %s ORDER BY id LIMIT %s", (after_id, limit))
+        if not rows:
+            return None
+        last_id = rows[-1]['id']
+        batch = (after_id, last_id)
+        now = datetime.now()
+        statements = [
+            ("""
+            DELETE FROM ItemStatus WHERE item_id IN (
+                SELECT id FROM Item WHERE purchase_order_id > %s AND purchase_order_id <= %s
+            )
+            """, batch),
+            ("""
+            INSERT INTO ItemStatus (item_id, delivered_qty, approved_qty, rejected_qty, remaining_qty, reconciled_at)
+            SELECT Item.id,
+                   COALESCE(SUM(DeliveryTracking.delivered_qty), 0),
+                   COALESCE(SUM(DeliveryTracking.approved_qty), 0),
+                   COALESCE(SUM(DeliveryTracking.rejected_qty), 0),
+                   CASE WHEN COALESCE(Item.qty, 0) > COALESCE(SUM(DeliveryTracking.approved_qty), 0)
+                        THEN COALESCE(Item.qty, 0) - COALESCE(SUM(DeliveryTracking.approved_qty), 0) ELSE 0 END,
+                   %s
+            FROM Item LEFT JOIN DeliveryTracking ON DeliveryTracking.item_id = Item.id
+            WHERE Item.purchase_order_id > %s AND Item.purchase_order_id <= %s
+            GROUP BY Item.id, Item.qty
+            """, (now, *batch)),
+            ("""
+            UPDATE PurchaseOrder SET reconciled_at = %s, fulfilment_status = (
+                SELECT CASE
+                    WHEN COUNT(*) = 0 THEN 'no_items'
+                    WHEN SUM(CASE WHEN ItemStatus.remaining_qty > 0 THEN 1 ELSE 0 END) = 0 THEN 'fulfilled'
+                    WHEN SUM(ItemStatus.delivered_qty) > 0 THEN 'partial'
+                    ELSE 'open'
+                END
+                FROM Item JOIN ItemStatus ON ItemStatus.item_id = Item.id
+                WHERE Item.purchase_order_id = PurchaseOrder.id
+            )
+            WHERE id > %s AND id <= %s
+            """, (now, *batch)),
+        ]
+        self.connection.commit()  # The batch must start its own transaction
+        try:
+            self.backend.begin_write(self.connection)
+            item_count = 0
+            for query, params in statements:
+                rowcount = self.execute_statement(query, params)
+                if query.lstrip().startswith("INSERT"):
+                    item_count = rowcount
+            self.connection.commit()
+        except self.backend.Error as e:
+            self.connection.rollback()
+            raise e
+        return last_id, len(rows), item_count
+
+    def delete_items_for_po(self, po_number, commit=True):
+        """Delete the items of a PO; with commit=False the delete joins the caller's transaction."""
+        try:
+            self.log_item_changes('delete', "PurchaseOrder.po_number = %s", (po_number,), commit=False)
+            self.adjust_report_rollup("PurchaseOrder.po_number = %s", (po_number,), sign=-1)
+            query = "DELETE FROM Item WHERE purchase_order_id = (SELECT id FROM PurchaseOrder WHERE po_number = %s)"
+            self.execute_statement(query, (po_number,))
+            if commit:
+                self.connection.commit()
+        except Exception as e:
+            if commit:
+                self.connection.rollback()
+            raise e
     
     def delete_purchase_order(self, po_number):
         try:
             # First, delete the items associated with the PO
-            self.delete_items_for_po(po_number)
+            self.delete_items_for_po(po_number, commit=False)
             
+            # Forget its scans, so a new scan of the same PO is not reported as a duplicate
+            self.execute_statement("DELETE FROM ImageHash WHERE po_number = %s", (po_number,))
+            self.delete_scan_documents((po_number,), commit=False)
+
             # Now, delete the purchase order itself
+            self.log_purchase_order_changes('delete', "po_number = %s", (po_number,), commit=False)
             query = "DELETE FROM PurchaseOrder WHERE po_number = %s"
-            self.execute_query(query, (po_number,))
+            self.execute_statement(query, (po_number,))
+            self.connection.commit()
         except Exception as e:
-            raise Exception(f"An error occurred while deleting the purchase order: {str(e)}")
\ No newline at end of file
+            self.connection.rollback()
+            raise Exception(f"An error occurred while deleting the purchase order: {str(e)}")
+
+    def adjust_report_rollup(self, condition, params=(), sign=1, archived=False):
+        """Add (sign=1) or remove (sign=-1) the Item rows matching `condition` from ReportRollup.
+
+        Writes remove the affected items before the change and add them back after it, so the
+        rollup follows every write through DBHandler without rescanning the tables. Runs inside
+        the caller's transaction; items of POs without an order date are left out. With
+        `archived` the items are read from the archive tables.
+        """
+        item_table, po_table, delivery_table = (
+            ("ItemArchive", "PurchaseOrderArchive", "DeliveryTrackingArchive") if archived
+            else ("Item", "PurchaseOrder", "DeliveryTracking")
+        )
+        query = f"""
+        INSERT INTO ReportRollup ({', '.join(REPORT_ROLLUP_KEYS + REPORT_ROLLUP_MEASURES)})
+        SELECT day, country_of_origin, a_unit,
+               %s * COUNT(*), %s * SUM(qty), %s * SUM(qty * rate), %s * SUM(delivered_qty), %s * SUM(approved_qty)
+        FROM (
+            SELECT DATE(PurchaseOrder.order_date) AS day,
+                   COALESCE(Item.country_of_origin, '') AS country_of_origin,
+                   COALESCE(Item.a_unit, '') AS a_unit,
+                   COALESCE(Item.qty, 0) AS qty,
+                   COALESCE(Item.rate_include_gst, 0) AS rate,
+                   (SELECT COALESCE(SUM(delivered_qty), 0) FROM {delivery_table} WHERE item_id = Item.id) AS delivered_qty,
+                   (SELECT COALESCE(SUM(approved_qty), 0) FROM {delivery_table} WHERE item_id = Item.id) AS approved_qty
+            FROM {item_table} AS Item JOIN {po_table} AS PurchaseOrder ON PurchaseOrder.id = Item.purchase_order_id
+            WHERE {condition}
+        ) AS contributions
+        WHERE day IS NOT NULL
+        GROUP BY day, country_of_origin, a_unit
+        {self.backend.accumulate_clause(REPORT_ROLLUP_KEYS, REPORT_ROLLUP_MEASURES)}
+        """
+        self.execute_statement(query, (sign,) * len(REPORT_ROLLUP_MEASURES) + tuple(params))
+        if sign < 0:
+            self.execute_statement("DELETE FROM ReportRollup WHERE item_count <= 0")
+
+    def rebuild_report_rollup(self):
+        """Recompute ReportRollup from the item, PO and delivery tables and their archives, e.g. after a backfill."""
+        has_archive = self.get_schema_version() >= 7  # Also ends the current read, so call it first
+        try:
+            self.execute_statement("DELETE FROM ReportRollup")
+            self.adjust_report_rollup("1 = 1")
+            if has_archive:
+                self.adjust_report_rollup("1 = 1", archived=True)  # Archived POs stay in the reports
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    @read_only
+    def get_report_rollup(self, group_by, start=None, end=None):
+        """Sum the ReportRollup measures per value of `group_by` (a REPORT_ROLLUP_KEYS column) over [start, end)."""
+        if group_by not in REPORT_ROLLUP_KEYS:
+            raise ValueError(f"Unknown report dimension: {group_by}")
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("day >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("day < %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        measures = ", ".join(f"SUM({measure}) AS {measure}" for measure in REPORT_ROLLUP_MEASURES)
+        query = f"SELECT {group_by} AS dimension, {measures} FROM ReportRollup {where} GROUP BY {group_by} ORDER BY {group_by}"
+        return self.fetch_query(query, tuple(params))
+
+    def get_archivable_purchase_order_ids(self, cutoff, after_id=0, limit=100):
+        """Ids above `after_id` of POs ordered before `cutoff` whose items are all approved on delivery."""
+        query = """
+        SELECT id FROM PurchaseOrder
+        WHERE order_date < %s AND id > %s
+          AND EXISTS (SELECT 1 FROM Item WHERE Item.purchase_order_id = PurchaseOrder.id)
+          AND NOT EXISTS (
+              SELECT 1 FROM Item
+              WHERE Item.purchase_order_id = PurchaseOrder.id
+                AND COALESCE(Item.qty, 0) > (
+                    SELECT COALESCE(SUM(approved_qty), 0) FROM DeliveryTracking WHERE DeliveryTracking.item_id = Item.id
+                )
+          )
+        ORDER BY id LIMIT %s
+        """
+        return [row['id'] for row in self.fetch_query(query, (cutoff, after_id, limit)) or []]
+
+    def archive_purchase_orders(self, purchase_order_ids):
+        """Move POs with their items, deliveries and item statuses to the archive tables in one transaction.
+
+        The rows keep their ids, the report rollup keeps counting them, and the change log
+        reports the POs as deleted so clients drop them from their lists. On error the batch
+        is rolled back and the error raised.
+        """
+        if not purchase_order_ids:
+            return 0
+        ids = tuple(purchase_order_ids)
+        placeholders = ", ".join(["%s"] * len(ids))
+        conditions = {
+            "DeliveryTracking": f"item_id IN (SELECT id FROM Item WHERE purchase_order_id IN ({placeholders}))",
+            "ItemStatus": f"item_id IN (SELECT id FROM Item WHERE purchase_order_id IN ({placeholders}))",
+            "Item": f"purchase_order_id IN ({placeholders})",
+            "PurchaseOrder": f"id IN ({placeholders})",
+        }
+        self.connection.commit()  # The move must start its own transaction
+        try:
+            self.backend.begin_write(self.connection)
+            for table, (archive_table, columns) in ARCHIVE_TABLES.items():
+                self.execute_statement(
+                    f"INSERT INTO {archive_table} ({columns}) SELECT {columns} FROM {table} WHERE {conditions[table]}", ids
+                )
+            self.log_purchase_order_changes('delete', f"id IN ({placeholders})", ids, commit=False)
+            for table in ARCHIVE_TABLES:
+                archived = self.execute_statement(f"DELETE FROM {table} WHERE {conditions[table]}", ids)
+            self.connection.commit()
+            return archived  # Rows deleted from PurchaseOrder, which comes last
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    def delete_purchase_orders(self, po_numbers):
+        """Delete several purchase orders with their items, deliveries and scans in one transaction.
+
+        Runs one statement per table for the whole list; returns the number of POs deleted.
+        """
+        po_numbers = tuple(po_numbers)
+        if not po_numbers:
+            return 0
+        placeholders = ", ".join(["%s"] * len(po_numbers))
+        po_condition = f"PurchaseOrder.po_number IN ({placeholders})"
+        item_ids = f"SELECT Item.id FROM Item JOIN PurchaseOrder ON PurchaseOrder.id = Item.purchase_order_id WHERE {po_condition}"
+        self.connection.commit()  # The bulk delete must start its own transaction
+        try:
+            self.backend.begin_write(self.connection)
+            self.log_item_changes('delete', po_condition, po_numbers, commit=False)
+            self.adjust_report_rollup(po_condition, po_numbers, sign=-1)
+            self.execute_statement(f"DELETE FROM DeliveryTracking WHERE item_id IN ({item_ids})", po_numbers)
+            self.execute_statement(f"DELETE FROM ItemStatus WHERE item_id IN ({item_ids})", po_numbers)
+            self.execute_statement(
+                f"DELETE FROM Item WHERE purchase_order_id IN (SELECT id FROM PurchaseOrder WHERE {po_condition})",
+                po_numbers
+            )
+            self.execute_statement(f"DELETE FROM ImageHash WHERE po_number IN ({placeholders})", po_numbers)
+            self.delete_scan_documents(po_numbers, commit=False)
+            self.log_purchase_order_changes('delete', po_condition, po_numbers, commit=False)
+            deleted = self.execute_statement(f"DELETE FROM PurchaseOrder WHERE {po_condition}", po_numbers)
+            self.connection.commit()
+            return deleted
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"An error occurred while deleting the purchase orders: {str(e)}")
+
+    def update_purchase_order_dates(self, po_numbers, order_date):
+        """Set the order date of several purchase orders in one statement and one transaction."""
+        po_numbers = tuple(po_numbers)
+        if not po_numbers:
+            return 0
+        po_condition = f"PurchaseOrder.po_number IN ({', '.join(['%s'] * len(po_numbers))})"
+        self.connection.commit()
+        try:
+            self.backend.begin_write(self.connection)
+            self.adjust_report_rollup(po_condition, po_numbers, sign=-1)
+            updated = self.execute_statement(
+                f"UPDATE PurchaseOrder SET order_date = %s WHERE {po_condition}", (order_date, *po_numbers)
+            )
+            self.log_purchase_order_changes('update', po_condition, po_numbers, commit=False)
+            self.adjust_report_rollup(po_condition, po_numbers)
+            self.connection.commit()
+            return updated
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    def add_scan_document(self, po_number, sha256, image_name, width, height, size_bytes, thumbnail, data=None):
+        """Record a stored scan of a PO; pass `data` to keep the original in the ScanBlob table."""
+        query = """
+        INSERT INTO ScanDocument (po_number, sha256, image_name, width, height, size_bytes, thumbnail)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        try:
+            if data is not None and not self.fetch_query("SELECT 1 FROM ScanBlob WHERE sha256 = %s", (sha256,)):
+                self.execute_statement("INSERT INTO ScanBlob (sha256, data) VALUES (%s, %s)", (sha256, data))
+            self.execute_statement(query, (po_number, sha256, image_name, width, height, size_bytes, thumbnail))
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    @read_only
+    def get_scan_documents(self, po_number):
+        """Return the stored scans of a PO with their thumbnails, oldest first; originals are not read."""
+        query = """
+        SELECT id, po_number, sha256, image_name, width, height, size_bytes, thumbnail
+        FROM ScanDocument WHERE po_number = %s ORDER BY id
+        """
+        return self.fetch_query(query, (po_number,)) or []
+
+    @read_only
+    def get_scan_blob(self, sha256):
+        """Return the original image bytes stored under `sha256`, or None."""
+        row = self.fetch_one_query("SELECT data FROM ScanBlob WHERE sha256 = %s", (sha256,))
+        return bytes(row['data']) if row else None
+
+    def delete_scan_documents(self, po_numbers, commit=True):
+        """Forget the scans of these POs and drop originals no other scan refers to."""
+        placeholders = ", ".join(["%s"] * len(po_numbers))
+        statements = [
+            (f"DELETE FROM ScanDocument WHERE po_number IN ({placeholders})", tuple(po_numbers)),
+            ("DELETE FROM ScanBlob WHERE sha256 NOT IN (SELECT sha256 FROM ScanDocument)", ()),
+        ]
+        for query, params in statements:
+            if commit:
+                self.execute_query(query, params)
+            else:
+                self.execute_statement(query, params)
+
+    def add_image_hash(self, image_hash, po_number, image_name=None, table_hash=None):
+        """Store the 64-bit page hash and the 256-bit table hash of a processed scan."""
+        query = "INSERT INTO ImageHash (phash, po_number, image_name, table_hash) VALUES (%s, %s, %s, %s)"
+        table_hash = f"{table_hash:064x}" if table_hash is not None else None
+        self.execute_query(query, (f"{image_hash:016x}", po_number, image_name, table_hash))
+
+    @read_only
+    def get_image_hashes(self, after_id=0):
+        """Return the stored image hashes with an id above `after_id`, oldest first."""
+        query = "SELECT id, phash, table_hash, po_number, image_name FROM ImageHash WHERE id > %s ORDER BY id"
+        return self.fetch_query(query, (after_id,))
+
+    @read_only
+    def count_image_hashes(self, up_to_id):
+        """Return how many stored image hashes have an id up to `up_to_id`."""
+        result = self.fetch_query("SELECT COUNT(*) AS hashes FROM ImageHash WHERE id <= %s", (up_to_id,))
+        return result[0]['hashes'] if result else 0
+
+    def enqueue_ocr_job(self, po_number, image_path, requested_by=None, max_attempts=3):
+        """Store a scan in the OCR job queue and return the job id."""
+        with open(image_path, "rb") as f:
+            image = f.read()
+        return self.enqueue_ocr_image(po_number, os.path.basename(image_path), image, requested_by, max_attempts)
+
+    def enqueue_ocr_image(self, po_number, image_name, image, requested_by=None, max_attempts=3):
+        """Queue the bytes of an uploaded scan for OCR and return the job id."""
+        query = """
+        INSERT INTO OcrJob (po_number, image_name, image, status, max_attempts, requested_by)
+        VALUES (%s, %s, %s, 'queued', %s, %s)
+        """
+        try:
+            self.execute_statement(query, (po_number, image_name, image, max_attempts, requested_by))
+            job_id = self.last_insert_id()
+            self.connection.commit()
+            return job_id
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+
+    def claim_ocr_job(self, worker, lease_seconds=300):
+        """Lease the oldest runnable OCR job to `worker` and return it, or None if there is nothing to do.
+
+        A job leased to a worker that died becomes runnable again once its lease expires.
+        """
+        now = datetime.now()
+        self.connection.commit()  # The claim must start its own transaction
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            self.backend.begin_write(self.connection)
+            # Jobs whose last attempt ran out of time are not retried again
+            cursor.execute(
+                "UPDATE OcrJob SET status = 'failed', error = 'Lease expired', finished_at = %s "
+                "WHERE status = 'running' AND lease_expires_at < %s AND attempts >= max_attempts",
+                (now, now)
+            )
+            cursor.execute(
+                "SELECT id, po_number, image_name, image, attempts FROM OcrJob "
+                "WHERE (status = 'queued' AND (available_at IS NULL OR available_at <= %s)) "
+                "OR (status = 'running' AND lease_expires_at < %s) "
+                "ORDER BY id LIMIT 1" + self.backend.skip_locked_clause,
+                (now, now)
+            )
+            job = cursor.fetchone()
+            if job is not None:
+                cursor.execute(
+                    "UPDATE OcrJob SET status = 'running', worker = %s, attempts = attempts + 1, "
+                    "lease_expires_at = %s, started_at = %s WHERE id = %s",
+                    (worker, now + timedelta(seconds=lease_seconds), now, job['id'])
+                )
+                job['attempts'] += 1
+            self.connection.commit()
+            return job
+        except self.backend.Error as e:
+            print(f"Error claiming OCR job: {e}")
+            self.connection.rollback()
+            return None
+
+    def complete_ocr_job(self, job_id, worker, items):
+        """Store the extracted items of a job; returns False if the lease was lost to another worker."""
+        items_json = json.dumps([
+            {column: getattr(item, column) for column in Item.ROW_COLUMNS + OCR_ITEM_FIELDS if column != "id"}
+            for item in items
+        ], default=str)
+        query = """
+        UPDATE OcrJob SET status = 'done', items_json = %s, error = NULL, finished_at = %s, lease_expires_at = NULL
+        WHERE id = %s AND worker = %s AND status = 'running'
+        """
+        completed = self.execute_statement(query, (items_json, datetime.now(), job_id, worker)) == 1
+        self.connection.commit()
+        return completed
+
+    @staticmethod
+    def ocr_job_items(job):
+        """Rebuild the Items stored by complete_ocr_job from a row of get_ocr_jobs."""
+        items = []
+        for values in json.loads(job['items_json'] or "[]"):
+            checks = {field: values.pop(field, None) for field in OCR_ITEM_FIELDS}
+            item = Item(**values)
+            for field, value in checks.items():
+                setattr(item, field, value)
+            items.append(item)
+        return items
+
+    def fail_ocr_job(self, job_id, worker, error, retry_delay=30):
+        """Record a failed attempt; the job is queued again after `retry_delay` * attempts seconds until max_attempts."""
+        now = datetime.now()
+        job = self.fetch_one_query("SELECT attempts, max_attempts FROM OcrJob WHERE id = %s AND worker = %s", (job_id, worker))
+        if job is None:
+            return
+        if job['attempts'] >= job['max_attempts']:
+            query = "UPDATE OcrJob SET status = 'failed', error = %s, finished_at = %s, lease_expires_at = NULL WHERE id = %s AND worker = %s AND status = 'running'"
+            params = (error, now, job_id, worker)
+        else:
+            query = "UPDATE OcrJob SET status = 'queued', error = %s, available_at = %s, lease_expires_at = NULL WHERE id = %s AND worker = %s AND status = 'running'"
+            params = (error, now + timedelta(seconds=retry_delay * job['attempts']), job_id, worker)
+        self.execute_query(query, params)
+
+    def get_ocr_jobs(self, job_ids):
+        """Return status, items and error of the given jobs, without the image."""
+        if not job_ids:
+            return []
+        self.connection.commit()  # Fresh snapshot so finished jobs show up
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        query = f"SELECT id, po_number, status, attempts, items_json, error FROM OcrJob WHERE id IN ({placeholders})"
+        return self.fetch_query(query, tuple(job_ids)) or []
+
+    def get_open_ocr_jobs(self, requested_by):
+        """Return the ids of jobs requested by this client that have not been collected yet."""
+        query = "SELECT id FROM OcrJob WHERE requested_by = %s AND status <> 'collected' ORDER BY id"
+        return [row['id'] for row in self.fetch_query(query, (requested_by,)) or []]
+
+    def mark_ocr_job_collected(self, job_id):
+        self.execute_query("UPDATE OcrJob SET status = 'collected', image = %s WHERE id = %s", (b"", job_id))
+
+    def collect_ocr_job(self, job_id):
+        """Mark a finished job collected inside the caller's transaction, without committing.
+
+        Returns False if the job is not 'done', e.g. because another client collected it first.
+        """
+        query = "UPDATE OcrJob SET status = 'collected', image = %s WHERE id = %s AND status = 'done'"
+        return self.execute_statement(query, (b"", job_id)) == 1
+
+    def get_ocr_queue_stats(self, window=60):
+        """Return job counts by status, jobs finished in the last `window` seconds and their mean OCR time."""
+        self.connection.commit()
+        stats = {"counts": {}, "window": window, "finished": 0, "jobs_per_minute": 0.0, "mean_seconds": None}
+        for row in self.fetch_query("SELECT status, COUNT(*) AS jobs FROM OcrJob GROUP BY status") or []:
+            stats["counts"][row['status']] = row['jobs']
+
+        recent = self.fetch_query(
+            "SELECT started_at, finished_at FROM OcrJob WHERE status IN ('done', 'collected') AND finished_at >= %s",
+            (datetime.now() - timedelta(seconds=window),)
+        ) or []
+        durations = [(row['finished_at'] - row['started_at']).total_seconds() for row in recent if row['started_at']]
+        stats["finished"] = len(recent)
+        stats["jobs_per_minute"] = len(recent) * 60.0 / window
+        if durations:
+            stats["mean_seconds"] = sum(durations) / len(durations)
+        return stats
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import mmap
+import os
+import struct
+import tempfile
+
+THUMBNAIL_SIZE = 320  # Longest side of a thumbnail, in pixels
+THUMBNAIL_QUALITY = 80  # JPEG quality of thumbnails
+
+
+def image_size(source):
+    """(width, height) from the header of a PNG or JPEG, given its path or bytes, without decoding it; else None."""
+    with (io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, "rb")) as f:
+        header = f.read(24)
+        if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:2] != b"\xff\xd8":
+            return None
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] == 0xFF:
+                f.seek(-1, 1)  # Fill byte
+                continue
+            if 0xD0 <= marker[1] <= 0xD9 or marker[1] == 0x01:
+                continue  # Markers without a length
+            length = struct.unpack(">H", f.read(2))[0]
+            # Start-of-frame markers hold the size; C4, C8 and CC are other segments in that range
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, 1)
+
+
+def decode_for_thumbnail(data, size=THUMBNAIL_SIZE):
+    """Decode scan bytes at the smallest of 1/1, 1/2, 1/4 and 1/8 size still larger than a thumbnail.
+
+    Returns (image, width, height) with the size of the original.
+    """
+    import cv2
+    import numpy
+
+    original = image_size(data)
+    reduction = 1
+    if original is not None:
+        while reduction < 8 and max(original) / (reduction * 2) >= size:
+            reduction *= 2
+    flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+             8: cv2.IMREAD_REDUCED_COLOR_8}
+    image = cv2.imdecode(numpy.frombuffer(data, numpy.uint8), flags[reduction])
+    if image is None:
+        raise ValueError("Image could not be loaded.")
+    width, height = original or (image.shape[1], image.shape[0])
+    return image, width, height
+
+
+def make_thumbnail(image, size=THUMBNAIL_SIZE):
+    """JPEG bytes of `image` (a BGR array) shrunk so its longest side is at most `size` pixels."""
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = min(1.0, size / max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+    if not ok:
+        raise ValueError("Thumbnail could not be encoded.")
+    return encoded.tobytes()
+
+
+class DocumentStore:
+    """Original scans of the POs, content-addressed by their SHA-256.
+
+    The scan is kept as uploaded, since PNG and JPEG are already compressed. With `root` the
+    originals are files under root/<first two hex digits>/<sha256>, e.g. on a shared drive;
+    without it they go to the ScanBlob table. Either way an identical upload is stored once.
+    A small JPEG thumbnail is made at import and stored with the ScanDocument row, so
+    listing the scans of a PO never reads an original.
+    """
+
+    def __init__(self, db_handler, root=None):
+        self.db_handler = db_handler
+        self.root = root
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def add(self, po_number, data, image_name=None, image=None):
+        """Store the bytes of a scan for a PO; `image` is the decoded BGR array if the caller has it."""
+        if image is None:
+            # Only the thumbnail needs pixels, so a large scan is not decoded at full size
+            image, width, height = decode_for_thumbnail(data)
+        else:
+            height, width = image.shape[:2]
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self.root is not None:
+            self.write_file(sha256, data)
+        self.db_handler.add_scan_document(
+            po_number, sha256, image_name, width, height, len(data), make_thumbnail(image),
+            data=data if self.root is None else None
+        )
+        return sha256
+
+    def add_file(self, po_number, image_path, image=None):
+        with open(image_path, "rb") as f:
+            data = f.read()
+        return self.add(po_number, data, os.path.basename(image_path), image)
+
+    def write_file(self, sha256, data):
+        path = self.path(sha256)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name first so a reader never sees half a file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+            f.write(data)
+            temporary_path = f.name
+        os.replace(temporary_path, path)
+
+    def documents(self, po_number):
+        """The scans stored for a PO, each with its JPEG `thumbnail` bytes."""
+        return self.db_handler.get_scan_documents(po_number)
+
+    def load_image(self, document):
+        """Decode the full-resolution original of a document into a BGR array.
+
+        Files are memory-mapped, so the compressed bytes are decoded straight from the page
+        cache instead of being copied into memory first.
+        """
+        import cv2
+        import numpy
+
+        if self.root is not None and os.path.exists(self.path(document['sha256'])):
+            with open(self.path(document['sha256']), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                buffer = numpy.frombuffer(mapped, numpy.uint8)
+                image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+                del buffer  # The map cannot be closed while an array still points into it
+            finally:
+                mapped.close()
+        else:
+            data = self.db_handler.get_scan_blob(document['sha256'])
+            if data is None:
+                raise FileNotFoundError(f"The original of {document['image_name'] or document['sha256']} is not stored.")
+            image = cv2.imdecode(numpy.frombuffer(data, numpy.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Image could not be loaded.")
+        return image
@@ -0,0 +1,190 @@
+import threading
+
+
+def perceptual_hash(gray_image):
+    """64-bit DCT perceptual hash of a grayscale image.
+
+    Rescans, resized or recompressed copies of the same page differ in only a few bits, so
+    the Hamming distance between two hashes measures how alike the images look.
+    """
+    import cv2
+    import numpy
+
+    small = cv2.resize(gray_image, (32, 32), interpolation=cv2.INTER_AREA).astype(numpy.float32)
+    low_frequencies = cv2.dct(small)[:8, :8].flatten()
+    bits = low_frequencies > numpy.median(low_frequencies[1:])  # The DC term only says how bright the page is
+    return int.from_bytes(numpy.packbits(bits).tobytes(), "big")
+
+
+def skew_angle(ink, max_angle=3.0):
+    """Rotation in degrees that levels the text lines of a binarized page.
+
+    Level lines give the sharpest profile of row sums, so a coarse search in quarter degrees
+    is refined in steps of 0.05 degrees on a copy about 1000 pixels wide.
+    """
+    import cv2
+    import numpy
+
+    scale = min(1.0, 1000 / ink.shape[1])
+    small = cv2.resize(ink, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = small.shape
+
+    def sharpness(angle):
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        rows = cv2.warpAffine(small, rotation, (width, height)).sum(axis=1, dtype=numpy.float64)
+        return numpy.square(numpy.diff(rows)).sum()
+
+    coarse = max(numpy.arange(-max_angle, max_angle + 0.01, 0.25), key=sharpness)
+    return float(max(numpy.arange(coarse - 0.2, coarse + 0.21, 0.05), key=sharpness))
+
+
+def ink_bounds(profile, trim=0.005):
+    """First and last index of a row or column ink profile, ignoring the outer 0.5% of the ink (specks)."""
+    import numpy
+
+    cumulative = numpy.cumsum(profile, dtype=numpy.float64) / max(float(profile.sum()), 1.0)
+    return int(numpy.searchsorted(cumulative, trim)), int(numpy.searchsorted(cumulative, 1 - trim)) + 1
+
+
+def table_hash(gray_image):
+    """256-bit perceptual hash of the item table on a page, used to confirm perceptual_hash matches.
+
+    POs printed from one template share their layout, so the whole-page hashes of different
+    POs are often only a few bits apart. This hash levels the page, crops it to the band
+    between the first and last full-width rule (the table) and keeps 16x16 DCT terms of a
+    64x64 copy of that band, so the rows of the table decide the bits. See
+    benchmarks/hash_calibration.py for the distances of rescans and of distinct pages.
+    """
+    import cv2
+    import numpy
+
+    ink = cv2.threshold(gray_image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    height, width = ink.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), skew_angle(ink), 1.0)
+    ink = cv2.warpAffine(ink, rotation, (width, height))
+
+    rules = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (width // 4, 1)))
+    rows = numpy.flatnonzero(rules.any(axis=1))
+    if len(rows) >= 2:  # No ruled table: hash the whole printed area
+        ink = ink[rows[0]:rows[-1] + 1]
+    top, bottom = ink_bounds(ink.sum(axis=1))
+    left, right = ink_bounds(ink.sum(axis=0))
+
+    small = cv2.resize(ink[top:bottom, left:right], (64, 64), interpolation=cv2.INTER_AREA).astype(numpy.float32)
+    low_frequencies = cv2.dct(small)[:16, :16].flatten()
+    bits = low_frequencies > numpy.median(low_frequencies[1:])
+    return int.from_bytes(numpy.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """Multi-index hashing of 64-bit hashes for Hamming-radius search.
+
+    Each hash is split into `chunks` substrings with a dict per substring. Two hashes within
+    `max_distance` bits agree to within max_distance // chunks bits on at least one substring,
+    so a search probes only those near variants of each substring and checks the candidates
+    exactly. The cost depends on the radius, not on how many hashes are stored.
+    """
+
+    def __init__(self, max_distance=8, bits=64, chunks=4):
+        self.max_distance = max_distance
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.tables = [{} for _ in range(chunks)]  # Substring -> set of full hashes
+        self.values = {}  # Full hash -> values stored under it
+        self.size = 0
+        # Every flip pattern of up to max_distance // chunks bits within one substring
+        self.probes = [0]
+        for _ in range(max_distance // chunks):
+            self.probes = sorted(set(self.probes) | {probe | (1 << bit) for probe in self.probes for bit in range(self.chunk_bits)})
+
+    def __len__(self):
+        return self.size
+
+    def substrings(self, value_hash):
+        mask = (1 << self.chunk_bits) - 1
+        return [(value_hash >> (index * self.chunk_bits)) & mask for index in range(self.chunks)]
+
+    def add(self, value_hash, value):
+        self.size += 1
+        if value_hash not in self.values:
+            self.values[value_hash] = []
+            for table, substring in zip(self.tables, self.substrings(value_hash)):
+                table.setdefault(substring, set()).add(value_hash)
+        self.values[value_hash].append(value)
+
+    def search(self, value_hash):
+        """Return (distance, hash, value) for every value within max_distance, closest first."""
+        candidates = set()
+        for table, substring in zip(self.tables, self.substrings(value_hash)):
+            for probe in self.probes:
+                candidates.update(table.get(substring ^ probe, ()))
+
+        matches = []
+        for candidate in candidates:
+            distance = hamming_distance(value_hash, candidate)
+            if distance <= self.max_distance:
+                matches.extend((distance, candidate, value) for value in self.values[candidate])
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class ImageHashIndex:
+    """In-memory index over the ImageHash table, used to flag rescans of POs already processed.
+
+    The index is filled from the database on first use and picks up hashes added by other
+    clients or OCR workers incrementally before each lookup; once hashes it holds are deleted
+    with their POs it is rebuilt, so a new scan of a deleted PO is not flagged. Page hashes
+    within `max_distance` bits are only candidates: a candidate counts as a duplicate when its
+    table hash is within `table_max_distance` of 256 bits too. Rows stored before table hashes existed have none
+    and are reported on the page hash alone.
+
+    On rendered pages (benchmarks/hash_calibration.py) rescans were up to 12 page hash bits
+    and 32 table hash bits apart, distinct POs on one template 0-22 and at least 52.
+    """
+
+    def __init__(self, db_handler, max_distance=14, table_max_distance=42):
+        self.db_handler = db_handler
+        self.hashes = MultiIndexHash(max_distance)  # max_distance is in bits out of 64
+        self.table_max_distance = table_max_distance
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            if len(self.hashes) and self.db_handler.count_image_hashes(self.last_id) < len(self.hashes):
+                # Some of the rows read so far were deleted; MultiIndexHash has no removal, so start over
+                self.hashes = MultiIndexHash(self.hashes.max_distance)
+                self.last_id = 0
+            for row in self.db_handler.get_image_hashes(self.last_id) or []:
+                self.hashes.add(int(row['phash'], 16), {
+                    "po_number": row['po_number'], "image_name": row['image_name'],
+                    "table_hash": int(row['table_hash'], 16) if row['table_hash'] else None
+                })
+                self.last_id = row['id']
+
+    def find_duplicates(self, image_hash, table_hash=None):
+        """Return [{po_number, image_name, distance, table_distance}] of processed scans that look like this one, closest first.
+
+        table_distance is None when either scan has no table hash.
+        """
+        self.refresh()
+        with self.lock:
+            matches = self.hashes.search(image_hash)
+        duplicates = []
+        for distance, _, value in matches:
+            table_distance = None
+            if table_hash is not None and value["table_hash"] is not None:
+                table_distance = hamming_distance(table_hash, value["table_hash"])
+                if table_distance > self.table_max_distance:
+                    continue  # Same template, different PO
+            duplicates.append({"po_number": value["po_number"], "image_name": value["image_name"],
+                               "distance": distance, "table_distance": table_distance})
+        return duplicates
+
+    def add(self, image_hash, po_number, image_name=None, table_hash=None):
+        """Record a processed scan; it becomes visible to lookups on the next refresh."""
+        self.db_handler.add_image_hash(image_hash, po_number, image_name, table_hash)
@@ -1,15 +1,46 @@
 import re
+import tracemalloc
+from contextlib import nullcontext
 import pytesseract
+from POManager.document_store import image_size
 from POManager.item import Item
 from POManager.purchase_order import PurchaseOrder
 import cv2
 
+# Tokens that read as a quantity with a letter tesseract mistook for a digit, e.g. "1O" or "l2"
+QTY_MISREAD = re.compile(r'(?=.*\d)[\dOoIlS|]+')
+
+
 class ImageProcessor:
-    def __init__(self, image_path):
+    FAST_SCALE = 0.5  # Resolution of the first, adaptive OCR pass
+    MIN_CONFIDENCE = 70  # Table lines with a word below this tesseract confidence are re-OCR'd
+    RESCAN_SCALE = 2.0  # Upscaling of the lines that are re-OCR'd
+    RESCAN_PADDING = 6  # Pixels kept around a line's bounding box
+    RESCAN_CONFIG = "--psm 7"  # Treat the crop as a single text line
+    LOW_MEMORY_MAX_PIXELS = 20_000_000  # Larger scans are decoded at 1/2, 1/4 or 1/8 size in low-memory mode
+    TILE_HEIGHT = 1024  # Rows OCR'd at a time in low-memory mode
+    TILE_OVERLAP = 96  # Rows added above and below a tile so no text line is cut; taller than a line of text
+
+    def __init__(self, image_path, profiler=None, part_catalog=None, adaptive=False, low_memory=False):
         self.image_path = image_path
         self.image = None
         self.gray_image = None
         self.text = ""
+        self.profiler = profiler  # Optional StageProfiler timing each pipeline stage
+        self.part_catalog = part_catalog  # Optional PartCatalog checking the extracted part numbers
+        self.adaptive = adaptive  # Fast low-resolution pass, re-OCR only the doubtful table lines
+        # Decode straight to (reduced) grayscale, OCR in tiles and drop the pixels once the text is read
+        self.low_memory = low_memory
+        self.ocr_stats = {}
+        self.memory_stats = {}  # Low-memory mode: decode reduction, tiles and peak traced bytes of the image
+        self.image_hash = None
+        self.image_table_hash = None
+
+    def stage(self, name):
+        """Context manager timing a pipeline stage when a profiler is attached."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, self.image_path)
 
     def load_image(self):
         """Load the image from the file path."""
@@ -18,6 +49,37 @@ class ImageProcessor:
             raise ValueError("Image could not be loaded.")
         return self.image
 
+    def load_gray_image(self):
+        """Decode the scan straight to grayscale, reduced by a power of two when it is very large.
+
+        No colour copy is made. JPEGs are scaled down inside the decoder, so the full-size
+        page never exists in memory.
+        """
+        size = image_size(self.image_path)
+        reduction = 1
+        if size is not None:
+            while reduction < 8 and size[0] * size[1] / reduction ** 2 > self.LOW_MEMORY_MAX_PIXELS:
+                reduction *= 2
+        flags = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+        self.gray_image = cv2.imread(self.image_path, flags[reduction])
+        if self.gray_image is None:
+            raise ValueError("Image could not be loaded.")
+        height, width = self.gray_image.shape[:2]
+        if size is None and height * width > self.LOW_MEMORY_MAX_PIXELS:
+            # Size unknown before decoding (e.g. TIFF); shrink now so only the small copy is kept
+            scale = (self.LOW_MEMORY_MAX_PIXELS / (height * width)) ** 0.5
+            self.gray_image = cv2.resize(self.gray_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            reduction = 1 / scale
+        self.memory_stats["reduction"] = reduction
+        self.memory_stats["pixels"] = self.gray_image.size
+        return self.gray_image
+
+    def release(self):
+        """Drop the decoded page so its memory is freed before the next scan is loaded."""
+        self.image = None
+        self.gray_image = None
+
     def convert_to_gray(self):
         """Convert the image to grayscale."""
         if self.image is None:
@@ -29,14 +91,187 @@ class ImageProcessor:
         """Extract text from the grayscale image using OCR."""
         if self.gray_image is None:
             raise ValueError("Image not processed into grayscale.")
-        self.text = pytesseract.image_to_string(self.gray_image)
+        if self.low_memory:
+            self.text = "\n".join(line["text"] for line in self.ocr_lines(1))
+        else:
+            self.text = pytesseract.image_to_string(self.gray_image)
         return self.text
 
+    def extract_text_adaptive(self):
+        """Extract text with a fast low-resolution pass, re-OCR'ing only the table lines it is unsure of."""
+        if self.gray_image is None:
+            raise ValueError("Image not processed into grayscale.")
+        with self.stage("tesseract"):
+            lines = self.ocr_lines(self.FAST_SCALE)
+        table_lines = self.table_lines(lines)
+        rescan = [line for line in table_lines if self.needs_rescan(line)]
+        with self.stage("rescan"):
+            for line in rescan:
+                line["text"] = self.rescan_line(line) or line["text"]
+
+        self.ocr_stats = {"lines": len(lines), "table_lines": len(table_lines), "rescanned": len(rescan)}
+        self.text = "\n".join(line["text"] for line in lines)
+        return self.text
+
+    def ocr_lines(self, scale):
+        """OCR the page at `scale`; returns its lines with word confidences and full-resolution boxes.
+
+        In low-memory mode the page is OCR'd in horizontal tiles, so the scaled copy and the
+        image tesseract is handed are only a tile in size. Tiles overlap by TILE_OVERLAP rows
+        and each keeps only the lines starting in its own rows, so a line is read once, whole.
+        """
+        if not self.low_memory:
+            return self.ocr_region_lines(self.gray_image, scale)
+        height = self.gray_image.shape[0]
+        lines = []
+        tiles = 0
+        for start in range(0, height, self.TILE_HEIGHT):
+            top = max(0, start - self.TILE_OVERLAP)
+            tile = self.gray_image[top:start + self.TILE_HEIGHT + self.TILE_OVERLAP]  # A view; nothing is copied
+            lines.extend(line for line in self.ocr_region_lines(tile, scale, top)
+                         if start <= line["box"][1] < start + self.TILE_HEIGHT)
+            tiles += 1
+        self.memory_stats["tiles"] = self.memory_stats.get("tiles", 0) + tiles
+        return lines
+
+    def ocr_region_lines(self, image, scale, offset=0):
+        """OCR `image`, the rows of the page from `offset` on, and return its lines in page coordinates."""
+        if scale != 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        del image  # The scaled copy is not needed for the bookkeeping below
+
+        lines = {}
+        for index, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+            left = data["left"][index] / scale
+            top = data["top"][index] / scale + offset
+            right = left + data["width"][index] / scale
+            bottom = top + data["height"][index] / scale
+            line = lines.get(key)
+            if line is None:
+                line = lines[key] = {"words": [], "confidences": [], "box": [left, top, right, bottom]}
+            line["words"].append(word)
+            line["confidences"].append(float(data["conf"][index]))
+            box = line["box"]
+            line["box"] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+
+        for line in lines.values():
+            line["text"] = " ".join(line["words"])
+        return list(lines.values())
+
+    def table_lines(self, lines):
+        """The lines from the table header to the amount line, or every line if they are not found."""
+        start = next((index for index, line in enumerate(lines) if "Nomen" in line["text"]), None)
+        end = next((index for index in range(len(lines) - 1, -1, -1) if "Amount" in lines[index]["text"]), None)
+        if start is None or end is None or end < start:
+            return lines
+        return lines[start:end + 1]
+
+    def needs_rescan(self, line):
+        """True if a word is below MIN_CONFIDENCE or would not parse (misread quantity, unparseable rate)."""
+        if min(line["confidences"]) < self.MIN_CONFIDENCE:
+            return True
+        for token in line["words"]:
+            if '-' in token:
+                continue  # Part numbers
+            if QTY_MISREAD.fullmatch(token) and not token.isdigit():
+                return True
+            if ('.' in token or ',' in token) and any(char.isdigit() for char in token):
+                try:
+                    float(token.replace(',', ''))
+                except ValueError:
+                    return True
+        return False
+
+    def rescan_line(self, line):
+        """Re-OCR one line from the full-resolution image, upscaled and binarised, as a single text line."""
+        height, width = self.gray_image.shape[:2]
+        left, top, right, bottom = line["box"]
+        crop = self.gray_image[max(0, int(top) - self.RESCAN_PADDING):min(height, int(bottom) + self.RESCAN_PADDING),
+                               max(0, int(left) - self.RESCAN_PADDING):min(width, int(right) + self.RESCAN_PADDING)]
+        if crop.size == 0:
+            return None
+        crop = cv2.resize(crop, None, fx=self.RESCAN_SCALE, fy=self.RESCAN_SCALE, interpolation=cv2.INTER_CUBIC)
+        crop = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        return " ".join(pytesseract.image_to_string(crop, config=self.RESCAN_CONFIG).split())
+
+    def perceptual_hash(self):
+        """Return the 64-bit perceptual hash of the page, loading the image if needed."""
+        from POManager.image_hash import perceptual_hash
+        if self.image_hash is not None:
+            return self.image_hash
+        if self.gray_image is None:
+            self.load()
+        with self.stage("phash"):
+            self.image_hash = perceptual_hash(self.gray_image)
+        return self.image_hash
+
+    def table_hash(self):
+        """Return the 256-bit hash of the page's item table, which tells POs on one template apart."""
+        from POManager.image_hash import table_hash
+        if self.image_table_hash is not None:
+            return self.image_table_hash
+        if self.gray_image is None:
+            self.load()
+        with self.stage("table_hash"):
+            self.image_table_hash = table_hash(self.gray_image)
+        return self.image_table_hash
+
+    def load(self):
+        """Load the page and convert it to grayscale, or decode it straight to grayscale in low-memory mode."""
+        if self.low_memory:
+            with self.stage("load"):
+                self.load_gray_image()
+            return
+        with self.stage("load"):
+            self.load_image()
+        with self.stage("grayscale"):
+            self.convert_to_gray()
+
     def process_image(self):
-        """Process the image and return extracted text."""
-        self.load_image()
-        self.convert_to_gray()
-        return self.extract_text()
+        """Process the image and return extracted text.
+
+        In low-memory mode the decoded page is released afterwards, so hash it first if the
+        hash is needed, and memory_stats gets the peak bytes traced while processing it. That
+        covers the buffers of this process, not those of the tesseract process, which the
+        tiling keeps small.
+        """
+        if not self.low_memory:
+            return self.extract_page_text()
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        # A page hashed before is not part of the traced difference below
+        held = self.gray_image.nbytes if self.gray_image is not None else 0
+        # A StageProfiler tracking memory resets the peak per stage, so its records are used instead
+        profiled = self.profiler is not None and self.profiler.track_memory
+        first_record = len(self.profiler.records) if profiled else 0
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            return self.extract_page_text()
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            if profiled:
+                peak = max([peak] + [record["traced_peak"] for record in self.profiler.records[first_record:]
+                                     if record["traced_peak"] is not None])
+            self.memory_stats["peak_bytes"] = peak - baseline + held
+            if started_tracing:
+                tracemalloc.stop()
+            self.release()
+
+    def extract_page_text(self):
+        # Already loaded when the scan was hashed for the duplicate check
+        if self.gray_image is None:
+            self.load()
+        if self.adaptive:
+            return self.extract_text_adaptive()
+        with self.stage("tesseract"):
+            return self.extract_text()
 
     def extract_table_section(self, text):
         """Extracts the relevant section of the table from the OCR text."""
@@ -102,13 +337,29 @@ class ImageProcessor:
             current_item['Nomenclature'] = ' '.join(self.clean_nomenclature(nomenclature_tokens)).strip()
             extracted_items.append(current_item)
 
+        if self.part_catalog is not None:
+            for item in extracted_items:
+                self.check_part_number(item)
+
         return extracted_items
 
+    def check_part_number(self, item):
+        """Replace an OCR'd part number by the catalog part it most likely is; the OCR text is kept."""
+        if item.get("Cart Part No") in (None, "Total:-"):
+            return
+        part_no, status = self.part_catalog.correct(item["Cart Part No"], item.get("Nomenclature"))
+        item["Part Status"] = status
+        if status == "corrected":
+            item["OCR Cart Part No"] = item["Cart Part No"]
+            item["Cart Part No"] = part_no
+
     # Function to process the image, extract details, and return the items
     def process_and_extract_items(self,po_number):
         text = self.process_image()
-        table_text = self.extract_table_section(text)
-        extracted_items = self.extract_item_details(table_text)
+        with self.stage("table_extraction"):
+            table_text = self.extract_table_section(text)
+        with self.stage("parsing"):
+            extracted_items = self.extract_item_details(table_text)
 
         purchase_order = PurchaseOrder(po_number)
         items = []
@@ -125,6 +376,8 @@ class ImageProcessor:
                 "nomenclature": item.get("Nomenclature")
             }
             new_item = Item(**item_data)
+            new_item.part_status = item.get("Part Status")
+            new_item.ocr_cart_part_no = item.get("OCR Cart Part No")
             purchase_order.add_item(new_item)
             items.append(new_item)
 
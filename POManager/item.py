@@ -1,4 +1,7 @@
 class Item:
+    # Column order of the tuple rows accepted by from_row
+    ROW_COLUMNS = ("id", "cart_part_no", "country_of_origin", "a_unit", "qty", "rate_include_gst", "nomenclature")
+
     def __init__(self, cart_part_no, country_of_origin=None, a_unit=None, qty=None, rate_include_gst=None, nomenclature=None):
         self.cart_part_no = cart_part_no
         self.country_of_origin = country_of_origin
@@ -7,6 +10,17 @@ class Item:
         self.rate_include_gst = rate_include_gst
         self.nomenclature = nomenclature
         self.id  = None
+        # Result of checking an OCR'd part number against the PartCatalog: exact, corrected,
+        # ambiguous or unknown; None for items that were not OCR'd. Not stored in the Item table.
+        self.part_status = None
+        self.ocr_cart_part_no = None  # The part number as OCR read it, when the catalog corrected it
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an Item from a tuple row in ROW_COLUMNS order."""
+        item = cls(*row[1:])
+        item.id = row[0]
+        return item
 
     def to_dict(self):
         return {
@@ -16,10 +30,23 @@ class Item:
             "A/Unit": self.a_unit,
             "Qty": self.qty,
             "Rate Include GST": self.rate_include_gst,
-            "Nomenclature": self.nomenclature
+            "Nomenclature": self.nomenclature,
+            "Part Status": self.part_status,
+            "OCR Cart Part No": self.ocr_cart_part_no
         }
+
+    def needs_review(self):
+        """True if the OCR'd part number was changed by the catalog or could not be matched to it."""
+        return self.part_status in ("corrected", "ambiguous", "unknown")
     
     def update_from_db(self, db_handler):
         item_data = db_handler.get_item_status_by_item_id(self.id)
         if item_data:
-            self.remaining_qty = item_data[0]['remaining_qty']
\ No newline at end of file
+            self.apply_status(item_data[0])
+
+    def apply_status(self, status):
+        """Copy the quantities of an ItemStatus row written by the reconciliation job."""
+        self.remaining_qty = status['remaining_qty']
+        self.delivered_qty = status.get('delivered_qty')
+        self.approved_qty = status.get('approved_qty')
+        self.rejected_qty = status.get('rejected_qty')
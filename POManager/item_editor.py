@@ -0,0 +1,249 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor, QDoubleValidator, QIntValidator
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QMessageBox, QPushButton,
+    QStyledItemDelegate, QTableView, QVBoxLayout
+)
+
+# (header, Item attribute) for every editable column
+ITEM_COLUMNS = [
+    ("Cart Part No", "cart_part_no"),
+    ("Country of Origin", "country_of_origin"),
+    ("A/Unit", "a_unit"),
+    ("Qty", "qty"),
+    ("Rate Include GST", "rate_include_gst"),
+    ("Nomenclature", "nomenclature"),
+]
+PART_COLUMN = 0
+QTY_COLUMN = 3
+RATE_COLUMN = 4
+
+# Background of part numbers the catalog corrected, and of those it could not match
+PART_STATUS_COLOURS = {"corrected": QColor("#fff4cc"), "ambiguous": QColor("#fde2e1"), "unknown": QColor("#fde2e1")}
+PART_STATUS_TIPS = {
+    "corrected": "OCR read {ocr}; corrected to a known part number. Check it against the scan.",
+    "ambiguous": "Several known part numbers are one OCR error away from this one. Check it against the scan.",
+    "unknown": "Not a known part number. Check it against the scan.",
+}
+
+
+def line_amount(item):
+    if item.qty is None or item.rate_include_gst is None:
+        return 0.0
+    return item.qty * float(item.rate_include_gst)
+
+
+class ItemTableModel(QAbstractTableModel):
+    """Table model over a list of Item objects.
+
+    Edits are validated and written straight to the Item, the changed rows are remembered in
+    `dirty_rows`, and the PO totals are adjusted by the difference of the edited row only.
+    """
+
+    totals_changed = pyqtSignal(int, float)
+    validation_failed = pyqtSignal(str)
+    review_changed = pyqtSignal(int)
+
+    def __init__(self, items, parent=None):
+        super().__init__(parent)
+        self.items = items
+        self.dirty_rows = set()
+        self.total_qty = 0
+        self.total_amount = 0.0
+        for item in items:
+            self.total_qty += item.qty or 0
+            self.total_amount += line_amount(item)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ITEM_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return ITEM_COLUMNS[section][0]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = getattr(self.items[index.row()], ITEM_COLUMNS[index.column()][1])
+        if role == Qt.DisplayRole:
+            if value is None:
+                return ""
+            if index.column() == RATE_COLUMN:
+                return f"{float(value):.2f}"
+            return str(value)
+        if role == Qt.EditRole:
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole and index.column() in (QTY_COLUMN, RATE_COLUMN):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if index.column() == PART_COLUMN and self.items[index.row()].needs_review():
+            item = self.items[index.row()]
+            if role == Qt.BackgroundRole:
+                return PART_STATUS_COLOURS[item.part_status]
+            if role == Qt.ToolTipRole:
+                return PART_STATUS_TIPS[item.part_status].format(ocr=item.ocr_cart_part_no)
+        return None
+
+    def review_count(self):
+        """Number of OCR'd part numbers the clerk should check against the scan."""
+        return sum(1 for item in self.items if item.needs_review())
+
+    def parse(self, column, text):
+        """Convert editor text to the Item value for a column; raises ValueError when invalid."""
+        text = text.strip()
+        if column == QTY_COLUMN:
+            value = int(text)
+            if value <= 0:
+                raise ValueError("Qty must be a positive value.")
+            return value
+        if column == RATE_COLUMN:
+            value = float(text.replace(',', ''))
+            if value <= 0:
+                raise ValueError("Rate Include GST must be a positive value.")
+            return value
+        return text
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        try:
+            value = self.parse(index.column(), str(value))
+        except ValueError as e:
+            self.validation_failed.emit(f"Invalid input: {e}")
+            return False
+
+        item = self.items[index.row()]
+        attribute = ITEM_COLUMNS[index.column()][1]
+        if getattr(item, attribute) == value:
+            return True
+
+        old_qty = item.qty or 0
+        old_amount = line_amount(item)
+        setattr(item, attribute, value)
+        if index.column() == PART_COLUMN:
+            item.part_status = None  # Checked by the clerk
+            self.review_changed.emit(self.review_count())
+        self.dirty_rows.add(index.row())
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+
+        if index.column() in (QTY_COLUMN, RATE_COLUMN):
+            self.total_qty += (item.qty or 0) - old_qty
+            self.total_amount += line_amount(item) - old_amount
+            self.totals_changed.emit(self.total_qty, self.total_amount)
+        return True
+
+    def dirty_items(self):
+        return [self.items[row] for row in sorted(self.dirty_rows)]
+
+
+class ItemDelegate(QStyledItemDelegate):
+    """Line edit with a numeric validator for the Qty and Rate columns."""
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        if index.column() == QTY_COLUMN:
+            editor.setValidator(QIntValidator(1, 2 ** 31 - 1, editor))
+        elif index.column() == RATE_COLUMN:
+            validator = QDoubleValidator(0.01, 1e12, 2, editor)
+            validator.setNotation(QDoubleValidator.StandardNotation)
+            editor.setValidator(validator)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
+
+
+class ItemEditorDialog(QDialog):
+    """Inline item editor for a purchase order that stays responsive with thousands of lines."""
+
+    def __init__(self, db_handler, purchase_order, items, add, parent=None, document_store=None):
+        super().__init__(parent)
+        self.db_handler = db_handler
+        self.purchase_order = purchase_order
+        self.add = add  # True for a new PO whose items are not in the database yet
+        self.setWindowTitle(f"Edit Items for PO {purchase_order.po_number}")
+        self.resize(800, 600)
+
+        layout = QVBoxLayout(self)
+
+        self.model = ItemTableModel(items, self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setItemDelegate(ItemDelegate(self.table))
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setEditTriggers(QTableView.DoubleClicked | QTableView.EditKeyPressed | QTableView.AnyKeyPressed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        # Fixed row heights keep the view from measuring every row of a large PO
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setVisible(False)
+
+        # Thumbnails of the PO's original scans beside the items, to check lines against
+        documents = document_store.documents(purchase_order.po_number) if document_store is not None else []
+        if documents:
+            from POManager.scan_viewer import ScanThumbnails
+            table_layout = QHBoxLayout()
+            table_layout.addWidget(self.table, 1)
+            table_layout.addWidget(ScanThumbnails(document_store, documents, self))
+            layout.addLayout(table_layout)
+            self.resize(1150, 600)
+        else:
+            layout.addWidget(self.table)
+
+        self.totals_label = QLabel(self)
+        self.review_label = QLabel(self)
+        self.status_label = QLabel(self)
+        self.status_label.setStyleSheet("color: #b00020;")
+        layout.addWidget(self.totals_label)
+        layout.addWidget(self.review_label)
+        layout.addWidget(self.status_label)
+        self.show_totals(self.model.total_qty, self.model.total_amount)
+        self.show_review_count(self.model.review_count())
+        self.model.review_changed.connect(self.show_review_count)
+        self.model.totals_changed.connect(self.show_totals)
+        self.model.validation_failed.connect(self.status_label.setText)
+        self.model.dataChanged.connect(lambda *args: self.status_label.clear())
+
+        button_layout = QHBoxLayout()
+        save_button = QPushButton("Save Items and PO")
+        save_button.clicked.connect(self.save_items_and_po)
+        button_layout.addWidget(save_button)
+        layout.addLayout(button_layout)
+
+    def show_totals(self, total_qty, total_amount):
+        self.totals_label.setText(f"Total Qty: {total_qty}    Total Amount: {total_amount:,.2f}")
+
+    def show_review_count(self, count):
+        """Point the clerk at the highlighted part numbers the catalog corrected or did not know."""
+        self.review_label.setVisible(count > 0)
+        self.review_label.setText(f"{count} highlighted part number(s) were corrected or are not in the part "
+                                  f"catalog; hover for details and check them against the scan.")
+
+    def save_items_and_po(self):
+        """Save the PO totals and the items; for an existing PO only the edited rows are written."""
+        purchase_order = self.purchase_order
+        purchase_order.total_qty = self.model.total_qty
+        purchase_order.total_amount = round(self.model.total_amount, 2)
+        purchase_order.items = self.model.items
+
+        try:
+            if self.add:
+                self.db_handler.add_purchase_order_items(purchase_order)
+                self.db_handler.update_purchase_order(purchase_order)
+            else:
+                self.db_handler.update_purchase_order(purchase_order)
+                self.db_handler.update_purchase_order_items(purchase_order, self.model.dirty_items())
+            self.model.dirty_rows.clear()
+
+            QMessageBox.information(self, "Success", "Purchase Order and Items saved successfully!")
+            self.accept()  # Close the dialog
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error saving items and PO: {str(e)}")
@@ -0,0 +1,170 @@
+import argparse
+import cProfile
+import io
+import pstats
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from POManager.query_instrumentation import percentile
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _rss_peak_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+
+
+class StageProfiler:
+    """Collects wall time, CPU time and peak memory for each stage of the OCR pipeline.
+
+    Pass an instance to ImageProcessor(profiler=...) and reuse it across a batch; report()
+    then aggregates over every image processed. Hooks are called with each stage record.
+    """
+
+    def __init__(self, track_memory=False, profile=False, hooks=None):
+        self.track_memory = track_memory  # tracemalloc peak per stage; slows numpy-heavy stages down
+        self.profile = profile  # Run cProfile across all stages
+        self.hooks = list(hooks or [])
+        self.records = []
+        self.profiler = cProfile.Profile() if profile else None
+        self._started_tracemalloc = False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    @contextmanager
+    def stage(self, name, image=None):
+        """Time one pipeline stage for one image."""
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        if self.profiler is not None:
+            self.profiler.enable()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if self.profiler is not None:
+                self.profiler.disable()
+
+            record = {"image": image, "stage": name, "wall": wall, "cpu": cpu, "peak_memory": None,
+                      "traced_peak": None, "rss_peak": _rss_peak_bytes()}
+            if self.track_memory:
+                record["traced_peak"] = tracemalloc.get_traced_memory()[1]
+                record["peak_memory"] = record["traced_peak"] - memory_before
+            self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+    def report(self):
+        """Aggregate the recorded stages per stage name and per image."""
+        stages = {}
+        images = {}
+        for record in self.records:
+            stages.setdefault(record["stage"], []).append(record)
+            image = images.setdefault(record["image"], {"wall": 0.0, "cpu": 0.0, "peak_memory": None})
+            image["wall"] += record["wall"]
+            image["cpu"] += record["cpu"]
+            if record["peak_memory"] is not None:
+                image["peak_memory"] = max(image["peak_memory"] or 0, record["peak_memory"])
+
+        stage_report = {}
+        for name, records in stages.items():
+            walls = [record["wall"] for record in records]
+            peaks = [record["peak_memory"] for record in records if record["peak_memory"] is not None]
+            stage_report[name] = {
+                "count": len(records),
+                "wall_total": sum(walls),
+                "wall_mean": statistics.mean(walls),
+                "wall_p95": percentile(walls, 0.95),
+                "cpu_total": sum(record["cpu"] for record in records),
+                "peak_memory_max": max(peaks) if peaks else None,
+            }
+
+        total_wall = sum(stage["wall_total"] for stage in stage_report.values())
+        for stage in stage_report.values():
+            stage["share"] = stage["wall_total"] / total_wall if total_wall else 0.0
+
+        return {"images": len(images), "wall_total": total_wall, "stages": stage_report, "per_image": images,
+                "rss_peak": _rss_peak_bytes()}
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"{report['images']} image(s), {report['wall_total']:.2f}s total",
+                 f"{'stage':<18} {'count':>6} {'wall':>9} {'mean':>9} {'p95':>9} {'cpu':>9} {'share':>7} {'peak MB':>9}"]
+        for name, stage in report["stages"].items():
+            peak = f"{stage['peak_memory_max'] / 2 ** 20:.1f}" if stage["peak_memory_max"] is not None else "-"
+            lines.append(
+                f"{name:<18} {stage['count']:>6} {stage['wall_total']:>8.2f}s {stage['wall_mean']:>8.3f}s "
+                f"{stage['wall_p95']:>8.3f}s {stage['cpu_total']:>8.2f}s {stage['share']:>6.0%} {peak:>9}"
+            )
+        return "\n".join(lines)
+
+    def profile_stats(self, sort="cumulative", limit=30):
+        """Return the cProfile output as text, or None if profiling is off."""
+        if self.profiler is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump_profile(self, path):
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+def main(argv=None):
+    """Profile the OCR pipeline over a batch of scans, e.g. `python -m POManager.ocr_profiler scans/*.tif --memory`."""
+    from POManager.image_processor import ImageProcessor
+
+    parser = argparse.ArgumentParser(description="Per-stage timing of the OCR pipeline")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--memory", action="store_true", help="Track peak Python/numpy memory per stage")
+    parser.add_argument("--cprofile", metavar="PATH", help="Write cProfile stats to PATH")
+    parser.add_argument("--adaptive", action="store_true", help="Fast low-resolution pass with selective re-OCR")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Reduced grayscale decode and tiled OCR; prints the peak memory of each image")
+    args = parser.parse_args(argv)
+
+    profiler = StageProfiler(track_memory=args.memory, profile=bool(args.cprofile))
+    for image_path in args.images:
+        try:
+            processor = ImageProcessor(image_path, profiler=profiler, adaptive=args.adaptive, low_memory=args.low_memory)
+            processor.process_and_extract_items("PROFILE")
+            if args.low_memory:
+                stats = processor.memory_stats
+                print(f"{image_path}: peak {stats['peak_bytes'] / 2 ** 20:.1f} MB, decoded at 1/{stats['reduction']:g}, "
+                      f"{stats['tiles']} tiles", file=sys.stderr)
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}", file=sys.stderr)
+    profiler.close()
+
+    print(profiler.format_report())
+    if args.cprofile:
+        profiler.dump_profile(args.cprofile)
+        print(profiler.profile_stats(limit=15))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+from POManager.cli import add_db_arguments, db_handler_from_args
+from POManager.part_catalog import PartCatalog
+from POManager.document_store import DocumentStore
+
+
+def extract_job_items(job, part_catalog=None, adaptive=False, low_memory=False):
+    """Run the OCR pipeline on the scan stored in a claimed job.
+
+    Returns (Items, (page hash, table hash), memory stats); the stats are only filled in low-memory mode.
+    """
+    from POManager.image_processor import ImageProcessor
+
+    suffix = os.path.splitext(job['image_name'] or "")[1] or ".png"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(job['image'])
+        image_path = f.name
+    try:
+        image_processor = ImageProcessor(image_path, part_catalog=part_catalog, adaptive=adaptive,
+                                         low_memory=low_memory)
+        # Low-memory processing releases the page
+        image_hashes = image_processor.perceptual_hash(), image_processor.table_hash()
+        with contextlib.redirect_stdout(io.StringIO()):  # The parser prints the whole table
+            items = image_processor.process_and_extract_items(job['po_number'])
+        return items, image_hashes, image_processor.memory_stats
+    finally:
+        os.remove(image_path)
+
+
+def store_scan(db_handler, document_store, job, image_hash, table_hash, worker):
+    """Keep the hash and the original of a completed job's scan.
+
+    The job's items are already stored, so a failure here is reported but does not fail the job.
+    """
+    try:
+        db_handler.add_image_hash(image_hash, job['po_number'], job['image_name'], table_hash)
+        document_store.add(job['po_number'], job['image'], job['image_name'])
+    except Exception as e:
+        db_handler.connection.rollback()
+        print(f"{worker}: job {job['id']} (PO {job['po_number']}) is done, but its scan was not stored: {e}")
+
+
+def run_worker(args):
+    """Claim and process OCR jobs until interrupted (or, with --exit-when-empty, until the queue is empty)."""
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        return
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    part_catalog = PartCatalog()
+    document_store = DocumentStore(db_handler, root=args.scan_dir)
+    started = time.monotonic()
+    last_report = started
+    processed = failed = 0
+    busy = 0.0
+    peak_bytes = 0  # Largest per-scan peak since the last report, in low-memory mode
+
+    try:
+        while True:
+            job = db_handler.claim_ocr_job(worker, lease_seconds=args.lease)
+            if job is None:
+                if args.exit_when_empty:
+                    break
+                time.sleep(args.poll)
+                continue
+
+            job_started = time.monotonic()
+            try:
+                part_catalog.refresh(db_handler)  # Picks up the parts of POs saved since the last job
+                items, (image_hash, table_hash), memory_stats = extract_job_items(
+                    job, part_catalog, args.adaptive_ocr, args.low_memory
+                )
+                peak_bytes = max(peak_bytes, memory_stats.get("peak_bytes") or 0)
+                completed = db_handler.complete_ocr_job(job['id'], worker, items)
+            except Exception as e:
+                db_handler.fail_ocr_job(job['id'], worker, str(e), retry_delay=args.retry_delay)
+                failed += 1
+                print(f"{worker}: job {job['id']} (PO {job['po_number']}) attempt {job['attempts']} failed: {e}")
+            else:
+                if completed:
+                    processed += 1
+                    store_scan(db_handler, document_store, job, image_hash, table_hash, worker)
+                else:
+                    print(f"{worker}: job {job['id']} (PO {job['po_number']}) was taken over by another worker")
+            busy += time.monotonic() - job_started
+
+            now = time.monotonic()
+            if now - last_report >= args.report_interval:
+                elapsed = now - started
+                memory = f", peak {peak_bytes / 2 ** 20:.0f} MB per scan" if args.low_memory else ""
+                print(f"{worker}: {processed} done, {failed} failed, {processed * 60 / elapsed:.1f} jobs/min, "
+                      f"{busy / max(processed + failed, 1):.2f}s per job, {busy / elapsed:.0%} busy{memory}")
+                last_report = now
+                peak_bytes = 0
+    except KeyboardInterrupt:
+        pass  # A job interrupted mid-way is picked up again once its lease expires
+    finally:
+        db_handler.close_connection()
+    print(f"{worker}: stopped after {processed} done, {failed} failed")
+
+
+def main(argv=None):
+    """Headless OCR workers, e.g. `python -m POManager.ocr_worker --workers 4`.
+
+    Each worker is a separate process with its own database connection, so capacity grows with
+    the number of workers (up to the CPU count of the machine running them). With --low-memory
+    each worker holds at most one reduced grayscale page and one OCR tile at a time, so
+    --workers times that bounds the RAM the workers use.
+    """
+    parser = argparse.ArgumentParser(description="Process the OCR job queue stored in the database")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--lease", type=int, default=300, help="Seconds a claimed job stays invisible to other workers")
+    parser.add_argument("--retry-delay", type=int, default=30, help="Seconds before a failed job is retried, times the attempt number")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between throughput reports")
+    parser.add_argument("--exit-when-empty", action="store_true", help="Stop once no job is runnable")
+    parser.add_argument("--adaptive-ocr", action="store_true",
+                        help="Fast low-resolution OCR pass, re-OCR'ing only doubtful table lines at high resolution")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Decode scans to reduced grayscale, OCR them in tiles and report peak memory per scan")
+    parser.add_argument("--scan-dir", help="Keep original scans as files here instead of in the database")
+    parser.add_argument("--stats", action="store_true", help="Print queue statistics and exit")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        db_handler = db_handler_from_args(args)
+        if db_handler.connection is not None:
+            print(json.dumps(db_handler.get_ocr_queue_stats(), indent=2))
+            db_handler.close_connection()
+        return
+
+    if args.workers == 1:
+        run_worker(args)
+        return
+
+    # Bring the schema up to date once rather than in every worker at the same time
+    db_handler_from_args(args).close_connection()
+
+    processes = [multiprocessing.Process(target=run_worker, args=(args,), name=f"ocr-worker-{index}")
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import bisect
+import threading
+
+# Characters tesseract confuses in part numbers, folded onto the digit they are mistaken for
+OCR_CONFUSIONS = str.maketrans({"O": "0", "Q": "0", "I": "1", "L": "1", "|": "1", "S": "5", "B": "8", "Z": "2"})
+
+
+def normalise(part_no):
+    return (part_no or "").strip().upper()
+
+
+def fold(part_no):
+    """Key under which part numbers that only differ by OCR confusions (O/0, I/1, ...) coincide."""
+    return normalise(part_no).translate(OCR_CONFUSIONS)
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one inserted, deleted or substituted character."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    index = 0
+    while index < len(a) and a[index] == b[index]:
+        index += 1
+    if len(a) == len(b):
+        return a[index + 1:] == b[index + 1:]
+    return a[index:] == b[index + 1:]
+
+
+def segment_keys(folded, length):
+    """Keys of `folded` for a catalog entry of `length` characters, split in three segments A, B, C.
+
+    One edit leaves two segments intact, so a candidate within one edit shares at least one of
+    the keys AB (prefix aligned), AC or BC (suffix aligned) with the query.
+    """
+    outer = length // 3
+    middle = length - 2 * outer
+    return [
+        ("AB", length, folded[:outer + middle]),
+        ("AC", length, folded[:outer], folded[len(folded) - outer:]),
+        ("BC", length, folded[max(0, len(folded) - outer - middle):]),
+    ]
+
+
+def word_overlap(a, b):
+    words_a = set((a or "").upper().split())
+    words_b = set((b or "").upper().split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class PartCatalog:
+    """Index of the part numbers seen on earlier POs, used to validate and correct OCR output.
+
+    Lookups are dictionary probes: an exact match, then a match after folding OCR confusions,
+    then entries within one edit of the folded part number through three segment indexes
+    (three entries per part, so millions of parts stay affordable). A sorted list of the parts
+    answers prefix queries. Ties are broken by how well the nomenclature matches and by how
+    often the part was ordered.
+    """
+
+    MIN_FUZZY_LENGTH = 5  # Shorter part numbers have too many neighbours to correct safely
+
+    def __init__(self):
+        self.parts = {}  # Part number -> [times ordered, latest nomenclature]
+        self.by_fold = {}  # Folded part number -> part numbers
+        self.segments = {}  # segment_keys key -> folded part numbers
+        self.sorted_parts = []
+        self.last_item_id = 0  # Item rows up to this id are in the catalog
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.parts)
+
+    def __contains__(self, part_no):
+        return normalise(part_no) in self.parts
+
+    def add(self, part_no, nomenclature=None, keep_sorted=True):
+        part = normalise(part_no)
+        if not part:
+            return
+        entry = self.parts.get(part)
+        if entry is not None:
+            entry[0] += 1
+            if nomenclature:
+                entry[1] = nomenclature
+            return
+
+        self.parts[part] = [1, nomenclature]
+        if keep_sorted:
+            bisect.insort(self.sorted_parts, part)
+        else:
+            self.sorted_parts.append(part)  # The caller sorts once after a bulk load
+
+        folded = fold(part)
+        if folded in self.by_fold:
+            self.by_fold[folded].append(part)
+            return
+        self.by_fold[folded] = [part]
+        if len(folded) >= self.MIN_FUZZY_LENGTH:
+            for key in segment_keys(folded, len(folded)):
+                self.segments.setdefault(key, []).append(folded)
+
+    def refresh(self, db_handler, page_size=50000):
+        """Add the items saved since the last refresh; the first call loads the whole history."""
+        with self.lock:
+            added = 0
+            while True:
+                rows = db_handler.get_part_numbers(self.last_item_id, page_size) or []
+                for row in rows:
+                    self.add(row['cart_part_no'], row['nomenclature'], keep_sorted=False)
+                    self.last_item_id = row['id']
+                added += len(rows)
+                if len(rows) < page_size:
+                    break
+            if added:
+                self.sorted_parts.sort()
+            return added
+
+    def candidates(self, part_no):
+        """Catalog parts equal to `part_no` after folding OCR confusions, else within one edit of it."""
+        folded = fold(part_no)
+        if folded in self.by_fold:
+            return list(self.by_fold[folded])
+        if len(folded) < self.MIN_FUZZY_LENGTH:
+            return []
+
+        matches = set()
+        for length in (len(folded) - 1, len(folded), len(folded) + 1):
+            for key in segment_keys(folded, length):
+                for candidate in self.segments.get(key, ()):
+                    if candidate not in matches and within_one_edit(folded, candidate):
+                        matches.add(candidate)
+        return [part for candidate in matches for part in self.by_fold[candidate]]
+
+    def correct(self, part_no, nomenclature=None):
+        """Check an OCR'd part number against the catalog.
+
+        Returns (part number, status): "exact" if it is known, "corrected" with the catalog
+        part it most likely is, "ambiguous" if several parts fit equally well, or "unknown".
+        """
+        part = normalise(part_no)
+        if part in self.parts:
+            return part, "exact"
+        candidates = self.candidates(part)
+        if not candidates:
+            return part_no, "unknown"
+        if len(candidates) == 1:
+            return candidates[0], "corrected"
+
+        def score(candidate):
+            times_ordered, catalog_nomenclature = self.parts[candidate]
+            return word_overlap(nomenclature, catalog_nomenclature), times_ordered
+
+        ranked = sorted(candidates, key=score, reverse=True)
+        if score(ranked[0]) == score(ranked[1]):
+            return part_no, "ambiguous"
+        return ranked[0], "corrected"
+
+    def starting_with(self, prefix, limit=20):
+        """Return up to `limit` catalog part numbers starting with `prefix`, in order."""
+        prefix = normalise(prefix)
+        start = bisect.bisect_left(self.sorted_parts, prefix)
+        matches = []
+        for part in self.sorted_parts[start:start + limit]:
+            if not part.startswith(prefix):
+                break
+            matches.append(part)
+        return matches
+
+    def nomenclature(self, part_no):
+        entry = self.parts.get(normalise(part_no))
+        return entry[1] if entry else None
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class PurchaseOrderPrefetcher(QObject):
+    """Loads the item rows of purchase orders the user is likely to open, on a worker thread.
+
+    Requests are debounced, and a newer request cancels the ones still queued, so scrolling
+    quickly through the table does not pile up work. Results are kept in a bounded LRU cache
+    keyed by PO id. The worker uses its own DBHandler connection.
+    """
+
+    def __init__(self, db_handler, max_cached=50, delay=150, parent=None):
+        super().__init__(parent)
+        self.db_handler = db_handler
+        self.max_cached = max_cached
+        self.cache = OrderedDict()  # PO id -> list of Items
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="po-prefetch")
+        self.worker_db_handler = None  # Only touched on the worker thread
+        self.futures = {}  # PO id -> Future of a queued or running load
+        self.versions = {}  # PO id -> bumped on invalidate so in-flight loads of old data are dropped
+        self.generation = 0
+        self.pending = []
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.submit_pending)
+
+    def request(self, po_ids):
+        """Ask for these POs to be prefetched, most important first; replaces any earlier request."""
+        self.pending = [po_id for po_id in po_ids if po_id]
+        self.timer.start()  # Restarting the timer debounces bursts of selection/hover events
+
+    def submit_pending(self):
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            # Anything still queued belongs to a row the user has already moved away from
+            for po_id, future in list(self.futures.items()):
+                if future.cancel():
+                    del self.futures[po_id]
+
+            for po_id in self.pending:
+                if po_id in self.cache or po_id in self.futures:
+                    continue
+                version = self.versions.get(po_id, 0)
+                self.futures[po_id] = self.executor.submit(self.load, po_id, version, generation)
+        self.pending = []
+
+    def load(self, po_id, version, generation):
+        """Runs on the worker thread."""
+        try:
+            with self.lock:
+                if generation != self.generation:
+                    return None  # Superseded before it started
+            if self.worker_db_handler is None:
+                self.worker_db_handler = self.db_handler.clone()
+            rows = self.worker_db_handler.get_items(po_id)
+
+            with self.lock:
+                if self.versions.get(po_id, 0) != version:
+                    return None  # Invalidated while loading
+                self.cache[po_id] = rows
+                self.cache.move_to_end(po_id)
+                while len(self.cache) > self.max_cached:
+                    self.cache.popitem(last=False)
+            return rows
+        finally:
+            with self.lock:
+                self.futures.pop(po_id, None)
+
+    def take(self, po_id, timeout=5.0):
+        """Remove and return the prefetched Items of a PO, waiting for an in-flight load.
+
+        Returns None if the PO was not prefetched, so the caller should load it itself.
+        """
+        with self.lock:
+            rows = self.cache.pop(po_id, None)
+            future = self.futures.get(po_id)
+        if rows is not None:
+            return rows
+        if future is not None and not future.cancelled():
+            try:
+                rows = future.result(timeout)
+            except Exception:
+                return None  # Timed out or failed; the caller loads it synchronously
+            with self.lock:
+                self.cache.pop(po_id, None)
+        return rows
+
+    def invalidate(self, po_id):
+        """Forget cached items for a PO whose items changed, including a load already in progress."""
+        with self.lock:
+            self.versions[po_id] = self.versions.get(po_id, 0) + 1
+            self.cache.pop(po_id, None)
+
+    def shutdown(self):
+        self.timer.stop()
+        with self.lock:
+            self.generation += 1
+            for future in self.futures.values():
+                future.cancel()
+        # Queued behind any running load, so the connection is closed on the thread that owns it
+        self.executor.submit(self.close_worker_connection)
+        self.executor.shutdown(wait=True)
+
+    def close_worker_connection(self):
+        if self.worker_db_handler is not None:
+            self.worker_db_handler.close_connection()
+            self.worker_db_handler = None
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+
+class PurchaseOrderRegistry:
+    """Purchase orders indexed by po_number and id, with a cap on how many items stay in memory.
+
+    PO headers are always kept. Item lists are loaded on demand through `item_loader(po)` and
+    the least recently used ones are dropped once more than `max_loaded_items` items are held.
+    """
+
+    def __init__(self, item_loader=None, max_loaded_items=20000):
+        self.item_loader = item_loader
+        self.max_loaded_items = max_loaded_items
+        self.by_po_number = {}
+        self.by_id = {}
+        self._loaded = OrderedDict()  # PO id -> number of items held, least recently used first
+        self.loaded_item_count = 0
+
+    def __len__(self):
+        return len(self.by_po_number)
+
+    def __iter__(self):
+        return iter(list(self.by_po_number.values()))
+
+    def __contains__(self, po_number):
+        return po_number in self.by_po_number
+
+    def get_by_po_number(self, po_number):
+        return self.by_po_number.get(po_number)
+
+    def get_by_id(self, po_id):
+        return self.by_id.get(po_id)
+
+    def add(self, po):
+        """Add or replace a purchase order. Items already on the PO count as loaded."""
+        existing = self.by_po_number.get(po.po_number)
+        if existing is None and po.id:
+            existing = self.by_id.get(po.id)
+        if existing is not None:
+            self.remove(existing)
+
+        self.by_po_number[po.po_number] = po
+        if po.id:
+            self.by_id[po.id] = po
+        if po.items:
+            self._track(po)
+
+    def remove(self, po):
+        self.by_po_number.pop(po.po_number, None)
+        self.by_id.pop(po.id, None)
+        self._untrack(po)
+
+    def remove_by_id(self, po_id):
+        po = self.by_id.get(po_id)
+        if po is not None:
+            self.remove(po)
+        return po
+
+    def clear(self):
+        self.by_po_number.clear()
+        self.by_id.clear()
+        self._loaded.clear()
+        self.loaded_item_count = 0
+
+    def is_loaded(self, po):
+        return po.id in self._loaded
+
+    def load_items(self, po):
+        """Return the PO's items, loading them through item_loader if they are not in memory."""
+        if po.id in self._loaded:
+            self._loaded.move_to_end(po.id)
+            return po.items
+
+        po.items = list(self.item_loader(po)) if self.item_loader else []
+        self._track(po)
+        return po.items
+
+    def _track(self, po):
+        self._untrack(po)
+        self._loaded[po.id] = len(po.items)
+        self.loaded_item_count += len(po.items)
+        self._evict(keep=po.id)
+
+    def _untrack(self, po):
+        count = self._loaded.pop(po.id, None)
+        if count is not None:
+            self.loaded_item_count -= count
+
+    def _evict(self, keep=None):
+        """Drop item lists, oldest first, until the cap is respected; headers stay."""
+        while self.loaded_item_count > self.max_loaded_items and len(self._loaded) > 1:
+            po_id, count = next(iter(self._loaded.items()))
+            if po_id == keep:
+                self._loaded.move_to_end(po_id)
+                continue
+            del self._loaded[po_id]
+            self.loaded_item_count -= count
+            po = self.by_id.get(po_id)
+            if po is not None:
+                # A new list, so an editor still holding the old one keeps working
+                po.items = []
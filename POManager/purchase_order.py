@@ -2,6 +2,9 @@ from POManager.item import Item
 from datetime import datetime
 
 class PurchaseOrder:
+    # Column order of the tuple rows accepted by from_row
+    ROW_COLUMNS = ("id", "po_number", "order_date", "total_qty", "total_amount")
+
     def __init__(self, po_number):
         self.po_number = po_number
         self.id = 0
@@ -9,6 +12,18 @@ class PurchaseOrder:
         self.total_qty = 0  # Total quantity of items
         self.total_amount = 0  # Total amount of the purchase order
         self.added_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.archived = False  # Loaded from the archive tables; not part of the live tables
+        self.fulfilment_status = None  # Set by the reconciliation job: open, partial, fulfilled or no_items
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a PurchaseOrder (without items) from a tuple row in ROW_COLUMNS order."""
+        purchase_order = cls.__new__(cls)  # Skips formatting a creation date that is overwritten anyway
+        purchase_order.id, purchase_order.po_number, purchase_order.added_date, purchase_order.total_qty, purchase_order.total_amount = row
+        purchase_order.items = []
+        purchase_order.archived = False
+        purchase_order.fulfilment_status = None
+        return purchase_order
 
     def add_item(self, item):
         if isinstance(item, Item):
@@ -34,10 +49,16 @@ class PurchaseOrder:
     def __str__(self):
         return f"Purchase Order {self.po_number} with {len(self.items)} items."
 
-    def update_purchase_order(self):
-        po_data = self.db_handler.get_purchase_order_by_po_number(self.po_number)
+    def update_purchase_order(self, db_handler):
+        """Refresh the totals, fulfilment status and item quantities from the database."""
+        po_data = db_handler.fetch_one_query(
+            "SELECT total_qty, total_amount, fulfilment_status FROM PurchaseOrder WHERE po_number = %s", (self.po_number,)
+        )
         if po_data:
             self.total_qty = po_data['total_qty']
             self.total_amount = po_data['total_amount']
+            self.fulfilment_status = po_data['fulfilment_status']
+        statuses = db_handler.get_item_statuses(self.id)
         for item in self.items:
-            item.update_from_db(self.db_handler)
\ No newline at end of file
+            if item.id in statuses:
+                item.apply_status(statuses[item.id])
\ No newline at end of file
@@ -3,23 +3,79 @@ from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QScrollBar,QMessageBox,QInputDialog, QFileDialog,QFormLayout,QGroupBox,QDialog,QWidget
 
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 
 from POManager.purchase_order import PurchaseOrder  # Importing the PurchaseOrder class
 from POManager.item import Item  # Importing the Item class
-from POManager.image_processor import ImageProcessor
-
+from POManager.purchase_order_loader import PurchaseOrderLoader
+from POManager.po_registry import PurchaseOrderRegistry
+from POManager.po_prefetcher import PurchaseOrderPrefetcher
+from POManager.item_editor import ItemEditorDialog
+from POManager.image_hash import ImageHashIndex
+from POManager.part_catalog import PartCatalog
+from POManager.document_store import DocumentStore
+from POManager.query_instrumentation import track_action
+from POManager.table_utils import remove_rows, selected_rows
+
+import getpass
+import os
+import socket
 import traceback
+from datetime import date
 
 class PurchaseOrderApp(QWidget):
-    def __init__(self, db_handler):
+    def __init__(self, db_handler, fast_start=False, page_size=200, poll_interval=5000, max_loaded_items=20000,
+                 ocr_queue=False, document_store=None):
         super().__init__()
         self.db_handler = db_handler
-        self.purchase_orders = []  # List to hold purchase orders
+        # With ocr_queue, scans are OCR'd by POManager.ocr_worker processes instead of in this process
+        self.ocr_queue = ocr_queue
+        self.ocr_client = f"{getpass.getuser()}@{socket.gethostname()}"
+        self.ocr_jobs = set()  # Ids of queued jobs whose results this window has not collected yet
+        self.scan_index = ImageHashIndex(db_handler)  # Perceptual hashes of processed scans
+        self.part_catalog = PartCatalog()  # Known part numbers for correcting OCR output; loaded on first use
+        # Original scans and their thumbnails, shown in the item editor
+        self.document_store = document_store or DocumentStore(db_handler)
+        # Purchase orders by po_number and id; item lists are loaded on demand and capped
+        self.purchase_orders = PurchaseOrderRegistry(item_loader=self.load_items, max_loaded_items=max_loaded_items)
+        self.page_size = page_size
+        self.loader = None  # Background PurchaseOrderLoader in fast-start mode
+        self.deleted_while_loading = set()  # Deleted ids the loader must not add back
+        self.showing_search_results = False
+        self.change_token = None  # Position in the change log the table is up to date with
         self.create_widgets()  # Call the function to create UI components
 
+        # Load the items of the selected/hovered PO and its neighbours before the user opens it
+        self.prefetcher = PurchaseOrderPrefetcher(db_handler, parent=self)
+        self.tree.setMouseTracking(True)
+        self.tree.cellEntered.connect(lambda row, column: self.prefetch_around(row))
+        self.tree.itemSelectionChanged.connect(lambda: self.prefetch_around(self.tree.currentRow()))
+
         # Load the existing purchase orders from the database
-        self.load_purchase_orders()
+        with track_action(self.db_handler, "load_purchase_orders"):
+            # Taken before loading so changes made while loading are picked up by the first poll
+            self.change_token = self.db_handler.get_change_token()
+            if fast_start:
+                self.load_first_page()
+            else:
+                self.load_purchase_orders()
+
+        # Poll the change log so other clerks' changes show up without a restart
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.tracked("refresh_changes", self.refresh_changes))
+        if ocr_queue:
+            # Jobs submitted before a restart are still picked up
+            self.ocr_jobs.update(self.db_handler.get_open_ocr_jobs(self.ocr_client))
+            self.refresh_timer.timeout.connect(self.tracked("poll_ocr_jobs", self.poll_ocr_jobs))
+        if poll_interval:
+            self.refresh_timer.start(poll_interval)
+
+    def tracked(self, name, slot):
+        """Wrap a button slot so the queries it runs are grouped under a UI action."""
+        def run():
+            with track_action(self.db_handler, name):
+                slot()
+        return run
 
     def create_widgets(self):
         # Main layout for the widget
@@ -46,9 +102,13 @@ class PurchaseOrderApp(QWidget):
         search_layout.addWidget(self.search_entry)
 
         self.search_button = QPushButton("Search")
-        self.search_button.clicked.connect(self.search_purchase_order)
+        self.search_button.clicked.connect(self.tracked("search_purchase_order", self.search_purchase_order))
         search_layout.addWidget(self.search_button)
 
+        self.show_all_button = QPushButton("Show All")
+        self.show_all_button.clicked.connect(self.clear_search)
+        search_layout.addWidget(self.show_all_button)
+
         # Buttons Section
         button_frame = QFrame(self)
         button_layout = QHBoxLayout(button_frame)
@@ -57,28 +117,33 @@ class PurchaseOrderApp(QWidget):
 
         self.add_button = QPushButton("Add New Purchase Order")
         self.add_button.setFixedWidth(200)
-        self.add_button.clicked.connect(self.add_purchase_order)
+        self.add_button.clicked.connect(self.tracked("add_purchase_order", self.add_purchase_order))
         button_layout.addWidget(self.add_button)
 
         self.update_button = QPushButton("Update Purchase Order")
         self.update_button.setFixedWidth(200)
-        self.update_button.clicked.connect(self.update_purchase_order)
+        self.update_button.clicked.connect(self.tracked("update_purchase_order", self.update_purchase_order))
         button_layout.addWidget(self.update_button)
 
         self.delete_button = QPushButton("Delete Purchase Order")
         self.delete_button.setFixedWidth(200)
-        self.delete_button.clicked.connect(self.delete_purchase_order)
+        self.delete_button.clicked.connect(self.tracked("delete_purchase_order", self.delete_purchase_order))
         button_layout.addWidget(self.delete_button)
 
+        self.redate_button = QPushButton("Change Order Date")
+        self.redate_button.setFixedWidth(200)
+        self.redate_button.clicked.connect(self.tracked("change_order_date", self.change_order_date))
+        button_layout.addWidget(self.redate_button)
+
         # Table for displaying Purchase Orders
         self.tree = QTableWidget(self)
-        self.tree.setColumnCount(5)
-        self.tree.setHorizontalHeaderLabels(["ID", "PO Number", "Order Date", "Total Qty", "Total Amount"])
+        self.tree.setColumnCount(6)
+        self.tree.setHorizontalHeaderLabels(["ID", "PO Number", "Order Date", "Total Qty", "Total Amount", "Fulfilment"])
         self.tree.verticalHeader().setVisible(False)
         self.tree.setAlternatingRowColors(True)
         self.tree.setEditTriggers(QTableWidget.NoEditTriggers)  # Disable direct editing
         self.tree.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tree.setSelectionMode(QTableWidget.SingleSelection)
+        self.tree.setSelectionMode(QTableWidget.ExtendedSelection)  # Ctrl/Shift-click for bulk delete and re-date
         self.tree.horizontalHeader().setStretchLastSection(True)  # Stretch last column
         self.tree.horizontalHeader().setDefaultAlignment(Qt.AlignCenter)
 
@@ -89,47 +154,161 @@ class PurchaseOrderApp(QWidget):
         self.scrollbar = QScrollBar(Qt.Vertical, self)
         self.tree.setVerticalScrollBar(self.scrollbar)
 
+    def purchase_order_from_row(self, po_data):
+        """Create a PurchaseOrder (without items) from a PurchaseOrder table row."""
+        po = PurchaseOrder(po_data['po_number'])
+        po.id = po_data['id']
+        po.added_date = po_data['order_date']
+        po.total_qty = po_data['total_qty']
+        po.total_amount = po_data['total_amount']
+        po.fulfilment_status = po_data.get('fulfilment_status')  # Written by POManager.reconciliation
+        return po
+
+    def insert_purchase_order_row(self, po):
+        """Append a PurchaseOrder to the QTableWidget."""
+        row_position = self.tree.rowCount()  # Get current row count
+        self.tree.insertRow(row_position)  # Add a new row
+        self.fill_purchase_order_row(row_position, po)
+
+    def fill_purchase_order_row(self, row_position, po):
+        """Populate a QTableWidget row with PurchaseOrder data."""
+        self.tree.setItem(row_position, 0, QTableWidgetItem(str(po.id)))
+        self.tree.setItem(row_position, 1, QTableWidgetItem(po.po_number))
+        self.tree.setItem(row_position, 2, QTableWidgetItem(po.added_date.strftime("%Y-%m-%d") if po.added_date else "N/A"))
+        self.tree.setItem(row_position, 3, QTableWidgetItem(str(po.total_qty)))
+        self.tree.setItem(row_position, 4, QTableWidgetItem(f"{po.total_amount:,.2f}"))  # Format with commas and 2 decimals
+        self.tree.setItem(row_position, 5, QTableWidgetItem(po.fulfilment_status or ""))
+
+    def load_first_page(self):
+        """Show the first page of purchase orders right away and stream the rest in the background.
+
+        Only PO headers are loaded; items are read from the database when a PO is opened.
+        """
+        try:
+            rows, token = self.db_handler.get_purchase_orders_page(page_size=self.page_size, sort="id")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load purchase orders:\n{e}")
+            return
+
+        self.add_purchase_order_page(rows)
+        if token:
+            self.loader = PurchaseOrderLoader(self.db_handler, token, page_size=self.page_size, parent=self)
+            self.loader.page_loaded.connect(self.add_purchase_order_page)
+            self.loader.loading_failed.connect(
+                lambda error: QMessageBox.critical(self, "Error", f"Failed to load purchase orders:\n{error}")
+            )
+            self.loader.start()
+
+    def add_purchase_order_page(self, rows):
+        """Add a page of PurchaseOrder rows to the local list and, unless a search is shown, to the table.
+
+        POs a change poll or a save added while the page was loading are skipped: that copy is
+        at least as recent as the page, and showing the page's copy too would duplicate the row.
+        """
+        self.tree.setUpdatesEnabled(False)
+        for po_data in rows:
+            if self.purchase_orders.get_by_id(po_data['id']) is not None or po_data['id'] in self.deleted_while_loading:
+                continue
+            po = self.purchase_order_from_row(po_data)
+            self.purchase_orders.add(po)
+            if not self.showing_search_results:
+                self.insert_purchase_order_row(po)
+        self.tree.setUpdatesEnabled(True)
+
+    def find_purchase_order_row(self, po_id):
+        """Return the table row showing the PO with this id, or -1."""
+        for table_item in self.tree.findItems(str(po_id), Qt.MatchExactly):
+            if table_item.column() == 0:
+                return table_item.row()
+        return -1
+
+    def refresh_changes(self):
+        """Apply POs inserted, updated or deleted by any client since the last poll."""
+        try:
+            changes = self.db_handler.get_changes_since(self.change_token)
+        except Exception as e:
+            print(f"Error polling for changes: {e}")
+            return
+
+        deleted_rows = []
+        for deleted in changes["deleted"]:
+            self.forget_purchase_order(deleted['id'])
+            deleted_rows.append(self.find_purchase_order_row(deleted['id']))
+        remove_rows(self.tree, deleted_rows)
+
+        self.tree.setUpdatesEnabled(False)
+
+        for po_data in changes["inserted"] + changes["updated"]:
+            # Replacing the PO also drops its cached items, which may have changed too
+            po = self.purchase_order_from_row(po_data)
+            self.purchase_orders.add(po)
+            self.prefetcher.invalidate(po.id)
+
+            row = self.find_purchase_order_row(po.id)
+            if row >= 0:
+                self.fill_purchase_order_row(row, po)
+            elif not self.showing_search_results:
+                self.insert_purchase_order_row(po)
+        self.tree.setUpdatesEnabled(True)
+
+        self.change_token = changes["token"]
+        if changes["has_more"]:
+            QTimer.singleShot(0, self.refresh_changes)
+
+    def forget_purchase_order(self, po_id):
+        """Drop a deleted PO from the registry and the prefetcher; its table row is left to the caller."""
+        self.purchase_orders.remove_by_id(po_id)
+        self.prefetcher.invalidate(po_id)
+        if self.loader is not None:
+            # Pages read before the delete may still be running or queued for delivery
+            self.deleted_while_loading.add(po_id)
+
+    def closeEvent(self, event):
+        if self.loader is not None and self.loader.isRunning():
+            self.loader.requestInterruption()
+            self.loader.wait()
+        self.prefetcher.shutdown()
+        super().closeEvent(event)
+
+    def prefetch_around(self, row, neighbours=2):
+        """Prefetch the items of the PO in `row` and of the rows just above and below it."""
+        if row < 0:
+            return
+        po_ids = []
+        for offset in [0] + [sign * distance for distance in range(1, neighbours + 1) for sign in (1, -1)]:
+            table_item = self.tree.item(row + offset, 0)
+            if table_item is None:
+                continue
+            po = self.purchase_orders.get_by_id(int(table_item.text()))
+            if po is not None and not self.purchase_orders.is_loaded(po):
+                po_ids.append(po.id)
+        self.prefetcher.request(po_ids)
+
+    def load_items(self, po):
+        """Load the items of a purchase order (the registry's item loader), preferring prefetched ones."""
+        items = self.prefetcher.take(po.id)
+        if items is None:
+            items = self.db_handler.get_items(po.id)
+        return items
+
     def load_purchase_orders(self):
+        self.showing_search_results = False
+        self.tree.setRowCount(0)
         try:
-            # Load all purchase orders from the database
+            # Load all purchase order headers from the database; items are loaded when a PO is opened
             purchase_orders_from_db = self.db_handler.get_purchase_orders()
             for po_data in purchase_orders_from_db:
                 # Debugging step: print loaded PO data
                 print(f"Loading Purchase Order: {po_data}")
 
                 # Create a PurchaseOrder object
-                po = PurchaseOrder(po_data['po_number'])
-                po.id = po_data['id']
-                po.added_date = po_data['order_date']
-                po.total_qty = po_data['total_qty']
-                po.total_amount = po_data['total_amount']
-
-                # Add the items to the PurchaseOrder object
-                items_data = self.db_handler.get_items_by_purchase_order_id(po_data['id'])  # Use correct key
-                for item_data in items_data:
-                    item = Item(
-                        cart_part_no=item_data['cart_part_no'],
-                        nomenclature=item_data['nomenclature'],
-                        qty=item_data['qty'],
-                        rate_include_gst=item_data['rate_include_gst'],
-                        country_of_origin=item_data.get('country_of_origin', ''),
-                        a_unit=item_data.get('a_unit', '')
-                    )
-                    po.add_item(item)
-
-                # Add the PurchaseOrder object to the local list
-                self.purchase_orders.append(po)
+                po = self.purchase_order_from_row(po_data)
 
-                # Insert PurchaseOrder into the QTableWidget
-                row_position = self.tree.rowCount()  # Get current row count
-                self.tree.insertRow(row_position)  # Add a new row
+                # Add the PurchaseOrder object to the registry
+                self.purchase_orders.add(po)
 
-                # Populate the row with PurchaseOrder data
-                self.tree.setItem(row_position, 0, QTableWidgetItem(str(po.id)))
-                self.tree.setItem(row_position, 1, QTableWidgetItem(po.po_number))
-                self.tree.setItem(row_position, 2, QTableWidgetItem(po.added_date.strftime("%Y-%m-%d") if po.added_date else "N/A"))
-                self.tree.setItem(row_position, 3, QTableWidgetItem(str(po.total_qty)))
-                self.tree.setItem(row_position, 4, QTableWidgetItem(f"{po.total_amount:,.2f}"))  # Format with commas and 2 decimals
+                # Insert PurchaseOrder into the QTableWidget
+                self.insert_purchase_order_row(po)
 
         except Exception as e:
             print(f"Error loading purchase orders: {e}")
@@ -140,15 +319,17 @@ class PurchaseOrderApp(QWidget):
         """Filter the QTableWidget to display only matching purchase orders."""
         search_term = self.search_entry.text().strip()  # Get text from QLineEdit
         if not search_term:
+            if self.showing_search_results:
+                self.clear_search()
+                return
             QMessageBox.warning(self, "Empty Search", "Please enter a search term.")
             return
 
         # Clear the table before populating search results
         self.tree.setRowCount(0)  # Remove all rows in QTableWidget
+        self.showing_search_results = True  # Keep background loading out of the results
         try:
-            # Query to search purchase orders by PO Number
-            query = "SELECT * FROM PurchaseOrder WHERE po_number LIKE %s"
-            search_results = self.db_handler.fetch_query(query, (f"%{search_term}%",))
+            search_results = self.db_handler.search_purchase_orders(search_term, part_numbers=False)
 
             if not search_results:
                 QMessageBox.information(self, "No Results", "No matching purchase orders found.")
@@ -176,10 +357,21 @@ class PurchaseOrderApp(QWidget):
                 self.tree.setItem(row_position, 2, QTableWidgetItem(order_date))
                 self.tree.setItem(row_position, 3, QTableWidgetItem(str(po_data.get('total_qty', 'N/A'))))
                 self.tree.setItem(row_position, 4, QTableWidgetItem(formatted_total_amount))
+                self.tree.setItem(row_position, 5, QTableWidgetItem(po_data.get('fulfilment_status') or ""))
 
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"An error occurred while searching:\n{str(e)}")
 
+    def clear_search(self):
+        """Leave the search results and show every purchase order again, including those loaded meanwhile."""
+        self.search_entry.clear()
+        self.showing_search_results = False
+        self.tree.setUpdatesEnabled(False)
+        self.tree.setRowCount(0)
+        for po in sorted(self.purchase_orders, key=lambda po: po.id):
+            self.insert_purchase_order_row(po)
+        self.tree.setUpdatesEnabled(True)
+
     def add_purchase_order(self):
         """Adds a new Purchase Order."""
         # Step 1: Get the Purchase Order Number
@@ -205,19 +397,72 @@ class PurchaseOrderApp(QWidget):
             QMessageBox.warning(self, "No Image", "No image file selected.")
             return
 
-        # Step 3: Process the image to extract items
+        # Step 3: Flag rescans of POs that were already processed, before paying for OCR
         try:
-            image_processor = ImageProcessor(file_path)
+            # Imported here so cv2 and pytesseract are only loaded once an image is processed
+            from POManager.image_processor import ImageProcessor
+            image_processor = ImageProcessor(file_path, part_catalog=self.part_catalog)
+            image_hash = image_processor.perceptual_hash()
+            table_hash = image_processor.table_hash()
+            duplicates = self.scan_index.find_duplicates(image_hash, table_hash)
+        except Exception as e:
+            QMessageBox.critical(self, "Processing Error", f"An error occurred while processing the image:\n{str(e)}")
+            return
+        if duplicates:
+            match = duplicates[0]
+            if match['table_distance'] is not None:
+                difference = f"{match['table_distance']} of 256 table hash bits differ"
+            else:
+                difference = f"{match['distance']} of 64 bits differ"
+            answer = QMessageBox.question(
+                self, "Possible Duplicate Scan",
+                f"This image looks like the scan of Purchase Order {match['po_number']} "
+                f"({match['image_name'] or 'unnamed image'}, {difference}).\n\nProcess it anyway?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                return
+
+        # Step 4: Process the image to extract items, or leave that to the OCR workers
+        if self.ocr_queue:
+            try:
+                job_id = self.db_handler.enqueue_ocr_job(po_number, file_path, requested_by=self.ocr_client)
+                self.ocr_jobs.add(job_id)
+                QMessageBox.information(self, "Queued", f"Purchase Order {po_number} was queued for OCR. The item editor opens when it is done.")
+            except Exception as e:
+                QMessageBox.critical(self, "Database Error", f"An error occurred while queueing the image:\n{str(e)}")
+            return
+
+        try:
+            self.part_catalog.refresh(self.db_handler)
             items = image_processor.process_and_extract_items(po_number)
         except Exception as e:
             QMessageBox.critical(self, "Processing Error", f"An error occurred while processing the image:\n{str(e)}")
             return
 
+        def record_scan():
+            # Only once the PO is saved, so a failed save leaves no hash that flags the next attempt as a duplicate
+            try:
+                self.scan_index.add(image_hash, po_number, os.path.basename(file_path), table_hash)
+                self.document_store.add_file(po_number, file_path, image=image_processor.image)
+            except Exception as e:
+                QMessageBox.warning(self, "Scan Not Stored", f"Purchase Order {po_number} was saved, but its scan could not be stored:\n{str(e)}")
+
+        self.create_purchase_order_from_items(po_number, items, on_saved=record_scan)
+
+    def create_purchase_order_from_items(self, po_number, items, on_saved=None, ocr_job_id=None):
+        """Save a new PO for the items extracted from its scan and open the item editor.
+
+        `on_saved` is called once the PO row is committed, before the editor opens. The queued
+        OCR job `ocr_job_id` the items came from is collected in the same transaction as the PO.
+        """
         if not items:
-            QMessageBox.warning(self, "No Items Found", "No items were extracted from the image.")
+            if ocr_job_id is not None:
+                self.db_handler.mark_ocr_job_collected(ocr_job_id)
+            QMessageBox.warning(self, "No Items Found", f"No items were extracted from the image of {po_number}.")
             return
 
-        # Step 4: Initialize PurchaseOrder and calculate total quantity and total amount
+        # Step 5: Initialize PurchaseOrder and calculate total quantity and total amount
         new_po = PurchaseOrder(po_number)
         total_qty = 0
         total_amount = 0
@@ -231,11 +476,20 @@ class PurchaseOrderApp(QWidget):
         new_po.total_qty = total_qty
         new_po.total_amount = total_amount
 
-        # Step 5: Save the Purchase Order in the database (without saving items yet)
+        # Step 6: Save the Purchase Order in the database (without saving items yet)
         try:
-            # Save the PO and get the PO ID
+            if ocr_job_id is not None and not self.db_handler.collect_ocr_job(ocr_job_id):
+                self.db_handler.connection.rollback()
+                return  # Another window collected it first
+            # Save the PO and get the PO ID; this commits the collection too
             new_po.id = self.db_handler.add_purchase_order(new_po)
-            self.purchase_orders.append(new_po)
+            # Only the header is registered: the items have no database ids until the editor saves
+            # them, so they are read back from the database when the PO is next opened
+            header = PurchaseOrder.from_row((new_po.id, new_po.po_number, new_po.added_date, new_po.total_qty,
+                                             new_po.total_amount))
+            self.purchase_orders.add(header)
+            if on_saved is not None:
+                on_saved()
 
             # Insert the Purchase Order into the QTableWidget
             row_position = self.tree.rowCount()
@@ -247,8 +501,9 @@ class PurchaseOrderApp(QWidget):
             self.tree.setItem(row_position, 3, QTableWidgetItem(str(new_po.total_qty)))
             self.tree.setItem(row_position, 4, QTableWidgetItem(f"{new_po.total_amount:,.2f}"))
 
-            # Step 6: Open the edit items window for further item editing
+            # Step 7: Open the edit items window for further item editing
             self.open_edit_items_window(po_number, items, new_po, add=True)
+            header.total_qty, header.total_amount = new_po.total_qty, new_po.total_amount
 
             # Show success message to the user
             QMessageBox.information(self, "Success", f"Purchase Order {po_number} added successfully! Now you can edit the items.")
@@ -256,6 +511,36 @@ class PurchaseOrderApp(QWidget):
             QMessageBox.critical(self, "Database Error", f"An error occurred while saving the purchase order:\n{str(e)}")
             traceback.print_exc()  # Print full traceback for debugging
 
+    def poll_ocr_jobs(self):
+        """Open the item editor for queued scans the OCR workers have finished."""
+        if not self.ocr_jobs:
+            return
+        try:
+            jobs = self.db_handler.get_ocr_jobs(sorted(self.ocr_jobs))
+        except Exception as e:
+            print(f"Error polling OCR jobs: {e}")
+            return
+
+        for job in jobs:
+            if job['status'] not in ('done', 'failed', 'collected'):
+                continue
+            # Dropped before any dialog opens, since the dialogs let the timer fire again
+            self.ocr_jobs.discard(job['id'])
+            if job['status'] == 'collected':
+                continue
+
+            if job['status'] == 'failed':
+                self.db_handler.mark_ocr_job_collected(job['id'])
+                QMessageBox.critical(self, "Processing Error", f"OCR of Purchase Order {job['po_number']} failed:\n{job['error']}")
+            elif self.db_handler.purchase_order_exists(job['po_number']):
+                self.db_handler.mark_ocr_job_collected(job['id'])
+                QMessageBox.critical(self, "Duplicate Purchase Order", f"Purchase Order {job['po_number']} already exists.")
+            else:
+                # Collected in the transaction that saves the PO, so a failed save leaves the job
+                # done and it is offered again on the next start
+                self.create_purchase_order_from_items(job['po_number'], self.db_handler.ocr_job_items(job),
+                                                      ocr_job_id=job['id'])
+
     def update_purchase_order(self):
         """Update the selected purchase order."""
         # Get the currently selected row in the QTableWidget
@@ -267,16 +552,17 @@ class PurchaseOrderApp(QWidget):
                 po_number = self.tree.item(selected_row, 1).text()  # Assuming the PO Number is in column 1
 
                 # Find the corresponding PurchaseOrder object
-                selected_po = next((po for po in self.purchase_orders if po.po_number == po_number), None)
+                selected_po = self.purchase_orders.get_by_po_number(po_number)
                 if not selected_po:
                     QMessageBox.warning(self, "Error", "Selected purchase order could not be found.")
                     return
 
-                # Retrieve the PurchaseOrder details from the database
-                purchaseOd = self.db_handler.get_purchase_order_by_po_number(selected_po.po_number)
+                # Retrieve the items, from memory if they are still loaded or else from the database
+                items = self.purchase_orders.load_items(selected_po)
 
                 # Open the edit items window
-                self.open_edit_items_window(selected_po.po_number, purchaseOd.items, purchaseOd, False)
+                self.open_edit_items_window(selected_po.po_number, items, selected_po, False)
+                self.prefetcher.invalidate(selected_po.id)  # Prefetched rows may predate the edit
 
                 # Notify the user of the update action
                 QMessageBox.information(self, "Update PO", f"Update PO: {selected_po.po_number}")
@@ -285,176 +571,81 @@ class PurchaseOrderApp(QWidget):
         else:
             QMessageBox.warning(self, "No Selection", "Please select a purchase order to update.")
 
+    def selected_purchase_orders(self):
+        """Return (row, PurchaseOrder) for every selected row of the table."""
+        selected = []
+        for row in selected_rows(self.tree):
+            po = self.purchase_orders.get_by_po_number(self.tree.item(row, 1).text())  # PO Number is in column 1
+            if po is not None:
+                selected.append((row, po))
+        return selected
+
     def delete_purchase_order(self):
-        """Delete the selected purchase order."""
-        # Get the currently selected row in the QTableWidget
-        selected_row = self.tree.currentRow()
+        """Delete the selected purchase orders."""
+        selected = self.selected_purchase_orders()
+        if not selected:
+            QMessageBox.warning(self, "No Selection", "Please select a purchase order to delete.")
+            return
 
-        if selected_row >= 0:  # Check if a row is selected
-            try:
-                # Retrieve the Purchase Order number from the selected row
-                po_number = self.tree.item(selected_row, 1).text()  # Assuming the PO Number is in column 1
+        selected_pos = [po for _, po in selected]
+        label = f"Purchase Order {selected_pos[0].po_number}" if len(selected_pos) == 1 else f"{len(selected_pos)} Purchase Orders"
+
+        # Confirm before deletion
+        confirm = QMessageBox.question(
+            self,
+            "Confirm Deletion",
+            f"Are you sure you want to delete {label}? This will also delete the associated items.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if confirm != QMessageBox.Yes:
+            QMessageBox.information(self, "Deletion Canceled", "Purchase Order deletion was canceled.")
+            return
 
-                # Find the corresponding PurchaseOrder object
-                selected_po = next((po for po in self.purchase_orders if po.po_number == po_number), None)
-                if not selected_po:
-                    QMessageBox.warning(self, "Error", "Selected purchase order could not be found.")
-                    return
+        try:
+            # One transaction for the whole selection
+            self.db_handler.delete_purchase_orders([po.po_number for po in selected_pos])
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"An error occurred while deleting the purchase orders:\n{str(e)}")
+            return
 
-                # Confirm before deletion
-                confirm = QMessageBox.question(
-                    self,
-                    "Confirm Deletion",
-                    f"Are you sure you want to delete Purchase Order {selected_po.po_number}? This will also delete its associated items.",
-                    QMessageBox.Yes | QMessageBox.No,
-                    QMessageBox.No
-                )
+        remove_rows(self.tree, [row for row, _ in selected])
+        for po in selected_pos:
+            self.forget_purchase_order(po.id)
+        QMessageBox.information(self, "Success", f"{label} and the associated items have been deleted successfully.")
 
-                if confirm == QMessageBox.Yes:
-                    # Perform the deletion in the database
-                    self.db_handler.delete_purchase_order(selected_po.po_number)
+    def change_order_date(self):
+        """Set the order date of the selected purchase orders."""
+        selected = self.selected_purchase_orders()
+        if not selected:
+            QMessageBox.warning(self, "No Selection", "Please select the purchase orders to re-date.")
+            return
 
-                    # Remove from the QTableWidget (UI)
-                    self.tree.removeRow(selected_row)
+        text, ok = QInputDialog.getText(
+            self, "Change Order Date", f"New order date for {len(selected)} purchase order(s) (YYYY-MM-DD):"
+        )
+        if not ok or not text.strip():
+            return
+        try:
+            order_date = date.fromisoformat(text.strip())
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Date", f"{text} is not a date in the YYYY-MM-DD format.")
+            return
 
-                    # Remove the purchase order from the internal list
-                    self.purchase_orders.remove(selected_po)
+        try:
+            self.db_handler.update_purchase_order_dates([po.po_number for _, po in selected], order_date)
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"An error occurred while updating the order dates:\n{str(e)}")
+            return
 
-                    QMessageBox.information(self, "Success", f"Purchase Order {selected_po.po_number} and its items have been deleted successfully.")
-                else:
-                    QMessageBox.information(self, "Deletion Canceled", "Purchase Order deletion was canceled.")
-            except Exception as e:
-                QMessageBox.critical(self, "Database Error", f"An error occurred while deleting the purchase order:\n{str(e)}")
-        else:
-            QMessageBox.warning(self, "No Selection", "Please select a purchase order to delete.")
+        self.tree.setUpdatesEnabled(False)
+        for row, po in selected:
+            po.added_date = order_date
+            self.fill_purchase_order_row(row, po)
+        self.tree.setUpdatesEnabled(True)
 
     def open_edit_items_window(self, po_number, items, new_po, add):
         """Open a window to edit items for a purchase order."""
-        # Create the QDialog window
-        edit_window = QDialog(self)
-        edit_window.setWindowTitle(f"Edit Items for PO {po_number}")
-        edit_window.resize(800, 600)
-        
-        layout = QVBoxLayout(edit_window)
-
-        # Table for displaying items
-        columns = ["Cart Part No", "Country of Origin", "A/Unit", "Qty", "Rate Include GST", "Nomenclature"]
-        table = QTableWidget(len(items), len(columns))
-        table.setHorizontalHeaderLabels(columns)
-        table.horizontalHeader().setStretchLastSection(True)
-        table.verticalHeader().setVisible(False)
-        table.setSelectionBehavior(QTableWidget.SelectRows)
-        table.setEditTriggers(QTableWidget.NoEditTriggers)  # Make the table read-only
-
-        # Populate the table with data
-        for row, item in enumerate(items):
-            table.setItem(row, 0, QTableWidgetItem(item.cart_part_no))
-            table.setItem(row, 1, QTableWidgetItem(item.country_of_origin))
-            table.setItem(row, 2, QTableWidgetItem(item.a_unit))
-            table.setItem(row, 3, QTableWidgetItem(str(item.qty)))
-            table.setItem(row, 4, QTableWidgetItem(f"{item.rate_include_gst:.2f}"))
-            table.setItem(row, 5, QTableWidgetItem(item.nomenclature))
-        layout.addWidget(table)
-
-        # Form for editing selected item
-        form_layout = QFormLayout()
-        cart_part_no_edit = QLineEdit()
-        country_of_origin_edit = QLineEdit()
-        a_unit_edit = QLineEdit()
-        qty_edit = QLineEdit()
-        rate_include_gst_edit = QLineEdit()
-        nomenclature_edit = QLineEdit()
-
-        form_layout.addRow("Cart Part No:", cart_part_no_edit)
-        form_layout.addRow("Country of Origin:", country_of_origin_edit)
-        form_layout.addRow("A/Unit:", a_unit_edit)
-        form_layout.addRow("Qty:", qty_edit)
-        form_layout.addRow("Rate Include GST:", rate_include_gst_edit)
-        form_layout.addRow("Nomenclature:", nomenclature_edit)
-
-        form_group = QGroupBox("Edit Item Details")
-        form_group.setLayout(form_layout)
-        layout.addWidget(form_group)
-
-        selected_row = None
-
-        def on_item_select():
-            nonlocal selected_row
-            selected_row = table.currentRow()
-            if selected_row >= 0:
-                # Populate the form with the selected item's details
-                cart_part_no_edit.setText(table.item(selected_row, 0).text())
-                country_of_origin_edit.setText(table.item(selected_row, 1).text())
-                a_unit_edit.setText(table.item(selected_row, 2).text())
-                qty_edit.setText(table.item(selected_row, 3).text())
-                rate_include_gst_edit.setText(table.item(selected_row, 4).text())
-                nomenclature_edit.setText(table.item(selected_row, 5).text())
-
-        def validate_entries():
-            try:
-                qty = int(qty_edit.text())
-                rate_include_gst = float(rate_include_gst_edit.text())
-                if qty <= 0 or rate_include_gst <= 0:
-                    raise ValueError("Qty and Rate Include GST must be positive values.")
-            except ValueError as e:
-                QMessageBox.critical(edit_window, "Input Error", f"Invalid input: {str(e)}")
-                return False
-            return True
-
-        def save_changes():
-            nonlocal selected_row
-            if selected_row is not None and validate_entries():
-                # Update the items list with new values
-                updated_item = items[selected_row]
-                updated_item.cart_part_no = cart_part_no_edit.text()
-                updated_item.country_of_origin = country_of_origin_edit.text()
-                updated_item.a_unit = a_unit_edit.text()
-                updated_item.qty = int(qty_edit.text())
-                updated_item.rate_include_gst = float(rate_include_gst_edit.text())
-                updated_item.nomenclature = nomenclature_edit.text()
-
-                # Update the table with new values
-                table.setItem(selected_row, 0, QTableWidgetItem(updated_item.cart_part_no))
-                table.setItem(selected_row, 1, QTableWidgetItem(updated_item.country_of_origin))
-                table.setItem(selected_row, 2, QTableWidgetItem(updated_item.a_unit))
-                table.setItem(selected_row, 3, QTableWidgetItem(str(updated_item.qty)))
-                table.setItem(selected_row, 4, QTableWidgetItem(f"{updated_item.rate_include_gst:.2f}"))
-                table.setItem(selected_row, 5, QTableWidgetItem(updated_item.nomenclature))
-
-                QMessageBox.information(edit_window, "Success", "Item updated successfully!")
-
-        def save_items_and_po():
-            total_qty = sum(item.qty for item in items)
-            total_amount = sum(item.qty * item.rate_include_gst for item in items)
-
-            new_po.total_qty = total_qty
-            new_po.total_amount = total_amount
-            new_po.items = items
-
-            try:
-                if add:
-                    self.db_handler.add_purchase_order_items(new_po)
-                else:
-                    self.db_handler.update_purchase_order(new_po)
-                    self.db_handler.update_purchase_order_items(new_po)
-
-                QMessageBox.information(edit_window, "Success", "Purchase Order and Items saved successfully!")
-                edit_window.accept()  # Close the dialog
-            except Exception as e:
-                QMessageBox.critical(edit_window, "Error", f"Error saving items and PO: {str(e)}")
-
-        # Buttons for actions
-        button_layout = QHBoxLayout()
-        save_changes_button = QPushButton("Save Changes")
-        save_changes_button.clicked.connect(save_changes)
-        save_items_button = QPushButton("Save Items and PO")
-        save_items_button.clicked.connect(save_items_and_po)
-
-        button_layout.addWidget(save_changes_button)
-        button_layout.addWidget(save_items_button)
-        layout.addLayout(button_layout)
-
-        # Connect the item selection to the form population
-        table.itemSelectionChanged.connect(on_item_select)
-
+        edit_window = ItemEditorDialog(self.db_handler, new_po, items, add, parent=self,
+                                       document_store=self.document_store)
         edit_window.exec_()
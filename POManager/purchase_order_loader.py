@@ -0,0 +1,32 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class PurchaseOrderLoader(QThread):
+    """Streams purchase order headers from the database in pages on a background thread.
+
+    Uses its own DBHandler connection, since a database connection must not be shared between threads.
+    """
+
+    page_loaded = pyqtSignal(list)
+    loading_failed = pyqtSignal(str)
+
+    def __init__(self, db_handler, token, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db_handler = db_handler
+        self.token = token  # Continuation token from get_purchase_orders_page
+        self.page_size = page_size
+
+    def run(self):
+        db_handler = None
+        try:
+            db_handler = self.db_handler.clone()
+            while self.token and not self.isInterruptionRequested():
+                rows, self.token = db_handler.get_purchase_orders_page(
+                    page_size=self.page_size, token=self.token
+                )
+                self.page_loaded.emit(rows)
+        except Exception as e:
+            self.loading_failed.emit(str(e))
+        finally:
+            if db_handler is not None and db_handler is not self.db_handler:
+                db_handler.close_connection()
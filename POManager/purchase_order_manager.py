@@ -2,9 +2,12 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, 
     QHBoxLayout, QPushButton, QWidget, QMessageBox, QDialog, QFormLayout, QLineEdit, QLabel,QInputDialog
 )
+from PyQt5.QtCore import Qt, QTimer
+
+from POManager.table_utils import remove_rows, selected_rows
 
 class PurchaseOrderManager(QMainWindow):
-    def __init__(self, db_handler):
+    def __init__(self, db_handler, poll_interval=5000):
         super().__init__()
         self.db_handler = db_handler
         self.setWindowTitle("Purchase Order Management")
@@ -19,6 +22,8 @@ class PurchaseOrderManager(QMainWindow):
         self.table.setColumnCount(4)
         self.table.setHorizontalHeaderLabels(["PO Number", "Order Date", "Total Qty", "Total Amount"])
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.ExtendedSelection)
         main_layout.addWidget(self.table)
 
         # Buttons for operations
@@ -39,17 +44,54 @@ class PurchaseOrderManager(QMainWindow):
         main_layout.addLayout(button_layout)
 
         self.setCentralWidget(main_widget)
+        self.change_token = self.db_handler.get_change_token()
         self.load_purchase_orders()
 
+        # Pick up inserts, updates and deletes from the change log instead of reloading the table
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_changes)
+        if poll_interval:
+            self.refresh_timer.start(poll_interval)
+
+    def set_row(self, row, po):
+        self.table.setItem(row, 0, QTableWidgetItem(po["po_number"]))
+        self.table.setItem(row, 1, QTableWidgetItem(str(po["order_date"])))
+        self.table.setItem(row, 2, QTableWidgetItem(str(po["total_qty"])))
+        self.table.setItem(row, 3, QTableWidgetItem(f"{po['total_amount']:.2f}"))
+
     def load_purchase_orders(self):
         """Load purchase orders into the table."""
         purchase_orders = self.db_handler.fetch_query("SELECT * FROM PurchaseOrder")
         self.table.setRowCount(len(purchase_orders))
         for row, po in enumerate(purchase_orders):
-            self.table.setItem(row, 0, QTableWidgetItem(po["po_number"]))
-            self.table.setItem(row, 1, QTableWidgetItem(po["order_date"]))
-            self.table.setItem(row, 2, QTableWidgetItem(str(po["total_qty"])))
-            self.table.setItem(row, 3, QTableWidgetItem(f"{po['total_amount']:.2f}"))
+            self.set_row(row, po)
+
+    def find_row(self, po_number):
+        """Return the table row showing this PO number, or -1."""
+        for table_item in self.table.findItems(po_number, Qt.MatchExactly):
+            if table_item.column() == 0:
+                return table_item.row()
+        return -1
+
+    def refresh_changes(self):
+        """Apply only the POs inserted, updated or deleted since the last refresh."""
+        try:
+            changes = self.db_handler.get_changes_since(self.change_token)
+        except Exception as e:
+            print(f"Error polling for changes: {e}")
+            return
+
+        remove_rows(self.table, [self.find_row(deleted["po_number"]) for deleted in changes["deleted"]])
+        for po in changes["inserted"] + changes["updated"]:
+            row = self.find_row(po["po_number"])
+            if row < 0:
+                row = self.table.rowCount()
+                self.table.insertRow(row)
+            self.set_row(row, po)
+
+        self.change_token = changes["token"]
+        if changes["has_more"]:
+            self.refresh_changes()
 
     def get_selected_row(self):
         """Get the currently selected row."""
@@ -63,19 +105,20 @@ class PurchaseOrderManager(QMainWindow):
         self.edit_purchase_order_window()
 
     def delete_purchase_order(self):
-        row = self.get_selected_row()
-        if row is not None:
-            po_number = self.table.item(row, 0).text()
-            self.confirm_and_delete(po_number)
+        rows = selected_rows(self.table)
+        if not rows:
+            QMessageBox.warning(self, "No Selection", "Please select a purchase order.")
+            return
+        self.confirm_and_delete([self.table.item(row, 0).text() for row in rows])
 
-    def confirm_and_delete(self, po_number):
-        result = QMessageBox.question(self, "Delete", f"Are you sure you want to delete Purchase Order: {po_number}?", 
+    def confirm_and_delete(self, po_numbers):
+        label = f"Purchase Order: {po_numbers[0]}" if len(po_numbers) == 1 else f"{len(po_numbers)} Purchase Orders"
+        result = QMessageBox.question(self, "Delete", f"Are you sure you want to delete {label}?",
                                       QMessageBox.Yes | QMessageBox.No)
         if result == QMessageBox.Yes:
-            query = "DELETE FROM PurchaseOrder WHERE po_number = %s"
-            self.db_handler.execute_query(query, (po_number,))
-            self.table.removeRow(self.table.currentRow())
-            QMessageBox.information(self, "Success", "Purchase order deleted successfully.")
+            self.db_handler.delete_purchase_orders(po_numbers)
+            self.refresh_changes()  # Removes the deleted rows in one batch
+            QMessageBox.information(self, "Success", "Purchase orders deleted successfully.")
 
     def update_purchase_order(self):
         row = self.get_selected_row()
@@ -134,4 +177,4 @@ class PurchaseOrderManager(QMainWindow):
 
         self.db_handler.insert_purchase_order(po_number, order_date, total_qty, total_amount)
         dialog.accept()
-        self.load_purchase_orders()
+        self.refresh_changes()
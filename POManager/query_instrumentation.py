@@ -0,0 +1,235 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+# Frames from these files are skipped when looking for the code that issued a query
+_INTERNAL_FILES = (os.path.join("POManager", "db_handler.py"), os.path.join("POManager", "query_instrumentation.py"))
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """Normalise a query so statements that only differ in their values group together."""
+    normalised = re.sub(r"--[^\n]*|/\*.*?\*/", " ", query, flags=re.DOTALL)
+    normalised = re.sub(r"'(?:[^'\\]|\\.)*'", "?", normalised)  # String literals
+    normalised = re.sub(r"\b\d+(\.\d+)?\b", "?", normalised)  # Numbers
+    normalised = normalised.replace("%s", "?")
+    normalised = re.sub(r"\(\s*\?(\s*,\s*\?)*\s*\)", "(?+)", normalised)  # IN lists of any length
+    return re.sub(r"\s+", " ", normalised).strip().upper()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted sequence."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def track_action(db_handler, name):
+    """Group the queries run inside the block under a UI action; a no-op when instrumentation is off."""
+    instrumentation = getattr(db_handler, "instrumentation", None)
+    if instrumentation is None:
+        return nullcontext()
+    return instrumentation.action(name)
+
+
+class QueryStats:
+    def __init__(self, max_samples):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = deque(maxlen=max_samples)  # Most recent latencies for the percentiles
+        self.call_sites = {}
+
+    def add(self, elapsed, rows, call_site, error):
+        self.count += 1
+        self.rows += rows or 0
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.samples.append(elapsed)
+        if error:
+            self.errors += 1
+        self.call_sites[call_site] = self.call_sites.get(call_site, 0) + 1
+
+    def to_dict(self):
+        samples = list(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_time": self.total_time,
+            "mean": self.total_time / self.count if self.count else None,
+            "max": self.max_time,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "call_sites": dict(sorted(self.call_sites.items(), key=lambda entry: -entry[1])[:5]),
+        }
+
+
+class QueryInstrumentation:
+    """Records latency, row counts and call sites of the statements DBHandler runs.
+
+    Attach an instance to DBHandler.instrumentation to enable it; with the attribute left as None
+    DBHandler skips all bookkeeping.
+    """
+
+    def __init__(self, slow_query_threshold=0.2, slow_query_log=None, max_samples=1000, max_slow_queries=200):
+        self.slow_query_threshold = slow_query_threshold  # Seconds
+        self.slow_query_log = slow_query_log  # Optional file that slow queries are appended to as JSON lines
+        self.max_samples = max_samples
+        self.hooks = []
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        self._queries = {}
+        self._actions = {}
+        self._targets = {}  # Connection target (primary/replica) -> QueryStats
+        self._all_samples = deque(maxlen=max_samples)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._stop_dump = threading.Event()
+
+    def add_hook(self, hook):
+        """Register a callable that receives a dict for every recorded statement."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _call_site(self):
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if not filename.endswith(_INTERNAL_FILES):
+                return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+            frame = frame.f_back
+        return "unknown"
+
+    @contextmanager
+    def action(self, name):
+        """Attribute every query run in this thread inside the block to a UI action."""
+        previous = getattr(self._local, "action", None)
+        self._local.action = name
+        with self._lock:
+            stats = self._actions.setdefault(name, {"invocations": 0, "queries": 0, "query_time": 0.0})
+            stats["invocations"] += 1
+        try:
+            yield
+        finally:
+            self._local.action = previous
+
+    def record(self, query, elapsed, rows=0, error=None, **extra):
+        """Record one executed statement. Called by DBHandler; `extra` is passed through to hooks."""
+        record = {
+            "fingerprint": fingerprint(query),
+            "elapsed": elapsed,
+            "rows": rows,
+            "call_site": self._call_site(),
+            "action": getattr(self._local, "action", None),
+            "error": str(error) if error else None,
+            "timestamp": time.time(),
+        }
+        record.update(extra)
+
+        with self._lock:
+            stats = self._queries.get(record["fingerprint"])
+            if stats is None:
+                stats = self._queries[record["fingerprint"]] = QueryStats(self.max_samples)
+            stats.add(elapsed, rows, record["call_site"], error)
+            self._all_samples.append(elapsed)
+            target = record.get("target")
+            if target is not None:
+                target_stats = self._targets.get(target)
+                if target_stats is None:
+                    target_stats = self._targets[target] = QueryStats(self.max_samples)
+                target_stats.add(elapsed, rows, record["call_site"], error)
+            if record["action"] is not None:
+                # reset() may have dropped the entry of an action that is still running
+                action = self._actions.setdefault(record["action"], {"invocations": 0, "queries": 0, "query_time": 0.0})
+                action["queries"] += 1
+                action["query_time"] += elapsed
+            if elapsed >= self.slow_query_threshold:
+                self.slow_queries.append(record)
+
+        if elapsed >= self.slow_query_threshold and self.slow_query_log:
+            self._write_slow_query(record)
+
+        for hook in self.hooks:
+            hook(record)
+
+    def _write_slow_query(self, record):
+        try:
+            with open(self.slow_query_log, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Error writing slow query log: {e}")
+
+    def snapshot(self):
+        """Return aggregate counters for all statements, per fingerprint, per UI action and per connection target."""
+        with self._lock:
+            samples = list(self._all_samples)
+            queries = {key: stats.to_dict() for key, stats in self._queries.items()}
+            targets = {key: stats.to_dict() for key, stats in self._targets.items()}
+            actions = {}
+            for name, stats in self._actions.items():
+                actions[name] = dict(stats)
+                actions[name]["queries_per_action"] = stats["queries"] / stats["invocations"] if stats["invocations"] else 0
+            slow_queries = list(self.slow_queries)
+
+        return {
+            "generated_at": time.time(),
+            "overall": {
+                "count": sum(stats["count"] for stats in queries.values()),
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+            },
+            "queries": queries,
+            "actions": actions,
+            "targets": targets,
+            "slow_queries": slow_queries,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._actions.clear()
+            self._targets.clear()
+            self._all_samples.clear()
+            self.slow_queries.clear()
+
+    def dump(self, path):
+        """Write the current snapshot to a JSON file, replacing it atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        os.replace(temp_path, path)
+
+    def start_periodic_dump(self, path, interval=60):
+        """Dump the snapshot to `path` every `interval` seconds on a daemon thread."""
+        self.stop_periodic_dump()
+        self._stop_dump.clear()
+
+        def run():
+            while not self._stop_dump.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print(f"Error writing query stats: {e}")
+
+        self._dump_thread = threading.Thread(target=run, name="query-stats-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._stop_dump.set()
+            self._dump_thread.join()
+            self._dump_thread = None
@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+import time
+
+from POManager.cli import add_db_arguments, db_handler_from_args
+
+
+def reconcile(db_handler, batch_size=500, pause=0.0):
+    """Recompute item quantities and PO fulfilment status for every PO, `batch_size` POs per transaction.
+
+    Returns run statistics: POs and items processed, batches, duration and items per second.
+    """
+    started = time.perf_counter()
+    stats = {"purchase_orders": 0, "items": 0, "batches": 0}
+    after_id = 0
+    while True:
+        result = db_handler.reconcile_purchase_orders(after_id, batch_size)
+        if result is None:
+            break
+        after_id, purchase_orders, items = result
+        stats["purchase_orders"] += purchase_orders
+        stats["items"] += items
+        stats["batches"] += 1
+        if pause:
+            time.sleep(pause)  # Lets other writers in between batches
+    stats["seconds"] = time.perf_counter() - started
+    stats["items_per_sec"] = stats["items"] / stats["seconds"] if stats["seconds"] else None
+    return stats
+
+
+def main(argv=None):
+    """Reconcile delivery quantities, e.g. `python -m POManager.reconciliation --every 900`.
+
+    Without --every the job runs once, e.g. from cron; with it, it runs again every N seconds.
+    """
+    parser = argparse.ArgumentParser(description="Recompute delivered/approved/remaining quantities and PO fulfilment")
+    parser.add_argument("--batch-size", type=int, default=500, help="POs reconciled per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    parser.add_argument("--every", type=float, help="Run again every this many seconds until interrupted")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        sys.exit(1)
+    try:
+        while True:
+            try:
+                stats = reconcile(db_handler, args.batch_size, args.pause)
+                print(json.dumps(stats))
+            except db_handler.backend.Error as e:
+                print(f"Reconciliation failed: {e}", file=sys.stderr)
+                if args.every is None:
+                    sys.exit(1)
+            if args.every is None:
+                break
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_handler.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from POManager.cli import add_db_arguments, db_handler_from_args
+
+# Report name -> ReportRollup column the figures are grouped by
+DIMENSIONS = {
+    "country": "country_of_origin",
+    "unit": "a_unit",
+    "day": "day",
+    "month": "day",  # Days are folded into months by spend_report
+}
+
+
+def report_row(key, row):
+    item_count = int(row['item_count'] or 0)
+    total_qty = int(row['total_qty'] or 0)
+    approved_qty = int(row['approved_qty'] or 0)
+    return {
+        "key": key,
+        "items": item_count,
+        "qty": total_qty,
+        "spend": Decimal(str(row['spend'] or 0)),
+        "delivered_qty": int(row['delivered_qty'] or 0),
+        "approved_qty": approved_qty,
+        "outstanding_qty": total_qty - approved_qty,
+    }
+
+
+def spend_report(db_handler, by="country", start=None, end=None):
+    """Spend, quantities and outstanding quantity per country, unit, day or month over [start, end).
+
+    Reads the ReportRollup table only, so the cost depends on the number of days and groups in
+    the range rather than on the number of items.
+    """
+    rows = db_handler.get_report_rollup(DIMENSIONS[by], start, end) or []
+    if by != "month":
+        return [report_row(row['dimension'] if row['dimension'] != "" else None, row) for row in rows]
+
+    months = {}
+    for row in rows:
+        day = row['dimension']
+        month = day.strftime("%Y-%m") if isinstance(day, date) else str(day)[:7]
+        totals = months.setdefault(month, dict.fromkeys(("item_count", "total_qty", "spend", "delivered_qty", "approved_qty"), 0))
+        for measure in totals:
+            totals[measure] += Decimal(str(row[measure] or 0)) if measure == "spend" else int(row[measure] or 0)
+    return [report_row(month, totals) for month, totals in sorted(months.items())]
+
+
+def outstanding_report(db_handler, start=None, end=None):
+    """Quantities ordered but not yet approved on delivery, per country of origin, largest first."""
+    rows = [row for row in spend_report(db_handler, "country", start, end) if row["outstanding_qty"] > 0]
+    return sorted(rows, key=lambda row: row["outstanding_qty"], reverse=True)
+
+
+def format_report(rows):
+    lines = [f"{'':<20} {'items':>8} {'qty':>10} {'spend':>16} {'delivered':>10} {'approved':>10} {'outstanding':>12}"]
+    for row in rows:
+        key = "(none)" if row["key"] is None else str(row["key"])
+        lines.append(f"{key:<20} {row['items']:>8} {row['qty']:>10} {row['spend']:>16,.2f} "
+                     f"{row['delivered_qty']:>10} {row['approved_qty']:>10} {row['outstanding_qty']:>12}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Spend and delivery reports, e.g. `python -m POManager.reporting spend --by month --start 2024-01-01`.
+
+    `rebuild` recomputes the rollup table from the item and delivery tables, e.g. after rows
+    were loaded or changed without going through DBHandler.
+    """
+    parser = argparse.ArgumentParser(description="Spend and delivery reports from the rollup tables")
+    parser.add_argument("report", choices=["spend", "outstanding", "rebuild"])
+    parser.add_argument("--by", choices=sorted(DIMENSIONS), default="country", help="Grouping of the spend report")
+    parser.add_argument("--start", type=date.fromisoformat, help="First order date included (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="First order date excluded (YYYY-MM-DD)")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db_handler = db_handler_from_args(args)
+    if db_handler.connection is None:
+        sys.exit(1)
+    try:
+        if args.report == "rebuild":
+            started = time.perf_counter()
+            db_handler.rebuild_report_rollup()
+            print(f"Rebuilt the report rollup in {time.perf_counter() - started:.1f}s")
+        elif args.report == "outstanding":
+            print(format_report(outstanding_report(db_handler, args.start, args.end)))
+        else:
+            print(format_report(spend_report(db_handler, args.by, args.start, args.end)))
+    finally:
+        db_handler.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QImage, QPixmap
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QLabel, QMessageBox, QPushButton, QScrollArea, QToolButton, QVBoxLayout, QWidget
+)
+
+
+def thumbnail_pixmap(document):
+    pixmap = QPixmap()
+    pixmap.loadFromData(bytes(document['thumbnail'] or b""), "JPG")
+    return pixmap
+
+
+class ScanThumbnails(QWidget):
+    """Column of scan thumbnails; clicking one opens it in a ScanViewerDialog."""
+
+    def __init__(self, document_store, documents, parent=None):
+        super().__init__(parent)
+        self.document_store = document_store
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for document in documents:
+            button = QToolButton(self)
+            pixmap = thumbnail_pixmap(document)
+            button.setIcon(QIcon(pixmap))
+            button.setIconSize(pixmap.size())
+            button.setToolTip(f"{document['image_name'] or 'Scan'} ({document['width']}x{document['height']}), click to zoom")
+            button.clicked.connect(lambda checked=False, document=document: self.open(document))
+            layout.addWidget(button)
+        layout.addStretch()
+
+    def open(self, document):
+        ScanViewerDialog(self.document_store, document, parent=self).exec_()
+
+
+class ScanViewerDialog(QDialog):
+    """Shows a scan from its thumbnail and decodes the full-resolution original on the first zoom."""
+
+    ZOOM_STEP = 1.25
+
+    def __init__(self, document_store, document, parent=None):
+        super().__init__(parent)
+        self.document_store = document_store
+        self.document = document
+        self.full_image = None  # QPixmap of the original, loaded on the first zoom
+        self.scale = 1.0  # Of full_image
+        self.setWindowTitle(document['image_name'] or f"Scan of PO {document['po_number']}")
+        self.resize(900, 1000)
+
+        layout = QVBoxLayout(self)
+        self.image_label = QLabel(self)
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setPixmap(thumbnail_pixmap(document))
+        self.scroll_area = QScrollArea(self)
+        self.scroll_area.setWidget(self.image_label)
+        self.scroll_area.setWidgetResizable(True)
+        layout.addWidget(self.scroll_area)
+
+        button_layout = QHBoxLayout()
+        for text, factor in (("Zoom In", self.ZOOM_STEP), ("Zoom Out", 1 / self.ZOOM_STEP), ("Actual Size", None)):
+            button = QPushButton(text)
+            button.clicked.connect(lambda checked=False, factor=factor: self.zoom(factor))
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+
+    def load_full_image(self):
+        import cv2
+
+        try:
+            image = cv2.cvtColor(self.document_store.load_image(self.document), cv2.COLOR_BGR2RGB)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"The scan could not be loaded:\n{e}")
+            return False
+        height, width = image.shape[:2]
+        # QImage does not copy the array, so the pixmap is made while `image` is alive
+        self.full_image = QPixmap.fromImage(QImage(image.data, width, height, image.strides[0], QImage.Format_RGB888))
+        # Continue from the size the thumbnail is shown at
+        self.scale = thumbnail_pixmap(self.document).width() / width
+        return True
+
+    def zoom(self, factor):
+        """Scale the scan by `factor`, or show it at its actual size when factor is None."""
+        if self.full_image is None and not self.load_full_image():
+            return
+        self.scale = 1.0 if factor is None else min(4.0, max(0.05, self.scale * factor))
+        self.scroll_area.setWidgetResizable(False)
+        self.image_label.setPixmap(self.full_image.scaled(
+            round(self.full_image.width() * self.scale), round(self.full_image.height() * self.scale),
+            Qt.KeepAspectRatio, Qt.SmoothTransformation
+        ))
+        self.image_label.adjustSize()
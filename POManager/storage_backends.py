@@ -0,0 +1,232 @@
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+
+class StorageBackend:
+    """Connection factory and SQL dialect for one kind of database.
+
+    DBHandler writes its SQL in MySQL syntax with %s placeholders; a backend connects and
+    adapts the few statements that differ. Connections follow the mysql.connector API
+    (cursor(dictionary=...), commit, rollback, is_connected, close).
+    """
+
+    name = None
+    Error = Exception  # Base class of the driver's database errors
+    last_insert_id_query = None
+    skip_locked_clause = ""  # Appended to a SELECT that claims a row for update
+
+    def connect(self):
+        raise NotImplementedError
+
+    def begin_write(self, connection):
+        """Start a transaction that holds write locks until commit; the default relies on row locks."""
+
+    def translate_ddl(self, statement):
+        """Adapt a CREATE statement written for MySQL to this database."""
+        return statement
+
+    def is_duplicate_object_error(self, error):
+        """True if a DDL statement failed only because its table, column or index already exists."""
+        return False
+
+    def prepared_cursor(self, connection):
+        """Return a cursor that keeps its statement prepared between executions of the same SQL."""
+        return connection.cursor()
+
+    def accumulate_clause(self, key_columns, columns):
+        """Clause making an INSERT add `columns` onto the row that already has the same `key_columns`."""
+        raise NotImplementedError
+
+    def describe(self):
+        return self.name
+
+
+class MySQLBackend(StorageBackend):
+    name = "mysql"
+    last_insert_id_query = "SELECT LAST_INSERT_ID() AS id"
+    # Competing workers skip rows another transaction has locked instead of queueing behind it
+    skip_locked_clause = " FOR UPDATE SKIP LOCKED"
+
+    def __init__(self, host, user, password, database, port=None):
+        # Imported here so SQLite-only installs do not need mysql-connector
+        import mysql.connector
+        self.driver = mysql.connector
+        self.Error = mysql.connector.Error
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def connect(self):
+        settings = {"host": self.host, "user": self.user, "password": self.password, "database": self.database}
+        if self.port:
+            settings["port"] = self.port
+        return self.driver.connect(**settings)
+
+    def is_duplicate_object_error(self, error):
+        # ER_TABLE_EXISTS_ERROR, ER_DUP_FIELDNAME, ER_DUP_KEYNAME
+        return getattr(error, "errno", None) in (1050, 1060, 1061)
+
+    def prepared_cursor(self, connection):
+        # Server-side prepared statement; re-executing the same SQL on this cursor skips the parse
+        return connection.cursor(prepared=True)
+
+    def accumulate_clause(self, key_columns, columns):
+        return " ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = {column} + VALUES({column})" for column in columns)
+
+    def describe(self):
+        host = f"{self.host}:{self.port}" if self.port else self.host
+        return f"MySQL database {self.database} on {host}"
+
+
+# SQLite stores dates and decimals as text/numbers; convert them back to the types mysql.connector returns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+
+
+@lru_cache(maxsize=1024)
+def to_sqlite_placeholders(query):
+    """Turn %s placeholders into ?; cached so repeated statements hit sqlite3's statement cache."""
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary):
+        self.cursor = cursor
+        if dictionary:
+            cursor.row_factory = self.dict_row
+
+    @staticmethod
+    def dict_row(cursor, row):
+        return {column[0]: value for column, value in zip(cursor.description, row)}
+
+    def execute(self, query, params=None):
+        self.cursor.execute(to_sqlite_placeholders(query), params or ())
+
+    def executemany(self, query, params_list):
+        self.cursor.executemany(to_sqlite_placeholders(query), params_list)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def close(self):
+        self.cursor.close()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+
+class SQLiteConnection:
+    """Wraps sqlite3.Connection in the subset of the mysql.connector API DBHandler uses."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self.connection.cursor(), dictionary)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def is_connected(self):
+        return self.connection is not None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded database file; suited to single-site installs with no database server."""
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    last_insert_id_query = "SELECT last_insert_rowid() AS id"
+
+    # WAL lets readers run alongside the single writer; NORMAL sync is durable across app crashes
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "temp_store": "MEMORY",
+        "cache_size": "-65536",  # 64 MB
+        "mmap_size": "268435456",  # 256 MB
+        "busy_timeout": "5000",
+    }
+    # The base prepared_cursor is enough: sqlite3 keeps compiled statements in its per-connection cache
+
+    def __init__(self, path, pragmas=None, cached_statements=512):
+        self.path = path
+        self.pragmas = dict(self.PRAGMAS, **(pragmas or {}))
+        self.cached_statements = cached_statements
+
+    def connect(self):
+        # Every DBHandler owns its connection, but pools and loaders may open it on another thread
+        connection = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        for pragma, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        return SQLiteConnection(connection)
+
+    def begin_write(self, connection):
+        # SQLite has no row locks; take the database write lock up front so a claim cannot race
+        connection.connection.execute("BEGIN IMMEDIATE")
+
+    def translate_ddl(self, statement):
+        statement = re.sub(r"\b(BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", "INTEGER PRIMARY KEY AUTOINCREMENT",
+                           statement, flags=re.IGNORECASE)
+        # MySQL has no IF NOT EXISTS for indexes; SQLite does, which makes re-running migrations harmless
+        return re.sub(r"^\s*CREATE\s+INDEX\s+(?!IF)", "CREATE INDEX IF NOT EXISTS ", statement, flags=re.IGNORECASE)
+
+    def is_duplicate_object_error(self, error):
+        message = str(error).lower()
+        return "already exists" in message or message.startswith("duplicate column name")
+
+    def accumulate_clause(self, key_columns, columns):
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns)
+        return f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+
+    def describe(self):
+        return f"SQLite database {self.path}"
+
+
+def create_backend(name, **settings):
+    """Build a backend by name: 'mysql' (host, user, password, database, optional port) or 'sqlite' (path)."""
+    if name == "mysql":
+        return MySQLBackend(settings["host"], settings["user"], settings["password"], settings["database"],
+                            settings.get("port"))
+    if name == "sqlite":
+        return SQLiteBackend(settings["path"])
+    raise ValueError(f"Unknown storage backend: {name}")
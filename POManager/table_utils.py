@@ -0,0 +1,28 @@
+def selected_rows(table):
+    """Return the indexes of the fully selected rows of a QTableWidget, in ascending order."""
+    return sorted(index.row() for index in table.selectionModel().selectedRows())
+
+
+def remove_rows(table, rows):
+    """Remove many rows from a QTableWidget at once.
+
+    Rows are grouped into contiguous runs and each run is removed with a single removeRows
+    call on the model, bottom run first, with repaints suspended until the end.
+    """
+    rows = sorted(set(row for row in rows if row >= 0), reverse=True)
+    if not rows:
+        return
+    runs = []
+    for row in rows:
+        if runs and runs[-1][0] == row + 1:
+            runs[-1][0] = row
+            runs[-1][1] += 1
+        else:
+            runs.append([row, 1])
+
+    table.setUpdatesEnabled(False)
+    try:
+        for start, count in runs:
+            table.model().removeRows(start, count)
+    finally:
+        table.setUpdatesEnabled(True)
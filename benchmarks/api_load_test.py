@@ -0,0 +1,192 @@
+"""Load-test the HTTP API and report requests per second and latencies per endpoint.
+
+Examples:
+    python -m benchmarks.api_load_test --backend sqlite --pos 500 --clients 8 --duration 10
+    python -m benchmarks.api_load_test --url http://127.0.0.1:8765 --clients 16 --output api.json
+
+Without --url a server is started in-process on synthetic data, once with the response cache
+and once without, and the data is deleted afterwards. With --url an already running server is
+measured as it is. Every client thread keeps one HTTP/1.1 connection open and picks requests
+from the mix: PO listing pages, PO detail, conditional PO detail (If-None-Match) and search.
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from benchmarks.common import add_db_arguments, connect_db, quiet, write_results
+from benchmarks.data_generator import SyntheticDataGenerator
+
+MIX = {"list": 2, "detail": 5, "conditional": 2, "search": 1}
+
+
+class Client(threading.Thread):
+    def __init__(self, host, port, po_numbers, deadline, seed):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.po_numbers = po_numbers
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.etags = {}
+        self.latencies = {name: [] for name in MIX}
+        self.statuses = {}
+
+    def request(self, path, headers=None):
+        self.connection.request("GET", path, headers=headers or {})
+        response = self.connection.getresponse()
+        response.read()
+        return response
+
+    def run(self):
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        names, weights = list(MIX), list(MIX.values())
+        while time.perf_counter() < self.deadline:
+            name = self.rng.choices(names, weights)[0]
+            po_number = self.rng.choice(self.po_numbers)
+            headers = None
+            if name == "list":
+                path = f"/purchase-orders?page_size=50&po_prefix={quote(po_number[:-2])}"
+            elif name == "search":
+                path = f"/search?q={quote(po_number[-4:])}"
+            else:
+                path = f"/purchase-orders/{quote(po_number)}"
+                if name == "conditional" and po_number in self.etags:
+                    headers = {"If-None-Match": self.etags[po_number]}
+            started = time.perf_counter()
+            try:
+                response = self.request(path, headers)
+            except (OSError, http.client.HTTPException):
+                self.statuses["error"] = self.statuses.get("error", 0) + 1
+                self.connection.close()
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                continue
+            self.latencies[name].append(time.perf_counter() - started)
+            self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+            if response.getheader("ETag") and name in ("detail", "conditional"):
+                self.etags[po_number] = response.getheader("ETag")
+        self.connection.close()
+
+
+def summarize(latencies, seconds):
+    if not latencies:
+        return {"requests": 0}
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000
+    }
+
+
+def fetch_po_numbers(host, port, limit):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", f"/purchase-orders?page_size={limit}")
+    response = connection.getresponse()
+    document = json.loads(response.read())
+    connection.close()
+    return [row["po_number"] for row in document["purchase_orders"]]
+
+
+def run_load(host, port, clients, duration, seed, po_numbers=None):
+    """Run `clients` threads for `duration` seconds and return results per endpoint plus the total."""
+    po_numbers = po_numbers or fetch_po_numbers(host, port, 1000)
+    if not po_numbers:
+        raise SystemExit("The server has no purchase orders to request.")
+    deadline = time.perf_counter() + duration
+    threads = [Client(host, port, po_numbers, deadline, seed + index) for index in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    results = {name: summarize([value for thread in threads for value in thread.latencies[name]], seconds) for name in MIX}
+    results["total"] = summarize([value for thread in threads for name in MIX for value in thread.latencies[name]], seconds)
+    statuses = {}
+    for thread in threads:
+        for status, count in thread.statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    results["total"]["statuses"] = statuses
+    return results
+
+
+def run_in_process(args):
+    """Serve synthetic data from an in-process APIServer, with and without the response cache."""
+    from POManager.api_server import APIServer
+
+    generator = SyntheticDataGenerator(
+        num_pos=args.pos, items_per_po=args.items, deliveries_per_item=0, seed=args.seed,
+        po_prefix=f"API{int(time.time())}"
+    )
+    purchase_orders = generator.purchase_orders()
+    with quiet():
+        db_handler = connect_db(args)
+        for po in purchase_orders:
+            po.id = db_handler.add_purchase_order(po)
+            db_handler.add_purchase_order_items(po)
+    po_numbers = [po.po_number for po in purchase_orders]
+
+    results = {}
+    try:
+        for label, cache_size in (("cached", 1000), ("uncached", 0)):
+            server = APIServer(("127.0.0.1", 0), db_handler, pool_size=args.pool_size, cache_size=cache_size,
+                               quiet=True)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            print(f"Load testing the {label} server for {args.duration}s with {args.clients} clients...",
+                  file=sys.stderr)
+            try:
+                for name, stats in run_load("127.0.0.1", server.server_address[1], args.clients, args.duration,
+                                            args.seed, po_numbers).items():
+                    results[f"api.{label}.{name}"] = stats
+            finally:
+                server.shutdown()
+                with quiet():
+                    server.server_close()
+    finally:
+        with quiet():
+            db_handler.delete_purchase_orders(po_numbers)
+            db_handler.close_connection()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server; by default one is started in-process")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each load run lasts")
+    parser.add_argument("--pos", type=int, default=500, help="Purchase orders to generate for the in-process server")
+    parser.add_argument("--items", type=int, default=20, help="Items per purchase order")
+    parser.add_argument("--pool-size", type=int, default=8, help="Connection pool size of the in-process server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        results = {f"api.{name}": stats for name, stats in
+                   run_load(url.hostname, url.port or 80, args.clients, args.duration, args.seed).items()}
+    else:
+        results = run_in_process(args)
+
+    for name, stats in results.items():
+        if stats.get("requests"):
+            print(f"{name:<28}{stats['requests_per_sec']:>10.1f} req/s  p50 {stats['p50_ms']:.2f} ms  "
+                  f"p95 {stats['p95_ms']:.2f} ms", file=sys.stderr)
+    params = {key: value for key, value in vars(args).items() if key != "password"}
+    write_results(results, params, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Run the DB benchmarks against several storage backends and print their latencies side by side.
+
+Examples:
+    python -m benchmarks.backend_comparison --pos 200 --items 20
+    python -m benchmarks.backend_comparison --backends sqlite --sqlite-path /tmp/bench.sqlite3 --output sqlite.json
+
+Each backend gets the same synthetic data. Results are keyed "<backend>.<benchmark>" so the
+file can also be fed to benchmarks.compare.
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.common import add_db_arguments, write_results
+from benchmarks.data_generator import SyntheticDataGenerator
+from benchmarks.run_benchmarks import bench_db
+
+BACKENDS = ["mysql", "sqlite"]
+
+
+def print_table(results, backends):
+    benchmarks = sorted({key.split(".", 1)[1] for key in results})
+    width = max([len(name) for name in benchmarks] + [10])
+    print(f"{'benchmark':<{width}}" + "".join(f"{backend + ' ms':>14}" for backend in backends) + f"{'ratio':>10}", file=sys.stderr)
+    for name in benchmarks:
+        medians = [results.get(f"{backend}.{name}", {}).get("median") for backend in backends]
+        cells = "".join(f"{median * 1000:>14.2f}" if median is not None else f"{'-':>14}" for median in medians)
+        ratio = ""
+        if len(medians) == 2 and None not in medians and medians[1]:
+            ratio = f"{medians[0] / medians[1]:.2f}x"
+        print(f"{name:<{width}}{cells}{ratio:>10}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--pos", type=int, default=100, help="Number of purchase orders to generate")
+    parser.add_argument("--items", type=int, default=20, help="Items per purchase order")
+    parser.add_argument("--deliveries", type=int, default=2, help="Deliveries per item")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for backend in args.backends:
+        print(f"Running db benchmarks on {backend}...", file=sys.stderr)
+        generator = SyntheticDataGenerator(
+            num_pos=args.pos,
+            items_per_po=args.items,
+            deliveries_per_item=args.deliveries,
+            seed=args.seed,
+            po_prefix=f"BENCH{int(time.time())}"
+        )
+        for name, stats in bench_db(args, generator, backend=backend).items():
+            results[f"{backend}.{name}"] = stats
+
+    print_table(results, args.backends)
+    params = {key: value for key, value in vars(args).items() if key != "password"}
+    write_results(results, params, args.output)
+
+
+if __name__ == "__main__":
+    main()
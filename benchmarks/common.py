@@ -0,0 +1,89 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from POManager import cli
+
+
+def add_db_arguments(parser):
+    """Add the connection options shared by every benchmark that touches a database."""
+    cli.add_db_arguments(parser, database="purchase_order_bench", sqlite_path="purchase_order_bench.sqlite3")
+
+
+def connect_db(args, backend=None, **kwargs):
+    """Open a DBHandler for the parsed add_db_arguments options; `backend` overrides --backend."""
+    return cli.db_handler_from_args(args, backend, **kwargs)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the debug prints of the code under test so they don't flood the terminal."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(func, repeat=5, units=1, setup=None):
+    """Run func `repeat` times and return timing statistics in seconds.
+
+    `units` is the number of rows/items one call processes and is used for the throughput figure.
+    `setup` runs before every call and is not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        "runs": repeat,
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "units": units,
+        "units_per_sec": units / median if median else None
+    }
+
+
+def write_results(results, params, output=None):
+    """Write benchmark results as JSON (to `output` or stdout) and return the document."""
+    document = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": params
+        },
+        "results": results
+    }
+    text = json.dumps(document, indent=2, default=str)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+    return document
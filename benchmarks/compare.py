@@ -0,0 +1,49 @@
+"""Compare two benchmark JSON files and flag regressions.
+
+Example:
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Exits with status 1 if any benchmark's median got slower by more than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    """Return the timed results of a benchmark file; summary entries without a median are skipped."""
+    with open(path) as f:
+        results = json.load(f)["results"]
+    return {name: result for name, result in results.items() if "median" in result}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    regressions = 0
+
+    print(f"{'benchmark':<45} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name in sorted(set(baseline) | set(candidate)):
+        if name not in baseline or name not in candidate:
+            print(f"{name:<45} {'only in ' + ('baseline' if name in baseline else 'candidate'):>35}")
+            continue
+        before = baseline[name]["median"]
+        after = candidate[name]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<45} {before * 1000:>10.2f}ms {after * 1000:>10.2f}ms {change:>+8.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from POManager.item import Item
+from POManager.purchase_order import PurchaseOrder
+
+COUNTRIES = ['USA', 'PAK', 'ITALY', 'JAPAN', 'OEM', 'GEN', 'CHINA', 'KOREA']
+UNITS = ['NOS', 'SET']
+NOMENCLATURE_WORDS = [
+    'BEARING', 'BALL', 'ROLLER', 'SEAL', 'OIL', 'FILTER', 'ELEMENT', 'GASKET', 'VALVE',
+    'ASSY', 'PUMP', 'HOSE', 'CLAMP', 'BOLT', 'NUT', 'WASHER', 'SPRING', 'BRAKE', 'PAD',
+    'SHOE', 'LINING', 'CABLE', 'SWITCH', 'RELAY', 'LAMP', 'BULB', 'MIRROR', 'GLASS',
+]
+
+
+class SyntheticDataGenerator:
+    """Generates reproducible purchase orders, items and deliveries for benchmarks."""
+
+    def __init__(self, num_pos=100, items_per_po=20, deliveries_per_item=2, seed=0, po_prefix="BENCH"):
+        self.num_pos = num_pos
+        self.items_per_po = items_per_po
+        self.deliveries_per_item = deliveries_per_item
+        self.seed = seed
+        self.po_prefix = po_prefix
+
+    def _random_item(self, rng):
+        part_no = f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randint(10, 99)}-{rng.randint(1000, 99999)}"
+        nomenclature = ' '.join(rng.choice(NOMENCLATURE_WORDS) for _ in range(rng.randint(1, 4)))
+        return Item(
+            cart_part_no=part_no,
+            country_of_origin=rng.choice(COUNTRIES),
+            a_unit=rng.choice(UNITS),
+            qty=rng.randint(1, 500),
+            rate_include_gst=round(rng.uniform(10, 25000), 2),
+            nomenclature=nomenclature
+        )
+
+    def purchase_orders(self):
+        """Return a list of fully populated PurchaseOrder objects."""
+        rng = random.Random(self.seed)
+        start_date = date(2020, 1, 1)
+        purchase_orders = []
+
+        for index in range(self.num_pos):
+            po = PurchaseOrder(f"{self.po_prefix}-{index:06d}")
+            po.added_date = (start_date + timedelta(days=rng.randint(0, 1800))).strftime("%Y-%m-%d")
+            for _ in range(self.items_per_po):
+                po.add_item(self._random_item(rng))
+            po.total_qty = sum(item.qty for item in po.items)
+            po.total_amount = round(sum(item.qty * item.rate_include_gst for item in po.items), 2)
+            purchase_orders.append(po)
+
+        return purchase_orders
+
+    def deliveries(self, item):
+        """Return (challan_no, delivery_date, delivered_qty, rejected_qty, approved_qty) tuples for an item."""
+        rng = random.Random(f"{self.seed}-{item.cart_part_no}")
+        remaining = item.qty or 0
+        deliveries = []
+
+        for index in range(self.deliveries_per_item):
+            if remaining <= 0:
+                break
+            delivered = remaining if index == self.deliveries_per_item - 1 else rng.randint(1, remaining)
+            rejected = rng.randint(0, delivered // 10)
+            deliveries.append((
+                f"CH-{rng.randint(100000, 999999)}",
+                (date(2020, 1, 1) + timedelta(days=rng.randint(0, 1800))).strftime("%Y-%m-%d"),
+                delivered,
+                rejected,
+                delivered - rejected
+            ))
+            remaining -= delivered
+
+        return deliveries
+
+    def ocr_text(self, items):
+        """Render items the way tesseract returns a scanned PO table."""
+        lines = ["Cart Part No Country of Origin A/Unit Qty Rate Include GST Nomenclature Amount"]
+        total_amount = 0
+        for item in items:
+            amount = item.qty * item.rate_include_gst
+            total_amount += amount
+            lines.append(
+                f"{item.cart_part_no} {item.country_of_origin} {item.a_unit} {item.qty} "
+                f"{item.rate_include_gst:,.2f} {item.nomenclature} {amount:,.2f}"
+            )
+        lines.append(f"Total:- {total_amount:,.2f}")
+        lines.append("Grand Total Amount in words")
+        return '\n'.join(lines)
+
+
+class InMemoryDBHandler:
+    """Stand-in for DBHandler serving generated rows to the UI without a database."""
+
+    def __init__(self, purchase_orders):
+        self.po_rows = []
+        self.item_rows = {}
+        item_id = 1
+
+        for po_id, po in enumerate(purchase_orders, start=1):
+            self.po_rows.append({
+                'id': po_id,
+                'po_number': po.po_number,
+                'order_date': date.fromisoformat(po.added_date),
+                'total_qty': po.total_qty,
+                'total_amount': Decimal(str(po.total_amount))
+            })
+            rows = []
+            for item in po.items:
+                rows.append({
+                    'id': item_id,
+                    'purchase_order_id': po_id,
+                    'cart_part_no': item.cart_part_no,
+                    'country_of_origin': item.country_of_origin,
+                    'a_unit': item.a_unit,
+                    'qty': item.qty,
+                    'rate_include_gst': Decimal(str(item.rate_include_gst)),
+                    'nomenclature': item.nomenclature
+                })
+                item_id += 1
+            self.item_rows[po_id] = rows
+
+    def get_purchase_orders(self):
+        return list(self.po_rows)
+
+    def get_purchase_orders_page(self, page_size=100, token=None, sort="id", **filters):
+        # Rows are kept in id order, so the token is simply the offset of the next page
+        start = int(token or 0)
+        rows = self.po_rows[start:start + page_size]
+        next_token = str(start + page_size) if start + page_size < len(self.po_rows) else None
+        return rows, next_token
+
+    def get_items_by_purchase_order_id(self, purchase_order_id):
+        return list(self.item_rows.get(purchase_order_id, []))
+
+    def get_items(self, purchase_order_id):
+        return [Item.from_row(tuple(row[column] for column in Item.ROW_COLUMNS))
+                for row in self.item_rows.get(purchase_order_id, [])]
+
+    def get_change_token(self):
+        return "0"
+
+    def get_changes_since(self, token, limit=1000):
+        return {"token": token, "inserted": [], "updated": [], "deleted": [], "has_more": False}
+
+    def clone(self):
+        return self  # Read-only, so it is safe to share with loader threads
+
+    def close_connection(self):
+        pass
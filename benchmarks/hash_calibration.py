@@ -0,0 +1,106 @@
+"""Calibrate the duplicate-scan thresholds of POManager.image_hash.ImageHashIndex.
+
+Examples:
+    python -m benchmarks.hash_calibration --pages 8 --rows 5 15 30
+    python -m benchmarks.hash_calibration --scan-dir real_scans --output hashes.json
+
+Measures the Hamming distances of the page hash (64 bits) and the table hash (256 bits)
+between rescans of one page and between distinct pages. By default the pages are rendered
+with benchmarks.po_image_generator: distinct POs on the same template, and every PO again
+with heavier skew, blur and noise standing in for a rescan. With --scan-dir real scans are
+used instead; files of one page share the name before the first "~" (PO1.png, PO1~2.jpg).
+
+A threshold works when every rescan pair is within it and every distinct pair is beyond it.
+Requires numpy, OpenCV and (for rendering) Pillow.
+"""
+import argparse
+import itertools
+import os
+import sys
+
+from benchmarks.common import write_results
+from POManager.image_hash import hamming_distance, perceptual_hash, table_hash
+
+
+def distances(groups):
+    """Return ({hash: rescan distances}, {hash: distinct-page distances}) for lists of grayscale pages per page."""
+    hashed = [[(perceptual_hash(page), table_hash(page)) for page in pages] for pages in groups]
+    same = {"page": [], "table": []}
+    distinct = {"page": [], "table": []}
+    for hashes in hashed:
+        for a, b in itertools.combinations(hashes, 2):
+            same["page"].append(hamming_distance(a[0], b[0]))
+            same["table"].append(hamming_distance(a[1], b[1]))
+    for first, second in itertools.combinations(hashed, 2):
+        distinct["page"].append(hamming_distance(first[0][0], second[0][0]))
+        distinct["table"].append(hamming_distance(first[0][1], second[0][1]))
+    return same, distinct
+
+
+def rendered_groups(pages, rows, rescans, dpi, seed):
+    import numpy
+    from benchmarks.data_generator import SyntheticDataGenerator
+    from benchmarks.po_image_generator import POImageGenerator
+
+    purchase_orders = SyntheticDataGenerator(num_pos=pages, items_per_po=rows, seed=seed, po_prefix="HASH").purchase_orders()
+    original = POImageGenerator(dpi=dpi, noise=4, skew=0.3, blur=0.3, seed=seed)
+    rescanners = [POImageGenerator(dpi=dpi, noise=10, skew=2.0, blur=0.8, seed=seed + index + 1) for index in range(rescans)]
+    return [
+        [numpy.asarray(generator.render(purchase_order)) for generator in [original] + rescanners]
+        for purchase_order in purchase_orders
+    ]
+
+
+def scan_groups(scan_dir):
+    import cv2
+
+    groups = {}
+    for name in sorted(os.listdir(scan_dir)):
+        if os.path.splitext(name)[1].lower() not in (".png", ".jpg", ".jpeg", ".tif", ".tiff"):
+            continue
+        page = cv2.imread(os.path.join(scan_dir, name), cv2.IMREAD_GRAYSCALE)
+        if page is not None:
+            groups.setdefault(os.path.splitext(name)[0].split("~")[0], []).append(page)
+    return list(groups.values())
+
+
+def summarize(same, distinct, bits):
+    result = {"bits": bits, "rescan_pairs": len(same), "distinct_pairs": len(distinct)}
+    if same:
+        result.update(rescan_min=min(same), rescan_max=max(same))
+    if distinct:
+        result.update(distinct_min=min(distinct), distinct_max=max(distinct),
+                      distinct_median=sorted(distinct)[len(distinct) // 2])
+    if same and distinct:
+        result["separated"] = max(same) < min(distinct)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scan-dir", help="Real scans to measure instead of rendered pages")
+    parser.add_argument("--pages", type=int, default=8, help="Distinct POs rendered per row count")
+    parser.add_argument("--rows", type=int, nargs="+", default=[5, 15, 30], help="Item rows of the rendered POs")
+    parser.add_argument("--rescans", type=int, default=2, help="Rescans rendered per PO")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.scan_dir:
+        sets = {"scans": scan_groups(args.scan_dir)}
+    else:
+        sets = {f"rows_{rows}": rendered_groups(args.pages, rows, args.rescans, args.dpi, args.seed) for rows in args.rows}
+
+    results = {}
+    for label, groups in sets.items():
+        same, distinct = distances(groups)
+        for name, bits in (("page", 64), ("table", 256)):
+            stats = results[f"hash.{label}.{name}"] = summarize(same[name], distinct[name], bits)
+            print(f"{label:<10}{name:<7}rescans {stats.get('rescan_min')}-{stats.get('rescan_max')}  "
+                  f"distinct {stats.get('distinct_min')}-{stats.get('distinct_max')} of {bits} bits", file=sys.stderr)
+    write_results(results, vars(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
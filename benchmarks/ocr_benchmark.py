@@ -0,0 +1,180 @@
+"""OCR throughput and accuracy benchmark over scans made by benchmarks.po_image_generator.
+
+Example:
+    python -m benchmarks.po_image_generator --out-dir bench_scans --pages 20 --noise 8 --skew 1
+    python -m benchmarks.ocr_benchmark bench_scans --output ocr.json
+    python -m benchmarks.ocr_benchmark bench_scans --adaptive --output ocr_adaptive.json
+    python -m benchmarks.ocr_benchmark bench_scans --low-memory --output ocr_low_memory.json
+
+Reports pages/sec, per-stage latency (load, grayscale, tesseract, table extraction, parsing)
+and field-level accuracy of the extracted items against the ground-truth JSON files. With
+--adaptive the fast pass is reported as the tesseract stage and the re-OCR'd lines as rescan.
+With --low-memory the load stage decodes straight to grayscale (there is no grayscale stage)
+and the peak memory of each page is reported under ocr.memory.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.common import quiet, write_results
+from POManager.ocr_profiler import StageProfiler
+from POManager.query_instrumentation import percentile
+
+STAGES = ["load", "grayscale", "tesseract", "table_extraction", "parsing"]
+FIELDS = ["cart_part_no", "country_of_origin", "a_unit", "qty", "rate_include_gst", "nomenclature"]
+PARSER_KEYS = {
+    "cart_part_no": "Cart Part No",
+    "country_of_origin": "Country of Origin",
+    "a_unit": "A/Unit",
+    "qty": "Qty",
+    "rate_include_gst": "Rate Include GST",
+    "nomenclature": "Nomenclature",
+}
+
+
+def field_matches(field, expected, actual):
+    if actual is None:
+        return False
+    if field in ("qty", "rate_include_gst"):
+        try:
+            return abs(float(expected) - float(actual)) < 0.005
+        except (TypeError, ValueError):
+            return False
+    return str(expected).strip().upper() == str(actual).strip().upper()
+
+
+def score(truth_items, extracted):
+    """Compare extracted parser dicts against ground truth, pairing rows by part number and then by position."""
+    extracted = [item for item in extracted if item.get("Cart Part No") and item["Cart Part No"] != "Total:-"]
+    by_part_no = {item["Cart Part No"]: item for item in extracted}
+    counts = {field: 0 for field in FIELDS}
+
+    for index, truth in enumerate(truth_items):
+        actual = by_part_no.get(truth["cart_part_no"])
+        if actual is None and index < len(extracted):
+            actual = extracted[index]
+        if actual is None:
+            continue
+        for field in FIELDS:
+            if field_matches(field, truth[field], actual.get(PARSER_KEYS[field])):
+                counts[field] += 1
+
+    return counts, len(extracted)
+
+
+def run_page(image_path, profiler, adaptive=False, low_memory=False):
+    from POManager.image_processor import ImageProcessor
+
+    processor = ImageProcessor(image_path, profiler=profiler, adaptive=adaptive, low_memory=low_memory)
+    first_record = len(profiler.records)
+    with quiet():
+        text = processor.process_image()
+        with processor.stage("table_extraction"):
+            table_text = processor.extract_table_section(text)
+        with processor.stage("parsing"):
+            extracted = processor.extract_item_details(table_text)
+    timings = {record["stage"]: record["wall"] for record in profiler.records[first_record:]}
+    return timings, extracted, processor.ocr_stats, processor.memory_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scan_dir", help="Directory with <po>.png/<po>.json pairs")
+    parser.add_argument("--limit", type=int, help="Only process the first N pages")
+    parser.add_argument("--adaptive", action="store_true", help="Fast low-resolution pass with selective re-OCR")
+    parser.add_argument("--low-memory", action="store_true", help="Reduced grayscale decode and tiled OCR")
+    parser.add_argument("--memory", action="store_true", help="Track peak memory per stage with tracemalloc")
+    parser.add_argument("--cprofile", metavar="PATH", help="Write cProfile stats of the whole run to PATH")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    profiler = StageProfiler(track_memory=args.memory, profile=bool(args.cprofile))
+
+    truth_files = sorted(glob.glob(os.path.join(args.scan_dir, "*.json")))[:args.limit]
+    if not truth_files:
+        parser.error(f"No ground-truth files found in {args.scan_dir}")
+
+    stages = STAGES[:3] + ["rescan"] + STAGES[3:] if args.adaptive else STAGES
+    if args.low_memory:
+        stages = [stage for stage in stages if stage != "grayscale"]
+    page_peaks = []
+    stage_timings = {stage: [] for stage in stages}
+    ocr_totals = {"lines": 0, "table_lines": 0, "rescanned": 0}
+    page_timings = []
+    field_hits = {field: 0 for field in FIELDS}
+    truth_item_count = 0
+    extracted_item_count = 0
+
+    started = time.perf_counter()
+    for truth_file in truth_files:
+        with open(truth_file) as f:
+            truth = json.load(f)
+        image_path = os.path.join(os.path.dirname(truth_file), truth["image"])
+
+        timings, extracted, ocr_stats, memory_stats = run_page(image_path, profiler, args.adaptive, args.low_memory)
+        if memory_stats.get("peak_bytes") is not None:
+            page_peaks.append(memory_stats["peak_bytes"])
+        for key, count in ocr_stats.items():
+            ocr_totals[key] += count
+        for stage, seconds in timings.items():
+            stage_timings[stage].append(seconds)
+        page_timings.append(sum(timings.values()))
+
+        hits, extracted_count = score(truth["items"], extracted)
+        for field, count in hits.items():
+            field_hits[field] += count
+        truth_item_count += len(truth["items"])
+        extracted_item_count += extracted_count
+        print(f"{truth['po_number']}: {sum(timings.values()):.2f}s, {extracted_count}/{len(truth['items'])} items", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    results = {
+        "ocr.pages": {
+            "pages": len(page_timings),
+            "seconds": elapsed,
+            "pages_per_sec": len(page_timings) / elapsed if elapsed else None,
+            "median": statistics.median(page_timings),
+            "p95": percentile(page_timings, 0.95),
+        },
+        "ocr.accuracy": {
+            "truth_items": truth_item_count,
+            "extracted_items": extracted_item_count,
+            "fields": {field: field_hits[field] / truth_item_count for field in FIELDS},
+            "overall": sum(field_hits.values()) / (truth_item_count * len(FIELDS)),
+        },
+    }
+    if args.adaptive:
+        results["ocr.adaptive"] = dict(
+            ocr_totals, rescanned_fraction=ocr_totals["rescanned"] / ocr_totals["table_lines"] if ocr_totals["table_lines"] else None
+        )
+    if page_peaks:
+        results["ocr.memory"] = {
+            "pages": len(page_peaks),
+            "median_peak_mb": statistics.median(page_peaks) / 2 ** 20,
+            "p95_peak_mb": percentile(page_peaks, 0.95) / 2 ** 20,
+            "max_peak_mb": max(page_peaks) / 2 ** 20,
+        }
+    for stage, values in stage_timings.items():
+        results[f"ocr.stage.{stage}"] = {
+            "runs": len(values),
+            "min": min(values),
+            "median": statistics.median(values),
+            "mean": statistics.mean(values),
+            "p95": percentile(values, 0.95),
+            "max": max(values),
+        }
+
+    profiler.close()
+    results["ocr.profile"] = profiler.report()["stages"]
+    if args.cprofile:
+        profiler.dump_profile(args.cprofile)
+    print(profiler.format_report(), file=sys.stderr)
+
+    write_results(results, vars(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
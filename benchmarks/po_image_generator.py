@@ -0,0 +1,192 @@
+"""Render synthetic purchase order scans with a ground-truth item file next to each image.
+
+Example:
+    python -m benchmarks.po_image_generator --out-dir bench_scans --pages 20 --rows 15 \\
+        --dpi 300 --noise 8 --skew 1.0 --blur 0.6
+
+Writes bench_scans/<po_number>.png and bench_scans/<po_number>.json for every page.
+Requires Pillow and numpy.
+"""
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from benchmarks.data_generator import SyntheticDataGenerator
+
+# Column headers as they appear on supplier POs, with their share of the table width
+COLUMNS = [
+    ("Cart Part No", 0.15),
+    ("Country of Origin", 0.11),
+    ("A/Unit", 0.07),
+    ("Qty", 0.07),
+    ("Rate Include GST", 0.14),
+    ("Nomenclature", 0.31),
+    ("Amount", 0.15),
+]
+
+A4_INCHES = (8.27, 11.69)
+
+
+def load_font(font_path, size):
+    """Load a TrueType font, falling back to DejaVu Sans and then Pillow's bitmap font."""
+    for candidate in filter(None, [font_path, "DejaVuSans.ttf"]):
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+class POImageGenerator:
+    def __init__(self, font_path=None, font_size=9, dpi=300, noise=0.0, skew=0.0, blur=0.0, seed=0):
+        self.font_path = font_path
+        self.font_size = font_size
+        self.dpi = dpi
+        self.noise = noise  # Standard deviation of gaussian noise in grey levels
+        self.skew = skew  # Maximum rotation in degrees, applied in either direction
+        self.blur = blur  # Gaussian blur radius in pixels at 300 dpi
+        self.seed = seed
+
+    def _fit(self, draw, text, font, width):
+        """Trim text so it fits inside a column."""
+        while text and draw.textlength(text, font=font) > width:
+            text = text[:-1]
+        return text
+
+    def render(self, purchase_order):
+        """Render one PO page and return it as a greyscale PIL image."""
+        rng = random.Random(f"{self.seed}-{purchase_order.po_number}")
+        px = lambda points: int(points * self.dpi / 72)
+        margin = px(36)
+        row_height = px(self.font_size * 2.2)
+        pad = px(3)
+
+        # Long POs grow the page instead of running off the bottom of an A4 sheet
+        page_width = int(A4_INCHES[0] * self.dpi)
+        page_height = max(int(A4_INCHES[1] * self.dpi), 2 * margin + (len(purchase_order.items) + 8) * row_height)
+        table_width = page_width - 2 * margin
+
+        font = load_font(self.font_path, px(self.font_size))
+        title_font = load_font(self.font_path, px(self.font_size * 1.8))
+        image = Image.new("L", (page_width, page_height), 255)
+        draw = ImageDraw.Draw(image)
+
+        y = margin
+        draw.text((margin, y), "PURCHASE ORDER", font=title_font, fill=0)
+        y += px(self.font_size * 3)
+        draw.text((margin, y), f"PO No: {purchase_order.po_number}    Date: {purchase_order.added_date}", font=font, fill=0)
+        y += px(self.font_size * 3)
+
+        column_x = [margin]
+        for _, share in COLUMNS:
+            column_x.append(column_x[-1] + int(table_width * share))
+
+        def draw_row(values, top):
+            for index, value in enumerate(values):
+                left = column_x[index] + pad
+                text = self._fit(draw, value, font, column_x[index + 1] - column_x[index] - 2 * pad)
+                draw.text((left, top + pad), text, font=font, fill=0)
+            draw.line([(margin, top + row_height), (column_x[-1], top + row_height)], fill=0, width=max(1, px(0.5)))
+
+        table_top = y
+        draw.line([(margin, y), (column_x[-1], y)], fill=0, width=max(1, px(0.5)))
+        draw_row([name for name, _ in COLUMNS], y)
+        y += row_height
+
+        total_amount = 0
+        for item in purchase_order.items:
+            amount = item.qty * item.rate_include_gst
+            total_amount += amount
+            draw_row([
+                item.cart_part_no,
+                item.country_of_origin,
+                item.a_unit,
+                str(item.qty),
+                f"{item.rate_include_gst:,.2f}",
+                item.nomenclature,
+                f"{amount:,.2f}",
+            ], y)
+            y += row_height
+
+        for x in column_x:
+            draw.line([(x, table_top), (x, y)], fill=0, width=max(1, px(0.5)))
+
+        y += px(self.font_size)
+        draw.text((column_x[4], y), f"Total:- {total_amount:,.2f}", font=font, fill=0)
+        y += row_height
+        draw.text((margin, y), "Grand Total Amount inclusive of GST", font=font, fill=0)
+
+        return self._degrade(image, rng)
+
+    def _degrade(self, image, rng):
+        """Apply skew, blur and noise the way a cheap flatbed scanner would."""
+        if self.skew:
+            image = image.rotate(rng.uniform(-self.skew, self.skew), resample=Image.BICUBIC, expand=True, fillcolor=255)
+        if self.blur:
+            image = image.filter(ImageFilter.GaussianBlur(self.blur * self.dpi / 300))
+        if self.noise:
+            pixels = np.asarray(image, dtype=np.float32)
+            noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1)).normal(0, self.noise, pixels.shape)
+            image = Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+        return image
+
+    def write(self, purchase_order, out_dir):
+        """Render a PO into out_dir and write its ground truth; returns the image path."""
+        os.makedirs(out_dir, exist_ok=True)
+        image_path = os.path.join(out_dir, f"{purchase_order.po_number}.png")
+        self.render(purchase_order).save(image_path, dpi=(self.dpi, self.dpi))
+
+        truth = {
+            "po_number": purchase_order.po_number,
+            "image": os.path.basename(image_path),
+            "dpi": self.dpi,
+            "font_size": self.font_size,
+            "noise": self.noise,
+            "skew": self.skew,
+            "blur": self.blur,
+            "items": [
+                {
+                    "cart_part_no": item.cart_part_no,
+                    "country_of_origin": item.country_of_origin,
+                    "a_unit": item.a_unit,
+                    "qty": item.qty,
+                    "rate_include_gst": item.rate_include_gst,
+                    "nomenclature": item.nomenclature,
+                }
+                for item in purchase_order.items
+            ],
+        }
+        with open(os.path.splitext(image_path)[0] + ".json", "w") as f:
+            json.dump(truth, f, indent=2)
+        return image_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=15, help="Item rows per page")
+    parser.add_argument("--font", help="Path to a TrueType font")
+    parser.add_argument("--font-size", type=float, default=9, help="Font size in points")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.0, help="Gaussian noise sigma in grey levels")
+    parser.add_argument("--skew", type=float, default=0.0, help="Maximum skew in degrees")
+    parser.add_argument("--blur", type=float, default=0.0, help="Gaussian blur radius at 300 dpi")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = SyntheticDataGenerator(num_pos=args.pages, items_per_po=args.rows, seed=args.seed, po_prefix="SCAN")
+    generator = POImageGenerator(
+        font_path=args.font, font_size=args.font_size, dpi=args.dpi,
+        noise=args.noise, skew=args.skew, blur=args.blur, seed=args.seed
+    )
+    for purchase_order in data.purchase_orders():
+        print(generator.write(purchase_order, args.out_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Benchmark suite for DBHandler, the OCR text parser and the PO table population.
+
+Examples:
+    python -m benchmarks.run_benchmarks --pos 200 --items 20 --deliveries 2 --output before.json
+    python -m benchmarks.run_benchmarks --only parser ui --output after.json
+    python -m benchmarks.run_benchmarks --only db --backend sqlite
+    python -m benchmarks.compare before.json after.json
+
+The DB benchmarks write to a scratch database (see --database, or --sqlite-path with
+--backend sqlite) and delete their rows afterwards.
+The UI benchmark runs on the offscreen Qt platform and needs no display.
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.common import add_db_arguments, connect_db, measure, quiet, write_results
+from benchmarks.data_generator import InMemoryDBHandler, SyntheticDataGenerator
+
+SUITES = ["db", "parser", "ui"]
+
+
+def bench_db(args, generator, backend=None):
+    from POManager.item import Item
+
+    try:
+        with quiet():
+            db_handler = connect_db(args, backend)
+    except ImportError as e:
+        print(f"Skipping db benchmarks: {e}", file=sys.stderr)
+        return {}
+    if db_handler.connection is None:
+        print("Skipping db benchmarks: could not connect to the database.", file=sys.stderr)
+        return {}
+
+    purchase_orders = generator.purchase_orders()
+    item_count = sum(len(po.items) for po in purchase_orders)
+    results = {}
+
+    def insert_all():
+        for po in purchase_orders:
+            po.id = db_handler.add_purchase_order(po)
+            db_handler.add_purchase_order_items(po)
+
+    def delete_all():
+        for po in purchase_orders:
+            db_handler.delete_purchase_order(po.po_number)
+
+    try:
+        results["db.insert_purchase_orders_with_items"] = measure(
+            insert_all, repeat=args.repeat, units=len(purchase_orders), setup=delete_all
+        )
+
+        # Items need their database ids for the update and delivery paths
+        loaded = [db_handler.get_purchase_order_by_po_number(po.po_number) for po in purchase_orders]
+
+        def insert_deliveries():
+            for po in loaded:
+                for item in po.items:
+                    for delivery in generator.deliveries(item):
+                        db_handler.insert_delivery_tracking(item.id, *delivery)
+
+        results["db.insert_delivery_tracking"] = measure(insert_deliveries, repeat=1, units=item_count)
+
+        results["db.get_purchase_orders"] = measure(
+            db_handler.get_purchase_orders, repeat=args.repeat, units=len(purchase_orders)
+        )
+        results["db.get_purchase_order_by_po_number"] = measure(
+            lambda: [db_handler.get_purchase_order_by_po_number(po.po_number) for po in purchase_orders],
+            repeat=args.repeat, units=len(purchase_orders)
+        )
+        results["db.get_items_by_purchase_order_id"] = measure(
+            lambda: [db_handler.get_items_by_purchase_order_id(po.id) for po in loaded],
+            repeat=args.repeat, units=len(loaded)
+        )
+
+        # Item objects built from dictionary rows (the old path) vs prepared statements with tuple rows
+        def items_from_dict_rows():
+            for po in loaded:
+                for row in db_handler.get_items_by_purchase_order_id(po.id):
+                    item = Item(cart_part_no=row['cart_part_no'], country_of_origin=row['country_of_origin'],
+                                a_unit=row['a_unit'], qty=row['qty'], rate_include_gst=row['rate_include_gst'],
+                                nomenclature=row['nomenclature'])
+                    item.id = row['id']
+
+        results["db.items_from_dict_rows"] = measure(items_from_dict_rows, repeat=args.repeat, units=item_count)
+        results["db.items_from_tuple_rows"] = measure(
+            lambda: [db_handler.get_items(po.id) for po in loaded], repeat=args.repeat, units=item_count
+        )
+        results["db.get_delivery_tracking_by_item_id"] = measure(
+            lambda: [db_handler.get_delivery_tracking_by_item_id(item.id) for po in loaded for item in po.items],
+            repeat=args.repeat, units=item_count
+        )
+
+        # Reads of the rollup maintained by the writes above, and a full recompute of it
+        results["db.report_spend_by_month"] = measure(
+            lambda: db_handler.get_report_rollup("day"), repeat=args.repeat, units=1
+        )
+        results["db.report_spend_by_country"] = measure(
+            lambda: db_handler.get_report_rollup("country_of_origin"), repeat=args.repeat, units=1
+        )
+        results["db.rebuild_report_rollup"] = measure(db_handler.rebuild_report_rollup, repeat=1, units=item_count)
+
+        def update_all():
+            for po in loaded:
+                for item in po.items:
+                    item.qty += 1
+                db_handler.update_purchase_order(po)
+                db_handler.update_purchase_order_items(po)
+
+        results["db.update_purchase_orders_with_items"] = measure(update_all, repeat=args.repeat, units=len(loaded))
+        results["db.delete_purchase_orders"] = measure(delete_all, repeat=1, units=len(purchase_orders))
+    finally:
+        delete_all()
+        db_handler.close_connection()
+
+    return results
+
+
+def bench_parser(args, generator):
+    try:
+        from POManager.image_processor import ImageProcessor
+    except ImportError as e:
+        print(f"Skipping parser benchmarks: {e}", file=sys.stderr)
+        return {}
+
+    processor = ImageProcessor(None)
+    purchase_orders = generator.purchase_orders()
+    texts = [generator.ocr_text(po.items) for po in purchase_orders]
+    item_count = sum(len(po.items) for po in purchase_orders)
+
+    def parse_all():
+        with quiet():
+            for text in texts:
+                processor.extract_item_details(processor.extract_table_section(text))
+
+    results = {"parser.extract_item_details": measure(parse_all, repeat=args.repeat, units=item_count)}
+
+    # Part number correction against a catalog of every generated part, with one OCR confusion per lookup
+    from POManager.part_catalog import PartCatalog
+    catalog = PartCatalog()
+    for po in purchase_orders:
+        for item in po.items:
+            catalog.add(item.cart_part_no, item.nomenclature, keep_sorted=False)
+    catalog.sorted_parts.sort()
+    queries = [(item.cart_part_no.replace("0", "O", 1).replace("1", "I", 1), item.nomenclature)
+               for po in purchase_orders for item in po.items]
+
+    def correct_all():
+        for part_no, nomenclature in queries:
+            catalog.correct(part_no, nomenclature)
+
+    results["parser.part_catalog_correct"] = measure(correct_all, repeat=args.repeat, units=len(queries))
+    return results
+
+
+def bench_ui(args, generator):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from POManager.purchase_order_app import PurchaseOrderApp
+    except ImportError as e:
+        print(f"Skipping ui benchmarks: {e}", file=sys.stderr)
+        return {}
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    db_handler = InMemoryDBHandler(generator.purchase_orders())
+    results = {}
+
+    def construct_window():
+        with quiet():
+            window = PurchaseOrderApp(db_handler=db_handler)
+        window.deleteLater()
+        app.processEvents()
+
+    results["ui.construct_purchase_order_app"] = measure(
+        construct_window, repeat=args.repeat, units=len(db_handler.po_rows)
+    )
+
+    with quiet():
+        window = PurchaseOrderApp(db_handler=db_handler)
+
+    def reset_window():
+        window.tree.setRowCount(0)
+        window.purchase_orders.clear()
+
+    def load():
+        with quiet():
+            window.load_purchase_orders()
+
+    results["ui.load_purchase_orders"] = measure(
+        load, repeat=args.repeat, units=len(db_handler.po_rows), setup=reset_window
+    )
+    window.deleteLater()
+    app.processEvents()
+
+    # Item editor on one very large PO
+    from PyQt5.QtCore import Qt
+    from POManager.item_editor import ItemEditorDialog, QTY_COLUMN
+    large_po = SyntheticDataGenerator(num_pos=1, items_per_po=args.editor_items, seed=args.seed).purchase_orders()[0]
+    editors = []
+
+    def open_editor():
+        editor = ItemEditorDialog(db_handler, large_po, large_po.items, add=False)
+        editor.show()
+        app.processEvents()
+        editors.append(editor)
+
+    def close_editors():
+        while editors:
+            editors.pop().deleteLater()
+        app.processEvents()
+
+    results["ui.item_editor_open"] = measure(open_editor, repeat=args.repeat, units=len(large_po.items), setup=close_editors)
+
+    model = editors[-1].model
+    edits = min(1000, len(large_po.items))
+
+    def edit_rows():
+        for row in range(edits):
+            model.setData(model.index(row, QTY_COLUMN), str(large_po.items[row].qty + 1), Qt.EditRole)
+        app.processEvents()
+
+    results["ui.item_editor_edit"] = measure(edit_rows, repeat=args.repeat, units=edits)
+    close_editors()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pos", type=int, default=100, help="Number of purchase orders to generate")
+    parser.add_argument("--items", type=int, default=20, help="Items per purchase order")
+    parser.add_argument("--deliveries", type=int, default=2, help="Deliveries per item")
+    parser.add_argument("--editor-items", type=int, default=10000, help="Items on the PO opened in the item editor benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=SUITES, help="Suites to run")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticDataGenerator(
+        num_pos=args.pos,
+        items_per_po=args.items,
+        deliveries_per_item=args.deliveries,
+        seed=args.seed,
+        po_prefix=f"BENCH{int(time.time())}"
+    )
+
+    suites = {"db": bench_db, "parser": bench_parser, "ui": bench_ui}
+    results = {}
+    for name in args.only:
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.update(suites[name](args, generator))
+
+    params = {key: value for key, value in vars(args).items() if key != "password"}
+    write_results(results, params, args.output)
+
+
+if __name__ == "__main__":
+    main()
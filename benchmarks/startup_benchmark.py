@@ -0,0 +1,128 @@
+"""Measure application startup: imports, DB connection, window construction, first paint and full load.
+
+Examples:
+    python -m benchmarks.startup_benchmark --pos 20000 --output startup.json
+    python -m benchmarks.startup_benchmark --source mysql --database purchase_order_app
+    python -m benchmarks.startup_benchmark --source sqlite --sqlite-path purchase_orders.sqlite3
+
+Every run happens in a fresh interpreter so import costs are measured cold. Both the classic
+startup and --fast-start are measured; the window is created on the offscreen Qt platform.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import add_db_arguments, connect_db, quiet, write_results
+
+MODES = ["full", "fast"]
+
+
+def child(args):
+    """Runs inside the measured interpreter and prints one JSON line of timings."""
+    timings = {}
+    started = time.perf_counter()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from POManager.purchase_order_app import PurchaseOrderApp
+    timings["import"] = time.perf_counter() - started
+    ocr_stack_loaded = "cv2" in sys.modules or "pytesseract" in sys.modules
+
+    app = QApplication(sys.argv[:1])
+
+    if args.source == "memory":
+        from benchmarks.data_generator import InMemoryDBHandler, SyntheticDataGenerator
+        db_handler = InMemoryDBHandler(SyntheticDataGenerator(num_pos=args.pos, items_per_po=args.items).purchase_orders())
+        timings["connect"] = 0.0
+    else:
+        mark = time.perf_counter()
+        with quiet():
+            db_handler = connect_db(args, backend=args.source)
+        timings["connect"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    with quiet():
+        window = PurchaseOrderApp(db_handler=db_handler, fast_start=args.mode == "fast", page_size=args.page_size)
+    timings["construct_window"] = time.perf_counter() - mark
+
+    window.show()
+    app.processEvents()
+    first_paint = time.perf_counter()
+    timings["first_paint"] = first_paint - started
+    first_page_rows = window.tree.rowCount()
+
+    while window.loader is not None and not window.loader.isFinished():
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+    timings["fully_loaded"] = time.perf_counter() - started
+
+    print(json.dumps({
+        "timings": timings,
+        "ocr_stack_loaded": ocr_stack_loaded,
+        "first_page_rows": first_page_rows,
+        "rows": window.tree.rowCount(),
+    }))
+    window.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["memory", "mysql", "sqlite"], default="memory",
+                        help="Serve generated rows from memory or read a real database")
+    parser.add_argument("--pos", type=int, default=5000, help="Generated purchase orders (memory source)")
+    parser.add_argument("--items", type=int, default=10, help="Generated items per PO (memory source)")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    add_db_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args)
+        return
+
+    child_args = [sys.executable, "-m", "benchmarks.startup_benchmark", "--child",
+                  "--source", args.source, "--pos", str(args.pos), "--items", str(args.items),
+                  "--page-size", str(args.page_size), "--host", args.host, "--user", args.user,
+                  "--password", args.password, "--database", args.database, "--sqlite-path", args.sqlite_path]
+    results = {}
+    for mode in MODES:
+        runs = []
+        for _ in range(args.repeat):
+            process_started = time.perf_counter()
+            output = subprocess.check_output(child_args + ["--mode", mode], cwd=os.getcwd())
+            process_time = time.perf_counter() - process_started
+            run = json.loads(output.decode().strip().splitlines()[-1])
+            run["timings"]["process"] = process_time
+            runs.append(run)
+
+        for stage in runs[0]["timings"]:
+            values = [run["timings"][stage] for run in runs]
+            results[f"startup.{mode}.{stage}"] = {
+                "runs": len(values),
+                "min": min(values),
+                "median": statistics.median(values),
+                "mean": statistics.mean(values),
+                "max": max(values),
+            }
+        results[f"startup.{mode}.summary"] = {
+            "ocr_stack_loaded": runs[0]["ocr_stack_loaded"],
+            "first_page_rows": runs[0]["first_page_rows"],
+            "rows": runs[0]["rows"],
+        }
+        print(f"{mode}: first paint {results[f'startup.{mode}.first_paint']['median'] * 1000:.0f}ms, "
+              f"fully loaded {results[f'startup.{mode}.fully_loaded']['median'] * 1000:.0f}ms", file=sys.stderr)
+
+    params = {key: value for key, value in vars(args).items() if key not in ("password", "child", "mode")}
+    write_results(results, params, args.output)
+
+
+if __name__ == "__main__":
+    main()
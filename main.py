@@ -1,15 +1,50 @@
 from PyQt5.QtWidgets import QApplication,QMainWindow
 from POManager.db_handler import DBHandler
+from POManager.document_store import DocumentStore
 from POManager.purchase_order_app import PurchaseOrderApp
+from POManager.query_instrumentation import QueryInstrumentation
+from POManager.storage_backends import MySQLBackend, SQLiteBackend
+import os
 import sys
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
 
+    # Set POMANAGER_QUERY_STATS to a file path to record query metrics while the app runs
+    instrumentation = None
+    stats_path = os.environ.get("POMANAGER_QUERY_STATS")
+    if stats_path:
+        instrumentation = QueryInstrumentation(
+            slow_query_threshold=float(os.environ.get("POMANAGER_SLOW_QUERY_MS", "200")) / 1000,
+            slow_query_log=os.environ.get("POMANAGER_SLOW_QUERY_LOG")
+        )
+        instrumentation.start_periodic_dump(stats_path, interval=30)
 
-    db_handler = DBHandler(host="localhost", user="root", password="", database="purchase_order_app")
-    
-    main_window = PurchaseOrderApp(db_handler=db_handler)
+    # Set POMANAGER_SQLITE_PATH to keep the data in a local SQLite file instead of the MySQL server
+    sqlite_path = os.environ.get("POMANAGER_SQLITE_PATH")
+    if sqlite_path:
+        db_handler = DBHandler(backend=SQLiteBackend(sqlite_path), instrumentation=instrumentation)
+    else:
+        # Set POMANAGER_REPLICA_HOST (and optionally POMANAGER_REPLICA_PORT) to serve reads from a replica
+        replica_backend = None
+        replica_host = os.environ.get("POMANAGER_REPLICA_HOST")
+        if replica_host:
+            replica_port = os.environ.get("POMANAGER_REPLICA_PORT")
+            replica_backend = MySQLBackend(replica_host, "root", "", "purchase_order_app", int(replica_port) if replica_port else None)
+        db_handler = DBHandler(host="localhost", user="root", password="", database="purchase_order_app",
+                               instrumentation=instrumentation, replica_backend=replica_backend)
+
+    # Set POMANAGER_SCAN_DIR to keep original scans as files (e.g. on a shared drive) rather than in the database
+    document_store = DocumentStore(db_handler, root=os.environ.get("POMANAGER_SCAN_DIR"))
+
+    # --fast-start shows the first page of POs immediately and loads the rest in the background;
+    # --ocr-queue hands scans to `python -m POManager.ocr_worker` processes instead of running OCR here
+    main_window = PurchaseOrderApp(db_handler=db_handler, fast_start="--fast-start" in sys.argv,
+                                   ocr_queue="--ocr-queue" in sys.argv, document_store=document_store)
     main_window.show()
 
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    if instrumentation:
+        instrumentation.stop_periodic_dump()
+        instrumentation.dump(stats_path)
+    sys.exit(exit_code)
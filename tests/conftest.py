@@ -0,0 +1,76 @@
+import os
+from datetime import date
+
+import pytest
+
+from POManager.db_handler import DBHandler
+from POManager.item import Item
+from POManager.purchase_order import PurchaseOrder
+from POManager.storage_backends import create_backend
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "po.sqlite3")
+
+
+@pytest.fixture
+def db(sqlite_path):
+    """A DBHandler on a fresh SQLite database with the current schema."""
+    db_handler = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    yield db_handler
+    db_handler.close_connection()
+
+
+@pytest.fixture
+def mysql_db():
+    """A DBHandler on the MySQL database named by POMANAGER_TEST_MYSQL_DATABASE; skipped when it is not set.
+
+    The database is reset, so point it at a scratch database.
+    """
+    database = os.environ.get("POMANAGER_TEST_MYSQL_DATABASE")
+    if not database:
+        pytest.skip("POMANAGER_TEST_MYSQL_DATABASE is not set")
+    pytest.importorskip("mysql.connector")
+    backend = create_backend(
+        "mysql", host=os.environ.get("POMANAGER_TEST_MYSQL_HOST", "localhost"),
+        user=os.environ.get("POMANAGER_TEST_MYSQL_USER", "root"),
+        password=os.environ.get("POMANAGER_TEST_MYSQL_PASSWORD", ""), database=database
+    )
+    connection = backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("SHOW TABLES")
+    for (table,) in cursor.fetchall():
+        cursor.execute(f"DROP TABLE `{table}`")
+    connection.close()
+    db_handler = DBHandler(backend=backend)
+    yield db_handler
+    db_handler.close_connection()
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """A QApplication on the offscreen platform; skipped when PyQt5 is not installed."""
+    pytest.importorskip("PyQt5")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def make_purchase_order(po_number, items=2, order_date=date(2024, 1, 15)):
+    purchase_order = PurchaseOrder(po_number)
+    purchase_order.added_date = order_date
+    for index in range(items):
+        purchase_order.add_item(Item(f"{po_number}-P{index}", "USA", "NOS", index + 1, 10 + index, f"Part {index}"))
+    purchase_order.total_qty = sum(item.qty for item in purchase_order.items)
+    purchase_order.total_amount = sum(item.qty * item.rate_include_gst for item in purchase_order.items)
+    return purchase_order
+
+
+def save_purchase_order(db_handler, po_number, **kwargs):
+    purchase_order = make_purchase_order(po_number, **kwargs)
+    purchase_order.id = db_handler.add_purchase_order(purchase_order)
+    db_handler.add_purchase_order_items(purchase_order)
+    purchase_order.items = db_handler.get_items(purchase_order.id, target="primary")
+    return purchase_order
@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytesseract = pytest.importorskip("pytesseract")
+
+from POManager.image_processor import ImageProcessor
+
+
+def tesseract_data(lines):
+    """image_to_data output for lines of (words, confidences, top) at 20 pixels per word."""
+    data = {key: [] for key in ("text", "conf", "block_num", "par_num", "line_num", "left", "top", "width", "height")}
+    for line_num, (words, confidences, top) in enumerate(lines, start=1):
+        for index, (word, confidence) in enumerate(zip(words.split(), confidences)):
+            for key, value in (("text", word), ("conf", confidence), ("block_num", 1), ("par_num", 1),
+                               ("line_num", line_num), ("left", 10 + 20 * index), ("top", top), ("width", 18),
+                               ("height", 8)):
+                data[key].append(value)
+    return data
+
+
+def line(words, confidence=95):
+    return {"words": words.split(), "confidences": [confidence] * len(words.split()), "text": words}
+
+
+def test_doubtful_lines_are_rescanned():
+    processor = ImageProcessor(None)
+    assert not processor.needs_rescan(line("A8-1O023 USA NOS 10 1,250.50 Brake pad"))
+    assert processor.needs_rescan(line("AB-10023 USA NOS 10 1,250.50", confidence=40))
+    assert processor.needs_rescan(line("AB-10023 USA NOS 1O 1,250.50"))
+    assert processor.needs_rescan(line("AB-10023 USA NOS 10 1,25O.50"))
+
+
+def test_table_lines_run_from_the_header_to_the_amount_line():
+    processor = ImageProcessor(None)
+    lines = [line("PURCHASE ORDER"), line("Cart Part No Nomenclature"), line("AB-1 USA"), line("Total Amount:"),
+             line("Signature")]
+    assert processor.table_lines(lines) == lines[1:4]
+    assert processor.table_lines(lines[:3]) == lines[:3]
+
+
+def test_fast_pass_is_scaled_back_to_page_coordinates(monkeypatch):
+    shapes = []
+
+    def image_to_data(image, output_type=None):
+        shapes.append(image.shape)
+        return tesseract_data([("Nomenclature Qty", [90, 90], 5)])
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+
+    processor = ImageProcessor(None)
+    processor.gray_image = np.full((400, 600), 255, dtype=np.uint8)
+    [only] = processor.ocr_lines(0.5)
+    assert shapes == [(200, 300)]
+    assert only["text"] == "Nomenclature Qty"
+    assert only["box"] == [20, 10, 96, 26]
+
+
+def test_adaptive_ocr_rescans_only_doubtful_table_lines(monkeypatch):
+    monkeypatch.setattr(pytesseract, "image_to_data", lambda image, output_type=None: tesseract_data([
+        ("PURCHASE ORDER", [40, 40], 5),  # Outside the table, so not rescanned however doubtful
+        ("Nomenclature Qty", [95, 95], 20),
+        ("AB-10023 USA NOS 1O 4.00", [95, 95, 95, 95, 95], 35),
+        ("AB-10024 USA NOS 2 5.00", [95, 95, 95, 95, 95], 50),
+        ("Total Amount:", [95, 95], 65),
+    ]))
+    rescanned = []
+    monkeypatch.setattr(pytesseract, "image_to_string",
+                        lambda image, config=None: (rescanned.append(image.shape), "AB-10023 USA NOS 10 4.00")[1])
+
+    processor = ImageProcessor(None, adaptive=True)
+    processor.gray_image = np.full((200, 300), 255, dtype=np.uint8)
+    text = processor.extract_text_adaptive()
+
+    assert processor.ocr_stats == {"lines": 5, "table_lines": 4, "rescanned": 1}
+    assert len(rescanned) == 1
+    assert text.splitlines()[2] == "AB-10023 USA NOS 10 4.00"
+    assert [item["Qty"] for item in processor.extract_item_details(processor.extract_table_section(text))] == [10, 2]
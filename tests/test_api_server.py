@@ -0,0 +1,97 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from POManager.api_server import APIServer, ResponseCache
+from POManager.item import Item
+from tests.conftest import save_purchase_order
+
+
+@pytest.fixture
+def server(db):
+    server = APIServer(("127.0.0.1", 0), db, pool_size=2, poll_interval=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        return response.status, response.getheader("ETag"), json.loads(data) if data else None
+    finally:
+        connection.close()
+
+
+def test_detail_is_cached_with_an_etag(db, server):
+    save_purchase_order(db, "PO-1")
+    status, etag, document = request(server, "GET", "/purchase-orders/PO-1")
+    assert status == 200
+    assert [item["cart_part_no"] for item in document["items"]] == ["PO-1-P0", "PO-1-P1"]
+
+    status, _, document = request(server, "GET", "/purchase-orders/PO-1", headers={"If-None-Match": etag})
+    assert status == 304 and document is None
+    assert request(server, "GET", "/purchase-orders/PO-2")[0] == 404
+
+
+def test_unknown_routes_and_methods(server):
+    assert request(server, "GET", "/nothing")[0] == 404
+    assert request(server, "POST", "/search")[0] == 405
+    assert request(server, "GET", "/search")[0] == 400
+
+
+def test_delivery_drops_the_cached_po(db, server):
+    purchase_order = save_purchase_order(db, "PO-1")
+    request(server, "GET", "/purchase-orders/PO-1")
+    assert ("po", "PO-1") in server.cache.entries
+
+    delivery = {"item_id": purchase_order.items[0].id, "challan_no": "C-1", "delivery_date": "2024-02-01",
+                "delivered_qty": 1, "approved_qty": 1}
+    status, _, document = request(server, "POST", "/deliveries", json.dumps(delivery))
+    assert status == 201 and document["po_number"] == "PO-1"
+    assert ("po", "PO-1") not in server.cache.entries
+
+
+def test_responses_loaded_before_an_invalidation_are_not_stored():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate({"PO-1"})  # A write lands while the response is being loaded
+    cache.put(("po", "PO-1"), '"old"', b"{}", generation)
+    assert cache.get(("po", "PO-1")) is None
+
+    cache.put(("po", "PO-1"), '"new"', b"{}", cache.generation)
+    assert cache.get(("po", "PO-1")) == ('"new"', b"{}")
+
+
+def test_applying_a_scan_job_adds_its_new_items(db, server):
+    save_purchase_order(db, "PO-1", items=1)
+    status, _, document = request(server, "POST", "/purchase-orders/PO-1/scans?name=po1.png", b"image")
+    assert status == 202
+    job_id = document["job_id"]
+    assert request(server, "POST", f"/ocr-jobs/{job_id}/apply")[0] == 409  # Not processed yet
+
+    job = db.claim_ocr_job("worker")
+    known, new = Item("PO-1-P0", "USA", "NOS", 1, 10, "Part 0"), Item("NEW-1", "IND", "NOS", 2, 5.5, "New part")
+    known.part_status, new.part_status = "exact", "unknown"
+    db.complete_ocr_job(job["id"], "worker", [known, new])
+    request(server, "GET", "/purchase-orders/PO-1")  # Cached before the items are applied
+
+    status, _, document = request(server, "POST", f"/ocr-jobs/{job_id}/apply")
+    assert status == 200
+    assert document == {"po_number": "PO-1", "added": 1, "skipped": 1, "review": [
+        {"cart_part_no": "NEW-1", "part_status": "unknown", "ocr_cart_part_no": None}
+    ]}
+
+    _, _, document = request(server, "GET", "/purchase-orders/PO-1")
+    assert [item["cart_part_no"] for item in document["items"]] == ["PO-1-P0", "NEW-1"]
+    assert document["total_qty"] == 3
+    assert float(document["total_amount"]) == pytest.approx(21.0)
+    assert request(server, "GET", f"/ocr-jobs/{job_id}")[2]["status"] == "collected"
+    assert request(server, "POST", f"/ocr-jobs/{job_id}/apply")[0] == 409
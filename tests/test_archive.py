@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from POManager.archive import archive_before
+from tests.conftest import save_purchase_order
+
+
+def deliver_everything(db_handler, purchase_order):
+    for item in purchase_order.items:
+        db_handler.insert_delivery_tracking(item.id, "C-1", date(2024, 2, 1), item.qty, 0, item.qty)
+
+
+def test_only_old_fully_delivered_pos_are_archivable(db):
+    delivered = save_purchase_order(db, "PO-1")
+    deliver_everything(db, delivered)
+    save_purchase_order(db, "PO-2")  # Nothing delivered
+    recent = save_purchase_order(db, "PO-3", order_date=date(2024, 6, 1))
+    deliver_everything(db, recent)
+
+    assert db.get_archivable_purchase_order_ids(date(2024, 3, 1)) == [delivered.id]
+
+
+def test_archive_moves_rows_and_keeps_them_readable(db):
+    purchase_order = save_purchase_order(db, "PO-1")
+    deliver_everything(db, purchase_order)
+    rollup = db.fetch_query("SELECT * FROM ReportRollup")
+    token = db.get_change_token()
+
+    assert db.archive_purchase_orders([purchase_order.id]) == 1
+    assert db.fetch_query("SELECT id FROM PurchaseOrder") == []
+    assert db.fetch_query("SELECT id FROM Item") == []
+    assert db.fetch_query("SELECT id FROM DeliveryTracking") == []
+    assert len(db.fetch_query("SELECT id FROM DeliveryTrackingArchive")) == 2
+
+    archived = db.get_purchase_order_by_po_number("PO-1", target="primary")
+    assert archived.archived and archived.id == purchase_order.id
+    assert [item.cart_part_no for item in archived.items] == ["PO-1-P0", "PO-1-P1"]
+    assert db.fetch_query("SELECT * FROM ReportRollup") == rollup
+    assert db.get_changes_since(token)["deleted"] == [{"id": purchase_order.id, "po_number": "PO-1"}]
+
+
+def test_failed_archive_rolls_back_and_raises(db):
+    purchase_order = save_purchase_order(db, "PO-1")
+    deliver_everything(db, purchase_order)
+    db.execute_query("DROP TABLE ItemArchive")
+
+    with pytest.raises(db.backend.Error):
+        db.archive_purchase_orders([purchase_order.id])
+    assert db.fetch_query("SELECT id FROM DeliveryTrackingArchive") == []
+    assert len(db.fetch_query("SELECT id FROM DeliveryTracking")) == 2
+    assert db.get_purchase_order_by_po_number("PO-1", target="primary").archived is False
+
+
+def test_archive_before_works_in_batches(db):
+    for index in range(5):
+        deliver_everything(db, save_purchase_order(db, f"PO-{index}"))
+    assert archive_before(db, date(2024, 3, 1), batch_size=2, pause=0, limit=3) == 3
+    assert archive_before(db, date(2024, 3, 1), batch_size=2, pause=0) == 2
+    assert db.fetch_query("SELECT id FROM PurchaseOrder") == []
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from benchmarks import compare, run_benchmarks
+from benchmarks.data_generator import InMemoryDBHandler, SyntheticDataGenerator
+
+
+def test_generated_data_is_reproducible():
+    first = SyntheticDataGenerator(num_pos=3, items_per_po=4, seed=7).purchase_orders()
+    second = SyntheticDataGenerator(num_pos=3, items_per_po=4, seed=7).purchase_orders()
+    assert [po.to_dict() for po in first] == [po.to_dict() for po in second]
+    assert [po.po_number for po in first] == ["BENCH-000000", "BENCH-000001", "BENCH-000002"]
+    assert all(po.total_qty == sum(item.qty for item in po.items) for po in first)
+
+
+def test_deliveries_add_up_to_the_ordered_quantity():
+    generator = SyntheticDataGenerator(num_pos=1, items_per_po=10, deliveries_per_item=3)
+    for item in generator.purchase_orders()[0].items:
+        deliveries = generator.deliveries(item)
+        assert sum(delivered for _, _, delivered, _, _ in deliveries) == item.qty
+        assert all(approved == delivered - rejected for _, _, delivered, rejected, approved in deliveries)
+
+
+def test_generated_ocr_text_parses_back_to_the_items():
+    pytest.importorskip("cv2")
+    pytest.importorskip("pytesseract")
+    from POManager.image_processor import ImageProcessor
+
+    generator = SyntheticDataGenerator(num_pos=1, items_per_po=5)
+    items = generator.purchase_orders()[0].items
+    processor = ImageProcessor(None)
+    parsed = processor.extract_item_details(processor.extract_table_section(generator.ocr_text(items)))
+    parsed = [row for row in parsed if row["Cart Part No"] != "Total:-"]
+    assert [(row["Cart Part No"], row["Qty"]) for row in parsed] == [(item.cart_part_no, item.qty) for item in items]
+
+
+def test_in_memory_handler_pages_the_generated_rows():
+    db_handler = InMemoryDBHandler(SyntheticDataGenerator(num_pos=5, items_per_po=2).purchase_orders())
+    first, token = db_handler.get_purchase_orders_page(page_size=3)
+    second, last_token = db_handler.get_purchase_orders_page(page_size=3, token=token)
+    assert [row["id"] for row in first + second] == [1, 2, 3, 4, 5]
+    assert last_token is None
+    assert [item.id for item in db_handler.get_items(2)] == [3, 4]
+
+
+def test_db_suite_writes_its_results_and_cleans_up(tmp_path):
+    output = tmp_path / "results.json"
+    sqlite_path = str(tmp_path / "bench.sqlite3")
+    run_benchmarks.main(["--only", "db", "--backend", "sqlite", "--sqlite-path", sqlite_path,
+                         "--pos", "3", "--items", "2", "--repeat", "1", "--output", str(output)])
+
+    document = json.loads(output.read_text())
+    assert document["meta"]["params"]["pos"] == 3 and "password" not in document["meta"]["params"]
+    result = document["results"]["db.insert_purchase_orders_with_items"]
+    assert result["runs"] == 1 and result["units"] == 3
+
+    from POManager.storage_backends import create_backend
+    from POManager.db_handler import DBHandler
+    db_handler = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    assert db_handler.fetch_query("SELECT id FROM PurchaseOrder") == []
+    db_handler.close_connection()
+
+
+def write_benchmark_file(path, medians):
+    path.write_text(json.dumps({"results": {name: {"median": median} for name, median in medians.items()}}))
+    return str(path)
+
+
+def test_compare_flags_slowdowns_over_the_threshold(tmp_path, capsys):
+    baseline = write_benchmark_file(tmp_path / "before.json", {"db.read": 1.0, "db.write": 1.0})
+    faster = write_benchmark_file(tmp_path / "faster.json", {"db.read": 0.5, "db.write": 1.05})
+    slower = write_benchmark_file(tmp_path / "slower.json", {"db.read": 1.2, "db.write": 1.0})
+
+    with pytest.raises(SystemExit) as exit_info:
+        compare.main([baseline, faster])
+    assert exit_info.value.code == 0
+    with pytest.raises(SystemExit) as exit_info:
+        compare.main([baseline, slower])
+    assert exit_info.value.code == 1
+    assert "db.read" in [line.split()[0] for line in capsys.readouterr().out.splitlines() if "REGRESSION" in line]
@@ -0,0 +1,41 @@
+from datetime import date
+
+from tests.conftest import save_purchase_order
+
+
+def test_delete_purchase_orders_removes_dependent_rows(db):
+    first = save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2")
+    save_purchase_order(db, "PO-3")
+    db.insert_delivery_tracking(first.items[0].id, "C-1", date(2024, 2, 1), 1, 0, 1)
+    db.add_image_hash(0xFF, "PO-1")
+    token = db.get_change_token()
+
+    assert db.delete_purchase_orders(["PO-1", "PO-2"]) == 2
+    assert [row["po_number"] for row in db.fetch_query("SELECT po_number FROM PurchaseOrder")] == ["PO-3"]
+    assert db.fetch_query("SELECT id FROM Item WHERE purchase_order_id = %s", (first.id,)) == []
+    assert db.fetch_query("SELECT id FROM DeliveryTracking") == []
+    assert db.fetch_query("SELECT id FROM ImageHash") == []
+    changes = db.get_changes_since(token)
+    assert sorted(row["po_number"] for row in changes["deleted"]) == ["PO-1", "PO-2"]
+
+
+def test_delete_single_purchase_order(db):
+    save_purchase_order(db, "PO-1")
+    db.add_image_hash(0xFF, "PO-1")
+    db.delete_purchase_order("PO-1")
+    assert db.fetch_query("SELECT id FROM PurchaseOrder") == []
+    assert db.fetch_query("SELECT id FROM Item") == []
+    assert db.fetch_query("SELECT id FROM ImageHash") == []
+
+
+def test_update_purchase_order_dates(db):
+    save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2")
+    save_purchase_order(db, "PO-3")
+    token = db.get_change_token()
+
+    assert db.update_purchase_order_dates(["PO-1", "PO-3"], date(2024, 6, 1)) == 2
+    rows = db.fetch_query("SELECT po_number, order_date FROM PurchaseOrder ORDER BY po_number")
+    assert [str(row["order_date"]) for row in rows] == ["2024-06-01", "2024-01-15", "2024-06-01"]
+    assert sorted(row["po_number"] for row in db.get_changes_since(token)["updated"]) == ["PO-1", "PO-3"]
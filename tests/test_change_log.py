@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+from POManager import db_handler as db_module
+from tests.conftest import make_purchase_order, save_purchase_order
+
+
+def po_numbers(rows):
+    return sorted(row["po_number"] for row in rows)
+
+
+def test_changes_are_collapsed_per_purchase_order(db):
+    kept = save_purchase_order(db, "PO-1")
+    token = db.get_change_token()
+
+    save_purchase_order(db, "PO-2")  # Inserted, then its items too
+    kept.items[0].qty = 5
+    db.update_purchase_order_items(kept, kept.items[:1])
+    save_purchase_order(db, "PO-3")
+    db.delete_purchase_orders(["PO-3"])
+
+    changes = db.get_changes_since(token)
+    assert po_numbers(changes["inserted"]) == ["PO-2"]
+    assert po_numbers(changes["updated"]) == ["PO-1"]
+    assert po_numbers(changes["deleted"]) == ["PO-3"]
+    assert not changes["has_more"]
+
+    # Nothing changed since the returned token
+    later = db.get_changes_since(changes["token"])
+    assert later["inserted"] == later["updated"] == later["deleted"] == []
+    assert later["token"] == changes["token"]
+
+
+def test_updated_rows_are_current(db):
+    purchase_order = save_purchase_order(db, "PO-1")
+    token = db.get_change_token()
+    purchase_order.total_qty = 42
+    db.update_purchase_order(purchase_order)
+    [row] = db.get_changes_since(token)["updated"]
+    assert row["total_qty"] == 42
+
+
+def test_changes_are_read_in_limited_batches(db):
+    token = db.get_change_token()
+    for index in range(3):
+        save_purchase_order(db, f"PO-{index}", items=1)  # Two entries each: the PO and its item
+
+    seen = []
+    batches = 0
+    while True:
+        changes = db.get_changes_since(token, limit=2)
+        seen.extend(row["po_number"] for row in changes["inserted"] + changes["updated"])
+        token = changes["token"]
+        batches += 1
+        if not changes["has_more"]:
+            break
+    assert sorted(set(seen)) == ["PO-0", "PO-1", "PO-2"]
+    assert batches == 4
+
+
+def test_prune_drops_old_entries(db):
+    save_purchase_order(db, "PO-1")
+    db.prune_change_log(datetime.now() + timedelta(days=1))
+    assert db.fetch_query("SELECT id FROM ChangeLog") == []
+
+
+def log_entry(db_handler, entry_id, purchase_order):
+    """Write a ChangeLog entry with a given id, as a transaction that was given that id would commit it."""
+    db_handler.execute_query(
+        "INSERT INTO ChangeLog (id, table_name, row_id, purchase_order_id, po_number, operation) "
+        "VALUES (%s, 'PurchaseOrder', %s, %s, %s, 'update')",
+        (entry_id, purchase_order.id, purchase_order.id, purchase_order.po_number)
+    )
+
+
+def test_entry_committed_after_a_later_one_is_delivered(db):
+    first = save_purchase_order(db, "PO-1")
+    second = save_purchase_order(db, "PO-2")
+    token = db.get_change_token()
+    last_id = int(token)
+
+    # Clerk A's write was given last_id + 1 but commits after clerk B's last_id + 2
+    clerk_a, clerk_b = db.clone(), db.clone()
+    try:
+        log_entry(clerk_b, last_id + 2, second)
+        changes = db.get_changes_since(token)
+        assert [row["po_number"] for row in changes["updated"]] == ["PO-2"]
+
+        log_entry(clerk_a, last_id + 1, first)
+        changes = db.get_changes_since(changes["token"])
+        assert [row["po_number"] for row in changes["updated"]] == ["PO-1"]
+        assert changes["token"] == str(last_id + 2)  # Nothing is outstanding any more
+    finally:
+        clerk_a.close_connection()
+        clerk_b.close_connection()
+
+
+def test_change_token_remembers_ids_still_in_flight(db):
+    purchase_order = save_purchase_order(db, "PO-1", items=0)
+    log_entry(db, 10, purchase_order)
+    token = db.get_change_token()  # Ids 2-9 are not visible yet
+    log_entry(db, 5, purchase_order)
+    assert [row["po_number"] for row in db.get_changes_since(token)["updated"]] == ["PO-1"]
+
+
+def test_rolled_back_ids_are_given_up(db, monkeypatch):
+    purchase_order = save_purchase_order(db, "PO-1", items=0)
+    token = db.get_change_token()
+    log_entry(db, int(token) + 2, purchase_order)
+    changes = db.get_changes_since(token)
+    assert ";" in changes["token"]
+
+    monkeypatch.setattr(db_module, "CHANGE_LOG_GAP_TIMEOUT", -1)
+    assert db.get_changes_since(changes["token"])["token"] == str(int(token) + 2)
+
+
+def test_out_of_order_commits_on_mysql(mysql_db):
+    clerk_a, clerk_b, poller = mysql_db, mysql_db.clone(), mysql_db.clone()
+    try:
+        token = poller.get_change_token()
+        first = make_purchase_order("PO-A")
+        clerk_a.execute_statement("INSERT INTO PurchaseOrder (po_number, order_date, total_qty, total_amount) "
+                                  "VALUES (%s, %s, 0, 0)", (first.po_number, first.added_date))
+        clerk_a.log_purchase_order_changes('insert', "id = %s", (clerk_a.last_insert_id(),), commit=False)
+        save_purchase_order(clerk_b, "PO-B")
+
+        changes = poller.get_changes_since(token)
+        assert [row["po_number"] for row in changes["inserted"]] == ["PO-B"]
+        clerk_a.connection.commit()
+        changes = poller.get_changes_since(changes["token"])
+        assert [row["po_number"] for row in changes["inserted"]] == ["PO-A"]
+    finally:
+        clerk_b.close_connection()
+        poller.close_connection()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+import pytest
+
+from POManager.async_db_handler import AsyncDBHandler
+from POManager.connection_pool import ConnectionPool
+from tests.conftest import make_purchase_order, save_purchase_order
+
+
+def test_connections_are_reused_up_to_the_size(db):
+    pool = ConnectionPool(db, size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second and first.connection is not db.connection
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+
+    pool.release(second)
+    assert pool.acquire() is second
+    assert pool.created == 2
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+
+
+def test_waiting_thread_gets_a_released_connection(db):
+    pool = ConnectionPool(db, size=1)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+    pool.release(held)
+    waiter.join()
+    assert got == [held]
+    pool.close()
+
+
+def test_released_connection_is_rolled_back(db):
+    save_purchase_order(db, "PO-1")
+    pool = ConnectionPool(db, size=1)
+    with pool.connection() as pooled:
+        pooled.execute_statement("DELETE FROM Item")
+    with pool.connection() as pooled:
+        assert len(pooled.fetch_query("SELECT id FROM Item")) == 2
+    pool.close()
+
+
+def test_broken_connection_is_discarded(db, capsys):
+    pool = ConnectionPool(db, size=1)
+    broken = pool.acquire()
+    broken.connection.close()
+    pool.release(broken)
+    assert "Discarding pooled connection" in capsys.readouterr().out
+    assert pool.created == 0
+
+    replacement = pool.acquire()
+    assert replacement is not broken
+    assert replacement.fetch_query("SELECT 1 AS one") == [{"one": 1}]
+    pool.release(replacement)
+    pool.close()
+
+
+def test_closed_pool_refuses_connections(db):
+    pool = ConnectionPool(db, size=2)
+    in_use = pool.acquire()
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.release(in_use)  # Closed rather than returned
+    assert pool.idle.empty()
+    assert not in_use.connection.is_connected()
+
+
+def test_async_handler_saves_and_streams_purchase_orders(db):
+    async def scenario():
+        async with AsyncDBHandler(db, pool_size=2) as handler:
+            purchase_orders = [make_purchase_order(f"PO-{index}") for index in range(5)]
+            ids = await handler.save_purchase_orders(purchase_orders)
+            assert ids == [purchase_order.id for purchase_order in purchase_orders]
+            assert await handler.purchase_order_exists("PO-3")
+            rows = [row async for row in handler.iter_purchase_orders(page_size=2)]
+            items = [row async for row in handler.iter_items(page_size=3)]
+            return rows, items
+
+    rows, items = asyncio.run(scenario())
+    assert sorted(row["po_number"] for row in rows) == [f"PO-{index}" for index in range(5)]
+    assert len(items) == 10
+
+
+def test_failed_item_insert_leaves_no_po_header(db):
+    purchase_order = make_purchase_order("PO-1")
+    purchase_order.items[1].qty = "not a number"  # Rejected by the trigger below
+    db.execute_query("CREATE TRIGGER reject_bad_qty BEFORE INSERT ON Item WHEN typeof(NEW.qty) = 'text' "
+                     "BEGIN SELECT RAISE(ABORT, 'qty must be a number'); END")
+
+    async def scenario():
+        async with AsyncDBHandler(db, pool_size=1) as handler:
+            await handler.save_purchase_order(purchase_order)
+
+    with pytest.raises(db.backend.Error):
+        asyncio.run(scenario())
+    assert db.fetch_query("SELECT id FROM PurchaseOrder") == []
+    assert db.fetch_query("SELECT id FROM ChangeLog") == []
+    assert not purchase_order.id
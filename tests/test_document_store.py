@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from POManager.document_store import THUMBNAIL_SIZE, DocumentStore, image_size
+from tests.conftest import save_purchase_order
+
+cv2 = pytest.importorskip("cv2")
+numpy = pytest.importorskip("numpy")
+
+
+def encoded_scan(extension, width=1200, height=800, shade=200):
+    image = numpy.full((height, width, 3), shade, numpy.uint8)
+    cv2.rectangle(image, (50, 50), (width - 50, height - 50), (0, 0, 0), 3)
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+def test_image_size_reads_png_and_jpeg_headers(tmp_path):
+    png = encoded_scan(".png", 640, 480)
+    assert image_size(png) == (640, 480)
+    assert image_size(encoded_scan(".jpg", 300, 200)) == (300, 200)
+    path = tmp_path / "scan.png"
+    path.write_bytes(png)
+    assert image_size(str(path)) == (640, 480)
+    assert image_size(b"not an image") is None
+
+
+def test_scans_in_the_database_are_stored_once(db):
+    store = DocumentStore(db)
+    data = encoded_scan(".png")
+    sha256 = store.add("PO-1", data, "first.png")
+    assert store.add("PO-2", data, "copy.png") == sha256
+    assert len(db.fetch_query("SELECT sha256 FROM ScanBlob")) == 1
+
+    [document] = store.documents("PO-1")
+    assert (document["image_name"], document["width"], document["height"]) == ("first.png", 1200, 800)
+    assert document["size_bytes"] == len(data)
+    thumbnail = cv2.imdecode(numpy.frombuffer(document["thumbnail"], numpy.uint8), cv2.IMREAD_COLOR)
+    assert max(thumbnail.shape[:2]) == THUMBNAIL_SIZE
+    assert store.load_image(document).shape == (800, 1200, 3)
+
+
+def test_scans_under_a_root_are_files(db, tmp_path):
+    store = DocumentStore(db, root=str(tmp_path / "scans"))
+    path = tmp_path / "po1.jpg"
+    path.write_bytes(encoded_scan(".jpg"))
+    sha256 = store.add_file("PO-1", str(path))
+
+    assert os.path.exists(store.path(sha256))
+    assert db.fetch_query("SELECT sha256 FROM ScanBlob") == []
+    [document] = store.documents("PO-1")
+    assert document["image_name"] == "po1.jpg"
+    assert store.load_image(document).shape == (800, 1200, 3)
+
+
+def test_deleting_a_po_drops_originals_no_one_else_uses(db):
+    store = DocumentStore(db)
+    shared = encoded_scan(".png")
+    save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2")
+    store.add("PO-1", shared)
+    store.add("PO-1", encoded_scan(".png", shade=100))
+    store.add("PO-2", shared)
+
+    db.delete_purchase_order("PO-1")
+    assert store.documents("PO-1") == []
+    assert [row["sha256"] for row in db.fetch_query("SELECT sha256 FROM ScanBlob")] == \
+        [document["sha256"] for document in store.documents("PO-2")]
+
+    db.delete_purchase_orders(["PO-2"])
+    assert db.fetch_query("SELECT sha256 FROM ScanBlob") == []
+
+
+def test_missing_original_raises(db):
+    store = DocumentStore(db)
+    store.add("PO-1", encoded_scan(".png"), "po1.png")
+    db.execute_query("DELETE FROM ScanBlob")
+    with pytest.raises(FileNotFoundError):
+        store.load_image(store.documents("PO-1")[0])
+
+
+def test_failed_document_insert_raises_and_keeps_no_blob(db):
+    db.execute_query("DROP TABLE ScanDocument")
+    with pytest.raises(db.backend.Error):
+        DocumentStore(db).add("PO-1", encoded_scan(".png"))
+    assert db.fetch_query("SELECT sha256 FROM ScanBlob") == []
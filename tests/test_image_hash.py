@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from POManager.image_hash import ImageHashIndex, MultiIndexHash, hamming_distance
+from tests.conftest import save_purchase_order
+
+
+def test_multi_index_search_matches_a_linear_scan():
+    rng = random.Random(0)
+    index = MultiIndexHash(max_distance=10)
+    stored = [rng.getrandbits(64) for _ in range(300)]
+    # Near copies, so the radius has something to find
+    stored += [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for value in stored[:50]]
+    for position, value in enumerate(stored):
+        index.add(value, position)
+    assert len(index) == len(stored)
+
+    for query in stored[:60] + [rng.getrandbits(64) for _ in range(20)]:
+        expected = sorted((hamming_distance(query, value), position) for position, value in enumerate(stored)
+                          if hamming_distance(query, value) <= 10)
+        assert sorted((distance, position) for distance, _, position in index.search(query)) == expected
+
+
+def test_table_hash_confirms_page_hash_matches(db):
+    index = ImageHashIndex(db, max_distance=8, table_max_distance=40)
+    page_hash = 0x0123456789ABCDEF
+    table_hash = (1 << 255) | 0xFFFF
+    index.add(page_hash, "PO-1", "po1.png", table_hash)
+
+    rescan = index.find_duplicates(page_hash ^ 0b11, table_hash ^ 0b111)
+    assert rescan == [{"po_number": "PO-1", "image_name": "po1.png", "distance": 2, "table_distance": 3}]
+    # Same template, different table
+    assert index.find_duplicates(page_hash ^ 0b11, table_hash ^ ((1 << 100) - 1)) == []
+    assert index.find_duplicates(page_hash ^ 0xFFFF, table_hash) == []
+
+
+def test_rows_without_a_table_hash_match_on_the_page_hash(db):
+    index = ImageHashIndex(db, max_distance=8)
+    index.add(0xFF, "PO-1")
+    assert [match["po_number"] for match in index.find_duplicates(0xFE, 12345)] == ["PO-1"]
+    assert index.find_duplicates(0xFE, 12345)[0]["table_distance"] is None
+
+
+def test_table_hash_tells_rescans_from_other_pages():
+    numpy = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    pytest.importorskip("PIL")
+    from benchmarks.data_generator import SyntheticDataGenerator
+    from benchmarks.po_image_generator import POImageGenerator
+    from POManager.image_hash import table_hash
+
+    first, second = SyntheticDataGenerator(num_pos=2, items_per_po=10, seed=3, po_prefix="HASH").purchase_orders()
+    original = POImageGenerator(dpi=100, noise=4, skew=0.3, seed=1)
+    rescanner = POImageGenerator(dpi=100, noise=10, skew=1.5, blur=0.8, seed=2)
+    page = table_hash(numpy.asarray(original.render(first)))
+    rescan = table_hash(numpy.asarray(rescanner.render(first)))
+    other = table_hash(numpy.asarray(original.render(second)))
+
+    threshold = ImageHashIndex(None).table_max_distance
+    assert hamming_distance(page, rescan) <= threshold < hamming_distance(page, other)
+
+
+def test_hashes_of_deleted_pos_are_dropped(db):
+    index = ImageHashIndex(db, max_distance=8)
+    save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2")
+    index.add(0xFF, "PO-1")
+    index.add(0xFF00, "PO-2")
+    assert [match["po_number"] for match in index.find_duplicates(0xFF)] == ["PO-1"]
+
+    db.delete_purchase_order("PO-1")
+    assert index.find_duplicates(0xFF) == []
+    assert [match["po_number"] for match in index.find_duplicates(0xFF00)] == ["PO-2"]
+
+    db.delete_purchase_orders(["PO-2"])
+    index.add(0xFF, "PO-3")
+    assert [match["po_number"] for match in index.find_duplicates(0xFF00)] == []
+    assert [match["po_number"] for match in index.find_duplicates(0xFF)] == ["PO-3"]
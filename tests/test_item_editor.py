@@ -0,0 +1,90 @@
+import pytest
+
+from POManager.item import Item
+
+
+def scanned_items():
+    corrected, unknown = Item("AB-10023", "USA", "NOS", 1, 2.5, "Part"), Item("ZZ-9", "USA", "NOS", 2, 1.0, "Gasket")
+    corrected.part_status, corrected.ocr_cart_part_no = "corrected", "A8-1OO23"
+    unknown.part_status = "unknown"
+    checked = Item("AB-10024", "USA", "NOS", 1, 4.0, "Filter")
+    checked.part_status = "exact"
+    return [corrected, unknown, checked]
+
+
+def test_part_numbers_to_review_are_highlighted(qapp):
+    from PyQt5.QtCore import Qt
+    from POManager.item_editor import ItemTableModel, PART_STATUS_COLOURS
+
+    model = ItemTableModel(scanned_items())
+    assert model.review_count() == 2
+    assert model.data(model.index(0, 0), Qt.BackgroundRole) == PART_STATUS_COLOURS["corrected"]
+    assert "A8-1OO23" in model.data(model.index(0, 0), Qt.ToolTipRole)
+    assert model.data(model.index(1, 0), Qt.ToolTipRole).startswith("Not a known part number")
+    assert model.data(model.index(2, 0), Qt.BackgroundRole) is None
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is None
+
+
+def test_editing_a_part_number_clears_its_highlight(qapp):
+    from PyQt5.QtCore import Qt
+    from POManager.item_editor import ItemTableModel
+
+    model = ItemTableModel(scanned_items())
+    counts = []
+    model.review_changed.connect(counts.append)
+    assert model.setData(model.index(1, 0), "ZZ-10009")
+    assert counts == [1]
+    assert model.data(model.index(1, 0), Qt.BackgroundRole) is None
+    assert model.items[1].part_status is None
+
+
+def test_edits_adjust_the_totals_and_mark_their_rows(qapp):
+    from PyQt5.QtCore import Qt
+    from POManager.item_editor import ItemTableModel, QTY_COLUMN, RATE_COLUMN
+
+    model = ItemTableModel([Item("P-0", qty=1, rate_include_gst=10), Item("P-1", qty=2, rate_include_gst=5)])
+    totals = []
+    model.totals_changed.connect(lambda qty, amount: totals.append((qty, amount)))
+    assert (model.total_qty, model.total_amount) == (3, 20.0)
+
+    assert model.setData(model.index(1, QTY_COLUMN), "4")
+    assert model.setData(model.index(1, RATE_COLUMN), "1,250.5")
+    assert model.setData(model.index(0, QTY_COLUMN), "1")  # Unchanged, so not dirty
+    assert totals == [(5, 30.0), (5, 5012.0)]
+    assert model.dirty_items() == [model.items[1]]
+    assert model.data(model.index(1, RATE_COLUMN), Qt.DisplayRole) == "1250.50"
+
+
+def test_invalid_edits_are_rejected(qapp):
+    from POManager.item_editor import ItemTableModel, QTY_COLUMN, RATE_COLUMN
+
+    model = ItemTableModel([Item("P-0", qty=1, rate_include_gst=10)])
+    errors = []
+    model.validation_failed.connect(errors.append)
+    assert not model.setData(model.index(0, QTY_COLUMN), "0")
+    assert not model.setData(model.index(0, QTY_COLUMN), "two")
+    assert not model.setData(model.index(0, RATE_COLUMN), "-1")
+    assert len(errors) == 3 and errors[0] == "Invalid input: Qty must be a positive value."
+    assert (model.items[0].qty, model.items[0].rate_include_gst, model.dirty_rows) == (1, 10, set())
+
+
+def test_saving_an_existing_po_writes_only_the_edited_rows(qapp, db, monkeypatch):
+    from POManager import item_editor
+    from POManager.item_editor import ItemEditorDialog, QTY_COLUMN
+    from tests.conftest import save_purchase_order
+
+    monkeypatch.setattr(item_editor.QMessageBox, "information", staticmethod(lambda *args: None))
+    written = []
+    update_items = db.update_purchase_order_items
+    monkeypatch.setattr(db, "update_purchase_order_items",
+                        lambda po, items: (written.append([item.cart_part_no for item in items]), update_items(po, items)))
+
+    purchase_order = save_purchase_order(db, "PO-1", items=3)
+    dialog = ItemEditorDialog(db, purchase_order, purchase_order.items, add=False)
+    dialog.model.setData(dialog.model.index(2, QTY_COLUMN), "7")
+    dialog.save_items_and_po()
+
+    assert written == [["PO-1-P2"]]
+    saved = db.get_purchase_order_by_po_number("PO-1", target="primary")
+    assert saved.total_qty == 10
+    assert [item.qty for item in saved.items] == [1, 2, 7]
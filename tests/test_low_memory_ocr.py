@@ -0,0 +1,57 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytesseract = pytest.importorskip("pytesseract")
+
+from POManager.image_processor import ImageProcessor
+
+
+def marked_rows_data(image, output_type=None):
+    """image_to_data stand-in reading one word per black pixel in the first column of `image`."""
+    rows = [int(row) for row in np.flatnonzero(image[:, 0] == 0)]
+    return {"text": ["word"] * len(rows), "conf": [95] * len(rows), "block_num": [1] * len(rows),
+            "par_num": [1] * len(rows), "line_num": list(range(1, len(rows) + 1)), "left": [0] * len(rows),
+            "top": rows, "width": [1] * len(rows), "height": [1] * len(rows)}
+
+
+def page_with_marked_rows(height, every):
+    page = np.full((height, 20), 255, dtype=np.uint8)
+    page[::every, 0] = 0
+    return page
+
+
+@pytest.mark.parametrize("extension", [".png", ".jpg"])
+def test_large_scan_is_decoded_reduced_and_grayscale(tmp_path, extension):
+    path = str(tmp_path / f"scan{extension}")
+    cv2.imwrite(path, np.full((400, 400, 3), 200, dtype=np.uint8))
+    processor = ImageProcessor(path, low_memory=True)
+    processor.LOW_MEMORY_MAX_PIXELS = 10_000
+
+    gray = processor.load_gray_image()
+    assert gray.shape == (100, 100)
+    assert processor.image is None
+    assert processor.memory_stats == {"reduction": 4, "pixels": 10_000}
+
+
+def test_tiles_read_every_line_once(monkeypatch):
+    monkeypatch.setattr(pytesseract, "image_to_data", marked_rows_data)
+    processor = ImageProcessor(None, low_memory=True)
+    processor.TILE_HEIGHT, processor.TILE_OVERLAP = 200, 40
+    processor.gray_image = page_with_marked_rows(500, 25)
+
+    lines = processor.ocr_lines(1)
+    assert sorted(line["box"][1] for line in lines) == list(range(0, 500, 25))
+    assert processor.memory_stats["tiles"] == 3
+
+
+def test_low_memory_processing_releases_the_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(pytesseract, "image_to_data", marked_rows_data)
+    path = str(tmp_path / "scan.png")
+    cv2.imwrite(path, page_with_marked_rows(300, 50))
+
+    processor = ImageProcessor(path, low_memory=True)
+    text = processor.process_image()
+    assert text.splitlines() == ["word"] * 6
+    assert processor.gray_image is None
+    assert processor.memory_stats["peak_bytes"] > 0
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("numpy")
+
+from benchmarks import ocr_benchmark
+from benchmarks.data_generator import SyntheticDataGenerator
+from benchmarks.po_image_generator import POImageGenerator
+
+
+def generated_pos(pages=2, rows=3):
+    return SyntheticDataGenerator(num_pos=pages, items_per_po=rows, po_prefix="SCAN").purchase_orders()
+
+
+def test_scan_and_ground_truth_are_written_together(tmp_path):
+    from PIL import Image
+
+    purchase_order = generated_pos(pages=1)[0]
+    image_path = POImageGenerator(dpi=100, noise=5, skew=1, blur=0.5).write(purchase_order, str(tmp_path))
+
+    with Image.open(image_path) as image:
+        assert image.mode == "L"
+        assert round(image.info["dpi"][0]) == 100
+    with open(os.path.splitext(image_path)[0] + ".json") as f:
+        truth = json.load(f)
+    assert truth["image"] == "SCAN-000000.png"
+    assert [item["cart_part_no"] for item in truth["items"]] == [item.cart_part_no for item in purchase_order.items]
+
+
+def test_rendering_is_reproducible_for_a_seed():
+    purchase_order = generated_pos(pages=1)[0]
+    first = POImageGenerator(dpi=72, noise=8, skew=2, seed=3).render(purchase_order)
+    second = POImageGenerator(dpi=72, noise=8, skew=2, seed=3).render(purchase_order)
+    assert first.tobytes() == second.tobytes()
+    assert first.tobytes() != POImageGenerator(dpi=72, noise=8, skew=2, seed=4).render(purchase_order).tobytes()
+
+
+def test_score_pairs_rows_by_part_number_then_position():
+    truth = [
+        {"cart_part_no": "A1-100", "country_of_origin": "USA", "a_unit": "NOS", "qty": 2,
+         "rate_include_gst": 10.5, "nomenclature": "OIL FILTER"},
+        {"cart_part_no": "B2-200", "country_of_origin": "JAPAN", "a_unit": "SET", "qty": 1,
+         "rate_include_gst": 3.0, "nomenclature": "GASKET"},
+    ]
+    extracted = [
+        {"Cart Part No": "A1-100", "Country of Origin": "USA", "A/Unit": "NOS", "Qty": 3,
+         "Rate Include GST": 10.5, "Nomenclature": "OIL FILTER"},
+        {"Cart Part No": "B2-2OO", "Country of Origin": "JAPAN", "A/Unit": "SET", "Qty": 1,
+         "Rate Include GST": 3.001, "Nomenclature": "gasket"},
+        {"Cart Part No": "Total:-"},
+    ]
+    counts, extracted_count = ocr_benchmark.score(truth, extracted)
+    assert extracted_count == 2
+    assert counts == {"cart_part_no": 1, "country_of_origin": 2, "a_unit": 2, "qty": 1,
+                      "rate_include_gst": 2, "nomenclature": 2}
+
+
+def test_benchmark_reports_throughput_and_accuracy(tmp_path, monkeypatch):
+    pytest.importorskip("cv2")
+    pytesseract = pytest.importorskip("pytesseract")
+
+    texts = []
+    for purchase_order in generated_pos():
+        POImageGenerator(dpi=72).write(purchase_order, str(tmp_path / "scans"))
+        texts.append(SyntheticDataGenerator().ocr_text(purchase_order.items))
+    # No tesseract binary is needed: every page "reads" as its ground truth
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda image, **kwargs: texts.pop(0))
+
+    output = tmp_path / "ocr.json"
+    ocr_benchmark.main([str(tmp_path / "scans"), "--output", str(output)])
+    results = json.loads(output.read_text())["results"]
+    assert results["ocr.pages"]["pages"] == 2
+    assert results["ocr.accuracy"]["truth_items"] == results["ocr.accuracy"]["extracted_items"] == 6
+    assert results["ocr.accuracy"]["fields"]["cart_part_no"] == 1.0
+    assert results["ocr.stage.tesseract"]["runs"] == 2
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from POManager import ocr_worker
+from POManager.item import Item
+
+
+def job_row(db_handler, job_id):
+    return db_handler.fetch_one_query("SELECT * FROM OcrJob WHERE id = %s", (job_id,))
+
+
+def expire_lease(db_handler, job_id):
+    db_handler.execute_query("UPDATE OcrJob SET lease_expires_at = %s WHERE id = %s",
+                             (datetime.now() - timedelta(seconds=1), job_id))
+
+
+def test_claim_and_complete(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image", requested_by="client")
+    job = db.claim_ocr_job("worker-1")
+    assert (job["id"], job["po_number"], job["image"], job["attempts"]) == (job_id, "PO-1", b"image", 1)
+    assert db.claim_ocr_job("worker-2") is None  # Leased to worker-1
+
+    assert db.complete_ocr_job(job_id, "worker-1", [Item("P-1", "USA", "NOS", 2, 5.5, "Part")])
+    [done] = db.get_ocr_jobs([job_id])
+    assert done["status"] == "done"
+    [item] = db.ocr_job_items(done)
+    assert (item.cart_part_no, item.qty, item.rate_include_gst, item.nomenclature) == ("P-1", 2, 5.5, "Part")
+    assert db.get_open_ocr_jobs("client") == [job_id]
+
+    db.mark_ocr_job_collected(job_id)
+    assert db.get_open_ocr_jobs("client") == []
+
+
+def test_expired_lease_moves_to_another_worker(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image")
+    db.claim_ocr_job("worker-1")
+    expire_lease(db, job_id)
+
+    job = db.claim_ocr_job("worker-2")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not db.complete_ocr_job(job_id, "worker-1", [])  # The lease was lost
+    assert db.complete_ocr_job(job_id, "worker-2", [])
+
+
+def test_failed_attempts_are_retried_until_max_attempts(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image", max_attempts=2)
+    db.claim_ocr_job("worker")
+    db.fail_ocr_job(job_id, "worker", "unreadable", retry_delay=0)
+    assert job_row(db, job_id)["status"] == "queued"
+
+    assert db.claim_ocr_job("worker")["attempts"] == 2
+    db.fail_ocr_job(job_id, "worker", "unreadable again", retry_delay=0)
+    row = job_row(db, job_id)
+    assert (row["status"], row["error"]) == ("failed", "unreadable again")
+    assert db.claim_ocr_job("worker") is None
+
+
+def test_expired_last_attempt_is_marked_failed(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image", max_attempts=1)
+    db.claim_ocr_job("worker-1")
+    expire_lease(db, job_id)
+    assert db.claim_ocr_job("worker-2") is None
+    assert job_row(db, job_id)["status"] == "failed"
+
+
+def test_worker_does_not_fail_a_job_when_storing_its_scan_fails(db, sqlite_path, monkeypatch, capsys):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image")
+    monkeypatch.setattr(ocr_worker, "extract_job_items",
+                        lambda job, *args: ([Item("P-1", qty=1)], (0xFF, 0xFFFF), {}))
+
+    def broken_add(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ocr_worker.DocumentStore, "add", broken_add)
+    ocr_worker.main(["--backend", "sqlite", "--sqlite-path", sqlite_path, "--exit-when-empty"])
+
+    row = job_row(db, job_id)
+    assert (row["status"], row["attempts"]) == ("done", 1)
+    assert db.get_image_hashes(target="primary")[0]["po_number"] == "PO-1"
+    assert "1 done, 0 failed" in capsys.readouterr().out
+
+
+def test_failed_enqueue_raises(db):
+    with pytest.raises(db.backend.Error):
+        db.enqueue_ocr_image("PO-1", "po1.png", None)  # image is NOT NULL
+    assert db.fetch_query("SELECT id FROM OcrJob") == []
+
+
+def test_collect_only_takes_a_done_job_once(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image")
+    assert not db.collect_ocr_job(job_id)  # Still queued
+    db.claim_ocr_job("worker")
+    db.complete_ocr_job(job_id, "worker", [])
+    assert db.collect_ocr_job(job_id)
+    db.connection.commit()
+    assert not db.collect_ocr_job(job_id)
+    assert job_row(db, job_id)["status"] == "collected"
+
+
+def test_part_checks_are_kept_with_the_job_items(db):
+    job_id = db.enqueue_ocr_image("PO-1", "po1.png", b"image")
+    corrected = Item("AB-10023", "USA", "NOS", 1, 2.5, "Part")
+    corrected.part_status, corrected.ocr_cart_part_no = "corrected", "A8-1OO23"
+    db.claim_ocr_job("worker")
+    db.complete_ocr_job(job_id, "worker", [corrected, Item("P-2", qty=1)])
+
+    first, second = db.ocr_job_items(db.get_ocr_jobs([job_id])[0])
+    assert (first.cart_part_no, first.part_status, first.ocr_cart_part_no) == ("AB-10023", "corrected", "A8-1OO23")
+    assert first.needs_review() and not second.needs_review()
@@ -0,0 +1,45 @@
+import time
+
+from POManager.ocr_profiler import StageProfiler
+
+
+def test_report_aggregates_stages_and_images():
+    records = []
+    profiler = StageProfiler(hooks=[records.append])
+    for image in ("a.png", "b.png"):
+        with profiler.stage("load", image):
+            time.sleep(0.01)
+        with profiler.stage("tesseract", image):
+            time.sleep(0.02)
+
+    report = profiler.report()
+    assert report["images"] == 2
+    assert [record["stage"] for record in records] == ["load", "tesseract"] * 2
+    load, tesseract = report["stages"]["load"], report["stages"]["tesseract"]
+    assert load["count"] == tesseract["count"] == 2
+    assert tesseract["wall_total"] > load["wall_total"] >= 0.02
+    assert abs(load["share"] + tesseract["share"] - 1) < 1e-9
+    assert load["peak_memory_max"] is None
+    assert report["per_image"]["a.png"]["wall"] >= 0.03
+    assert "tesseract" in profiler.format_report()
+
+
+def test_stage_is_recorded_when_it_raises():
+    profiler = StageProfiler()
+    try:
+        with profiler.stage("parsing", "a.png"):
+            raise ValueError("unparseable")
+    except ValueError:
+        pass
+    assert [record["stage"] for record in profiler.records] == ["parsing"]
+
+
+def test_memory_and_cprofile_capture():
+    profiler = StageProfiler(track_memory=True, profile=True)
+    with profiler.stage("load", "a.png"):
+        buffer = bytearray(4 * 2 ** 20)
+    del buffer
+    profiler.close()
+
+    assert profiler.report()["stages"]["load"]["peak_memory_max"] >= 4 * 2 ** 20
+    assert "function calls" in profiler.profile_stats()
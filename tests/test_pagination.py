@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from tests.conftest import save_purchase_order
+
+ORDER_DATES = [date(2024, 1, 3), None, date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 2), None, date(2024, 1, 3)]
+
+
+@pytest.fixture
+def purchase_orders(db):
+    return [save_purchase_order(db, f"PO-{index}", items=1, order_date=order_date)
+            for index, order_date in enumerate(ORDER_DATES)]
+
+
+def all_pages(db_handler, page_size, **kwargs):
+    ids, token, pages = [], None, 0
+    while True:
+        rows, token = db_handler.get_purchase_orders_page(page_size, token, **kwargs)
+        ids.extend(row["id"] for row in rows)
+        pages += 1
+        if token is None:
+            return ids, pages
+        kwargs.pop("sort", None)  # The token carries the sort
+        kwargs.pop("descending", None)
+
+
+def expected_order(purchase_orders, descending):
+    # NULL dates sort first ascending and last descending, like MySQL and SQLite
+    def key(purchase_order):
+        return (purchase_order.added_date is not None, purchase_order.added_date or date.min, purchase_order.id)
+    return [purchase_order.id for purchase_order in sorted(purchase_orders, key=key, reverse=descending)]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_follow_the_date_order_with_nulls_and_ties(db, purchase_orders, descending):
+    ids, pages = all_pages(db, 2, sort="order_date", descending=descending)
+    assert ids == expected_order(purchase_orders, descending)
+    assert pages == 4
+
+
+def test_pages_by_po_number_with_filters(db, purchase_orders):
+    ids, _ = all_pages(db, 1, sort="po_number", date_from=date(2024, 1, 2))
+    assert ids == [purchase_orders[index].id for index in (0, 3, 4, 6)]
+
+    save_purchase_order(db, "OTHER-1", items=1)
+    ids, _ = all_pages(db, 3, sort="po_number", po_prefix="PO-")
+    assert len(ids) == len(purchase_orders)
+    rows, token = db.get_purchase_orders_page(10, po_prefix="PO_")  # _ is not a wildcard
+    assert rows == [] and token is None
+
+
+def test_invalid_sort_and_token_are_rejected(db):
+    with pytest.raises(ValueError):
+        db.get_purchase_orders_page(sort="total_amount")
+    with pytest.raises(ValueError):
+        db.get_purchase_orders_page(token="not a token")
+
+
+def test_item_pages(db, purchase_orders):
+    first = save_purchase_order(db, "PO-MANY", items=5)
+    ids, token = [], None
+    while True:
+        rows, token = db.get_items_page(first.id, page_size=2, token=token)
+        ids.extend(row["id"] for row in rows)
+        if token is None:
+            break
+    assert ids == [item.id for item in first.items]
+    rows, token = db.get_items_page(page_size=100)
+    assert len(rows) == len(purchase_orders) + 5 and token is None
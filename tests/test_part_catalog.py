@@ -0,0 +1,89 @@
+import pytest
+
+from POManager.part_catalog import PartCatalog, fold, within_one_edit
+from tests.conftest import save_purchase_order
+
+
+def catalog_of(*parts):
+    catalog = PartCatalog()
+    for part in parts:
+        if isinstance(part, tuple):
+            catalog.add(*part)
+        else:
+            catalog.add(part)
+    return catalog
+
+
+def test_fold_and_edit_distance():
+    assert fold(" ab-10o ") == fold("AB-1O0") == "A8-100"
+    assert within_one_edit("ABCDE", "ABXDE")
+    assert within_one_edit("ABCDE", "ABDE")
+    assert within_one_edit("ABCDE", "ABCDEF")
+    assert not within_one_edit("ABCDE", "AXCDY")
+
+
+def test_exact_and_ocr_confusion_matches():
+    catalog = catalog_of("AB-10023")
+    assert catalog.correct("ab-10023") == ("AB-10023", "exact")
+    assert catalog.correct("A8-1OO23") == ("AB-10023", "corrected")
+    assert catalog.correct("ZZ-99999") == ("ZZ-99999", "unknown")
+
+
+def test_one_edit_is_corrected_in_every_segment():
+    catalog = catalog_of("XY-123456")
+    for typo in ("XY-723456", "XY-123756", "XY-123457", "XY-12456", "XY-1233456"):
+        assert catalog.correct(typo) == ("XY-123456", "corrected"), typo
+
+
+def test_short_parts_are_not_fuzzy_matched():
+    catalog = catalog_of("AB12")
+    assert catalog.correct("AB13") == ("AB13", "unknown")
+
+
+def test_ties_are_broken_by_nomenclature_then_frequency():
+    catalog = catalog_of(("P-12340", "Brake pad"), ("P-12341", "Oil filter"))
+    assert catalog.correct("P-12348", "Oil filter") == ("P-12341", "corrected")
+    assert catalog.correct("P-12348") == ("P-12348", "ambiguous")
+    catalog.add("P-12340")
+    assert catalog.correct("P-12348") == ("P-12340", "corrected")
+
+
+def test_prefix_lookup():
+    catalog = catalog_of("B-2", "A-2", "A-1", "C-1")
+    assert catalog.starting_with("a-") == ["A-1", "A-2"]
+    assert catalog.starting_with("", limit=3) == ["A-1", "A-2", "B-2"]
+
+
+def test_refresh_loads_new_items_only(db):
+    save_purchase_order(db, "PO-1")
+    catalog = PartCatalog()
+    assert catalog.refresh(db, page_size=1) == 2
+    assert "po-1-p0" in catalog and catalog.nomenclature("PO-1-P1") == "Part 1"
+
+    assert catalog.refresh(db) == 0
+    save_purchase_order(db, "PO-2", items=1)
+    assert catalog.refresh(db) == 1
+    assert len(catalog) == 3
+    assert catalog.starting_with("PO-") == ["PO-1-P0", "PO-1-P1", "PO-2-P0"]
+
+
+def test_check_results_reach_the_extracted_items(monkeypatch):
+    pytest.importorskip("cv2")
+    pytest.importorskip("pytesseract")
+    from POManager.image_processor import ImageProcessor
+
+    text = ("Nomenclature\n"
+            "AB-10023 Brake pad USA NOS 2 10.50\n"
+            "A8-1OO24 Oil filter USA NOS 1 4.00\n"
+            "ZZ-99999 Gasket USA NOS 3 1.25\n"
+            "Total Amount:")
+    processor = ImageProcessor("scan.png", part_catalog=catalog_of(("AB-10023", "Brake pad"), ("AB-10024", "Oil filter")))
+    monkeypatch.setattr(processor, "process_image", lambda: text)
+    items = processor.process_and_extract_items("PO-1")
+
+    assert [(item.cart_part_no, item.part_status, item.ocr_cart_part_no) for item in items] == [
+        ("AB-10023", "exact", None),
+        ("AB-10024", "corrected", "A8-1OO24"),
+        ("ZZ-99999", "unknown", None),
+    ]
+    assert [item.needs_review() for item in items] == [False, True, True]
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+
+class ItemSource:
+    """Stands in for a DBHandler; get_items can be held until released."""
+
+    def __init__(self, hold=()):
+        self.calls = []
+        self.hold = set(hold)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def clone(self):
+        return self
+
+    def get_items(self, po_id):
+        self.calls.append(po_id)
+        if po_id in self.hold:
+            self.started.set()
+            self.release.wait(5)
+        return [f"item of {po_id}"]
+
+    def close_connection(self):
+        pass
+
+
+@pytest.fixture
+def prefetcher(qapp):
+    from POManager.po_prefetcher import PurchaseOrderPrefetcher
+
+    created = []
+
+    def build(source, **kwargs):
+        created.append(PurchaseOrderPrefetcher(source, **kwargs))
+        return created[-1]
+    yield build
+    for instance in created:
+        instance.shutdown()
+
+
+def prefetch(prefetcher, po_ids):
+    prefetcher.request(po_ids)
+    prefetcher.submit_pending()  # Skip the debounce timer
+
+
+def test_prefetched_items_are_taken_once(prefetcher):
+    source = ItemSource()
+    instance = prefetcher(source)
+    prefetch(instance, [1, 2])
+    assert instance.take(1) == ["item of 1"]
+    assert instance.take(2) == ["item of 2"]
+    assert instance.take(1) is None
+    assert source.calls == [1, 2]
+
+
+def test_newer_request_cancels_queued_loads(prefetcher):
+    source = ItemSource(hold={1})
+    instance = prefetcher(source)
+    prefetch(instance, [1, 2])
+    assert source.started.wait(5)
+    prefetch(instance, [3])  # 1 is already running; 2 is still queued
+    source.release.set()
+
+    assert instance.take(3) == ["item of 3"]
+    assert instance.take(1) == ["item of 1"]
+    assert instance.take(2) is None
+    assert source.calls == [1, 3]
+
+
+def test_invalidate_drops_a_load_in_progress(prefetcher):
+    source = ItemSource(hold={1})
+    instance = prefetcher(source)
+    prefetch(instance, [1])
+    assert source.started.wait(5)
+    instance.invalidate(1)
+    source.release.set()
+    assert instance.take(1) is None
+
+
+def test_cache_keeps_the_most_recent_pos(prefetcher):
+    instance = prefetcher(ItemSource(), max_cached=2)
+    for po_id in (1, 2, 3):
+        prefetch(instance, [po_id])
+        instance.executor.submit(lambda: None).result(5)  # Runs after the load on the single worker
+    assert list(instance.cache) == [2, 3]
+
+
+def test_selecting_a_row_prefetches_it_and_its_neighbours(qapp, db):
+    from POManager.purchase_order_app import PurchaseOrderApp
+    from tests.conftest import save_purchase_order
+
+    ids = [save_purchase_order(db, f"PO-{index}").id for index in range(6)]
+    window = PurchaseOrderApp(db, poll_interval=0)
+    try:
+        window.purchase_orders.load_items(window.purchase_orders.get_by_id(ids[1]))  # Not prefetched again
+        window.prefetch_around(2)
+        assert window.prefetcher.pending == [ids[2], ids[3], ids[4], ids[0]]
+    finally:
+        window.prefetcher.shutdown()
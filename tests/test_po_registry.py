@@ -0,0 +1,86 @@
+from POManager.item import Item
+from POManager.po_registry import PurchaseOrderRegistry
+from POManager.purchase_order import PurchaseOrder
+
+
+def header(po_id, po_number=None):
+    po = PurchaseOrder(po_number or f"PO-{po_id}")
+    po.id = po_id
+    return po
+
+
+def item_loader(counts, calls=None):
+    """Return an item loader giving each PO `counts[po.id]` items and recording the loads."""
+    def load(po):
+        if calls is not None:
+            calls.append(po.id)
+        return [Item(f"{po.po_number}-P{index}") for index in range(counts[po.id])]
+    return load
+
+
+def test_lookup_by_po_number_and_id():
+    registry = PurchaseOrderRegistry()
+    registry.add(header(1))
+    registry.add(header(2))
+    assert len(registry) == 2 and "PO-1" in registry
+    assert registry.get_by_id(2).po_number == "PO-2"
+
+    renamed = header(1, "PO-1A")  # Same id, new number
+    registry.add(renamed)
+    assert registry.get_by_id(1) is renamed
+    assert registry.get_by_po_number("PO-1") is None
+    assert registry.remove_by_id(2).po_number == "PO-2"
+    assert [po.po_number for po in registry] == ["PO-1A"]
+
+
+def test_items_are_loaded_once_and_evicted_least_recently_used_first():
+    calls = []
+    registry = PurchaseOrderRegistry(item_loader=item_loader({1: 3, 2: 3, 3: 3}, calls), max_loaded_items=6)
+    first, second, third = header(1), header(2), header(3)
+    for po in (first, second, third):
+        registry.add(po)
+
+    registry.load_items(first)
+    registry.load_items(second)
+    registry.load_items(first)  # Now the most recently used
+    assert calls == [1, 2]
+
+    registry.load_items(third)
+    assert registry.loaded_item_count == 6
+    assert not registry.is_loaded(second) and second.items == []
+    assert registry.is_loaded(first) and len(first.items) == 3
+
+    assert len(registry.load_items(second)) == 3  # Reloaded on demand
+    assert calls == [1, 2, 3, 2]
+    assert not registry.is_loaded(first)
+
+
+def test_a_po_larger_than_the_cap_stays_loaded():
+    registry = PurchaseOrderRegistry(item_loader=item_loader({1: 2, 2: 10}), max_loaded_items=5)
+    small, large = header(1), header(2)
+    registry.add(small)
+    registry.add(large)
+    registry.load_items(small)
+    registry.load_items(large)
+    assert registry.is_loaded(large) and not registry.is_loaded(small)
+
+
+def test_replacing_a_po_drops_its_loaded_items():
+    calls = []
+    registry = PurchaseOrderRegistry(item_loader=item_loader({1: 2}, calls))
+    registry.add(header(1))
+    registry.load_items(registry.get_by_id(1))
+    registry.add(header(1))  # E.g. a change poll brought a newer header
+    assert registry.loaded_item_count == 0
+    registry.load_items(registry.get_by_id(1))
+    assert calls == [1, 1]
+
+
+def test_a_po_added_with_items_counts_as_loaded():
+    registry = PurchaseOrderRegistry(item_loader=item_loader({1: 0}))
+    po = header(1)
+    po.add_item(Item("P-1"))
+    registry.add(po)
+    assert registry.is_loaded(po) and registry.loaded_item_count == 1
+    registry.clear()
+    assert len(registry) == 0 and registry.loaded_item_count == 0
@@ -0,0 +1,43 @@
+from datetime import date
+
+from POManager.item import Item
+from POManager.purchase_order import PurchaseOrder
+from tests.conftest import save_purchase_order
+
+
+def test_objects_are_built_from_tuple_rows():
+    item = Item.from_row((7, "P-1", "USA", "NOS", 2, 10.5, "Filter"))
+    assert (item.id, item.cart_part_no, item.qty, item.nomenclature, item.part_status) == (7, "P-1", 2, "Filter", None)
+
+    purchase_order = PurchaseOrder.from_row((3, "PO-1", date(2024, 1, 15), 5, 52.5))
+    assert (purchase_order.id, purchase_order.po_number, purchase_order.added_date) == (3, "PO-1", date(2024, 1, 15))
+    assert (purchase_order.items, purchase_order.archived, purchase_order.fulfilment_status) == ([], False, None)
+
+
+def test_statement_cursor_is_reused(db):
+    purchase_order = save_purchase_order(db, "PO-1")
+    first = db.fetch_rows("items_by_purchase_order_id", (purchase_order.id,))
+    cursor = db.statements["items_by_purchase_order_id"]
+    second = db.fetch_rows("items_by_purchase_order_id", (purchase_order.id,))
+
+    assert db.statements["items_by_purchase_order_id"] is cursor
+    assert first == second
+    assert [row[Item.ROW_COLUMNS.index("cart_part_no")] for row in first] == ["PO-1-P0", "PO-1-P1"]
+
+
+def test_failed_statement_is_prepared_again(db):
+    save_purchase_order(db, "PO-1")
+    db.execute_query("ALTER TABLE PurchaseOrder RENAME TO PurchaseOrderMoved")
+    assert db.fetch_rows("purchase_order_by_po_number", ("PO-1",)) is None
+    assert "purchase_order_by_po_number" not in db.statements
+
+    db.execute_query("ALTER TABLE PurchaseOrderMoved RENAME TO PurchaseOrder")
+    assert [row[1] for row in db.fetch_rows("purchase_order_by_po_number", ("PO-1",))] == ["PO-1"]
+
+
+def test_tuple_rows_match_the_dictionary_rows(db):
+    purchase_order = save_purchase_order(db, "PO-1", items=3)
+    by_dict = db.get_items_by_purchase_order_id(purchase_order.id)
+    by_tuple = db.get_items(purchase_order.id)
+    assert [{column: getattr(item, column) for column in Item.ROW_COLUMNS} for item in by_tuple] == \
+        [{column: row[column] for column in Item.ROW_COLUMNS} for row in by_dict]
@@ -0,0 +1,169 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import save_purchase_order
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(qapp, db, monkeypatch):
+    """Build a PurchaseOrderApp on the db fixture; message boxes are answered without showing them."""
+    from POManager import purchase_order_app
+
+    shown = []
+    for name in ("information", "warning", "critical"):
+        monkeypatch.setattr(purchase_order_app.QMessageBox, name,
+                            staticmethod(lambda parent, title, text, *args, name=name: shown.append((name, title))))
+
+    def build(**kwargs):
+        window = purchase_order_app.PurchaseOrderApp(db, poll_interval=0, **kwargs)
+        window.shown = shown
+        return window
+    return build
+
+
+def table_po_numbers(window):
+    return [window.tree.item(row, 1).text() for row in range(window.tree.rowCount())]
+
+
+def test_loader_page_does_not_duplicate_a_po_added_by_a_poll(qapp, db, app):
+    for index in range(3):
+        save_purchase_order(db, f"PO-{index}")
+    window = app(fast_start=True, page_size=1)
+    window.loader.wait()  # The pages of PO-1 and PO-2 are read but not delivered yet
+
+    clerk = db.clone()
+    po = clerk.get_purchase_order_by_po_number("PO-2", target="primary")
+    po.total_qty = 99
+    clerk.update_purchase_order(po)
+    clerk.close_connection()
+    window.refresh_changes()
+    qapp.processEvents()
+
+    assert table_po_numbers(window) == ["PO-0", "PO-2", "PO-1"]
+    assert window.purchase_orders.get_by_po_number("PO-2").total_qty == 99
+
+
+def test_loader_page_does_not_bring_back_a_deleted_po(qapp, db, app):
+    for index in range(3):
+        save_purchase_order(db, f"PO-{index}")
+    window = app(fast_start=True, page_size=1)
+    window.loader.wait()
+
+    clerk = db.clone()
+    clerk.delete_purchase_orders(["PO-2"])
+    clerk.close_connection()
+    window.refresh_changes()
+    qapp.processEvents()
+
+    assert table_po_numbers(window) == ["PO-0", "PO-1"]
+    assert "PO-2" not in window.purchase_orders
+
+
+def test_clearing_a_search_shows_every_po_again(qapp, db, app):
+    save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "OTHER-1")
+    window = app()
+
+    window.search_entry.setText("OTHER")
+    window.search_purchase_order()
+    assert table_po_numbers(window) == ["OTHER-1"]
+
+    save_purchase_order(db, "PO-2")
+    window.refresh_changes()
+    assert table_po_numbers(window) == ["OTHER-1"]  # Not a match, so not shown
+
+    window.search_entry.clear()
+    window.search_purchase_order()
+    assert not window.showing_search_results
+    assert table_po_numbers(window) == ["PO-1", "OTHER-1", "PO-2"]
+
+    save_purchase_order(db, "PO-3")
+    window.refresh_changes()
+    assert table_po_numbers(window)[-1] == "PO-3"
+
+
+def test_show_all_button_ends_the_search(qapp, db, app):
+    save_purchase_order(db, "PO-1")
+    window = app()
+    window.search_entry.setText("NONE")
+    window.search_purchase_order()
+    assert table_po_numbers(window) == []
+
+    window.show_all_button.click()
+    assert table_po_numbers(window) == ["PO-1"]
+    assert window.search_entry.text() == ""
+
+
+def test_edits_to_a_new_po_reach_the_database(qapp, db, app, monkeypatch):
+    from POManager.item import Item
+
+    window = app()
+
+    def save_in_editor(po_number, items, po, add):
+        # What ItemEditorDialog.save_items_and_po does for a new PO
+        po.items = items
+        db.add_purchase_order_items(po)
+        db.update_purchase_order(po)
+
+    monkeypatch.setattr(window, "open_edit_items_window", save_in_editor)
+    window.create_purchase_order_from_items("PO-1", [Item("P-1", "USA", "NOS", 2, 10, "Part")])
+
+    po = window.purchase_orders.get_by_po_number("PO-1")
+    items = window.purchase_orders.load_items(po)
+    assert [item.id for item in items] != [None]
+    items[0].qty = 5
+    db.update_purchase_order_items(po, items)
+    assert db.fetch_query("SELECT qty FROM Item") == [{"qty": 5}]
+
+
+def finished_ocr_job(db, po_number):
+    from POManager.item import Item
+
+    job_id = db.enqueue_ocr_image(po_number, f"{po_number}.png", b"image", requested_by="clerk")
+    db.claim_ocr_job("worker")
+    db.complete_ocr_job(job_id, "worker", [Item("P-1", "USA", "NOS", 2, 10, "Part")])
+    return job_id
+
+
+def test_queued_scan_is_collected_with_its_po(qapp, db, app, monkeypatch):
+    window = app()
+    monkeypatch.setattr(window, "open_edit_items_window", lambda *args: None)
+    job_id = finished_ocr_job(db, "PO-1")
+
+    db.execute_query("ALTER TABLE ChangeLog RENAME TO ChangeLogMoved")  # The save fails
+    window.ocr_jobs.add(job_id)
+    window.poll_ocr_jobs()
+    assert db.get_ocr_jobs([job_id])[0]["status"] == "done"  # Still there for the next start
+    assert not db.purchase_order_exists("PO-1")
+
+    db.execute_query("ALTER TABLE ChangeLogMoved RENAME TO ChangeLog")
+    window.ocr_jobs.add(job_id)
+    window.poll_ocr_jobs()
+    assert db.get_ocr_jobs([job_id])[0]["status"] == "collected"
+    assert db.purchase_order_exists("PO-1")
+
+
+def test_fast_start_shows_the_first_page_and_streams_the_rest(qapp, db, app):
+    for index in range(5):
+        save_purchase_order(db, f"PO-{index}")
+    window = app(fast_start=True, page_size=2)
+    assert table_po_numbers(window) == ["PO-0", "PO-1"]
+
+    window.loader.wait()
+    qapp.processEvents()
+    assert table_po_numbers(window) == [f"PO-{index}" for index in range(5)]
+    assert window.purchase_orders.loaded_item_count == 0  # Headers only
+
+
+def test_app_module_does_not_import_the_ocr_stack():
+    pytest.importorskip("PyQt5")
+    code = ("import sys, POManager.purchase_order_app; "
+            "print(sorted(name for name in ('cv2', 'pytesseract') if name in sys.modules))")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    output = subprocess.check_output([sys.executable, "-c", code], env=env, cwd=ROOT, text=True)
+    assert output.strip().splitlines()[-1] == "[]"
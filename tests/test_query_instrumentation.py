@@ -0,0 +1,54 @@
+import json
+
+from POManager.db_handler import DBHandler
+from POManager.query_instrumentation import QueryInstrumentation, fingerprint, track_action
+from POManager.storage_backends import create_backend
+from tests.conftest import save_purchase_order
+
+
+def test_fingerprint_groups_statements_by_shape():
+    assert fingerprint("select * from Item where id = 5") == fingerprint("SELECT * FROM Item  WHERE id = %s")
+    assert fingerprint("DELETE FROM Item WHERE id IN (1, 2, 3)") == fingerprint("delete from Item where id in (%s)")
+    assert fingerprint("SELECT 'a' -- comment") == "SELECT ?"
+
+
+def test_queries_are_recorded_per_fingerprint_action_and_target(sqlite_path, tmp_path):
+    slow_log = tmp_path / "slow.jsonl"
+    instrumentation = QueryInstrumentation(slow_query_threshold=0, slow_query_log=str(slow_log))
+    records = []
+    instrumentation.add_hook(records.append)
+    db_handler = DBHandler(backend=create_backend("sqlite", path=sqlite_path), instrumentation=instrumentation)
+    instrumentation.reset()
+    del records[:]
+    slow_log.unlink()
+    try:
+        with track_action(db_handler, "open_po"):
+            db_handler.fetch_query("SELECT id FROM PurchaseOrder WHERE po_number = %s", ("PO-1",))
+            db_handler.fetch_query("SELECT id FROM PurchaseOrder WHERE po_number = %s", ("PO-2",))
+        db_handler.execute_query("SELECT * FROM NoSuchTable")
+    finally:
+        db_handler.close_connection()
+
+    snapshot = instrumentation.snapshot()
+    stats = snapshot["queries"]["SELECT ID FROM PURCHASEORDER WHERE PO_NUMBER = ?"]
+    assert stats["count"] == 2 and stats["p95"] is not None
+    assert snapshot["actions"]["open_po"]["queries"] == 2
+    assert snapshot["targets"]["primary"]["errors"] == 1
+    assert [record["action"] for record in records] == ["open_po", "open_po", None]
+    assert records[0]["call_site"].startswith("test_query_instrumentation.py:")
+    assert len(slow_log.read_text().splitlines()) == 3
+    assert json.loads(slow_log.read_text().splitlines()[-1])["error"]
+
+
+def test_reset_inside_a_running_action(db):
+    db.instrumentation = QueryInstrumentation()
+    with track_action(db, "import"):
+        db.instrumentation.reset()
+        save_purchase_order(db, "PO-1")  # Used to raise KeyError from record()
+    assert db.instrumentation.snapshot()["actions"]["import"]["queries"] > 0
+
+
+def test_track_action_without_instrumentation(db):
+    db.instrumentation = None
+    with track_action(db, "open_po"):
+        assert db.fetch_query("SELECT 1 AS one") == [{"one": 1}]
@@ -0,0 +1,60 @@
+import time
+
+from POManager.db_handler import DBHandler
+from POManager.storage_backends import create_backend
+from tests.conftest import save_purchase_order
+
+
+def make_handler(tmp_path, window=5.0):
+    # Two separate files stand in for a replica that has not caught up with the primary
+    DBHandler(backend=create_backend("sqlite", path=str(tmp_path / "replica.sqlite3"))).close_connection()
+    return DBHandler(
+        backend=create_backend("sqlite", path=str(tmp_path / "primary.sqlite3")),
+        replica_backend=create_backend("sqlite", path=str(tmp_path / "replica.sqlite3")),
+        read_your_writes_window=window
+    )
+
+
+def test_reads_go_to_the_replica_without_recent_writes(tmp_path):
+    db_handler = make_handler(tmp_path, window=0.05)
+    try:
+        time.sleep(0.1)  # Setting up the schema counts as a write
+        assert db_handler.reader() is db_handler.replica
+        assert db_handler.reader("primary") is db_handler
+    finally:
+        db_handler.close_connection()
+
+
+def test_clones_read_their_own_writes(tmp_path):
+    db_handler = make_handler(tmp_path)
+    clone = db_handler.clone()
+    try:
+        save_purchase_order(db_handler, "PO-1")
+        # The clone did not write, but shares the write clock, so it reads from the primary
+        assert clone.get_purchase_order_by_po_number("PO-1") is not None
+        assert clone.get_purchase_order_by_po_number("PO-1", target="replica") is None
+
+        save_purchase_order(clone, "PO-2")
+        assert db_handler.search_purchase_orders("PO-2") != []
+    finally:
+        clone.close_connection()
+        db_handler.close_connection()
+
+
+def test_reads_return_to_the_replica_after_the_window(tmp_path):
+    db_handler = make_handler(tmp_path, window=0.05)
+    clone = db_handler.clone()
+    try:
+        save_purchase_order(db_handler, "PO-1")
+        time.sleep(0.1)
+        assert clone.reader() is clone.replica
+    finally:
+        clone.close_connection()
+        db_handler.close_connection()
+
+
+def test_search_escapes_wildcards(db):
+    save_purchase_order(db, "PO_1")
+    save_purchase_order(db, "POX1")
+    assert [row["po_number"] for row in db.search_purchase_orders("O_1", part_numbers=False)] == ["PO_1"]
+    assert [row["po_number"] for row in db.search_purchase_orders("X1-P0")] == ["POX1"]
@@ -0,0 +1,63 @@
+from datetime import date
+
+from POManager.query_instrumentation import QueryInstrumentation
+from POManager.reconciliation import reconcile
+from tests.conftest import make_purchase_order, save_purchase_order
+
+
+def fulfilment(db_handler):
+    rows = db_handler.fetch_query("SELECT po_number, fulfilment_status FROM PurchaseOrder ORDER BY id")
+    return {row["po_number"]: row["fulfilment_status"] for row in rows}
+
+
+def test_reconcile_sums_deliveries_per_item(db):
+    fulfilled = save_purchase_order(db, "PO-1")
+    partial = save_purchase_order(db, "PO-2")
+    save_purchase_order(db, "PO-3")
+    empty = make_purchase_order("PO-4", items=0)
+    empty.id = db.add_purchase_order(empty)
+    db.insert_delivery_tracking(fulfilled.items[0].id, "C-1", date(2024, 2, 1), 1, 0, 1)
+    db.insert_delivery_tracking(fulfilled.items[1].id, "C-1", date(2024, 2, 1), 3, 1, 2)
+    db.insert_delivery_tracking(partial.items[1].id, "C-2", date(2024, 2, 2), 1, 0, 1)
+
+    stats = reconcile(db, batch_size=3)
+    assert (stats["purchase_orders"], stats["items"], stats["batches"]) == (4, 6, 2)
+    assert fulfilment(db) == {"PO-1": "fulfilled", "PO-2": "partial", "PO-3": "open", "PO-4": "no_items"}
+
+    statuses = db.get_item_statuses(partial.id, target="primary")
+    first, second = (statuses[item.id] for item in partial.items)
+    assert (first["delivered_qty"], first["approved_qty"], first["remaining_qty"]) == (0, 0, 1)
+    assert (second["delivered_qty"], second["approved_qty"], second["remaining_qty"]) == (1, 1, 1)
+
+
+def test_reconcile_replaces_previous_statuses(db):
+    purchase_order = save_purchase_order(db, "PO-1", items=1)
+    reconcile(db)
+    db.insert_delivery_tracking(purchase_order.items[0].id, "C-1", date(2024, 2, 1), 1, 0, 1)
+    reconcile(db)
+    rows = db.fetch_query("SELECT * FROM ItemStatus")
+    assert len(rows) == 1 and rows[0]["remaining_qty"] == 0
+    assert fulfilment(db) == {"PO-1": "fulfilled"}
+
+
+def test_reconcile_statements_are_instrumented(db):
+    save_purchase_order(db, "PO-1")
+    records = []
+    db.instrumentation = QueryInstrumentation()
+    db.instrumentation.add_hook(records.append)
+    reconcile(db)
+    writes = [record["fingerprint"].split()[0] for record in records
+              if "ITEMSTATUS" in record["fingerprint"] and not record["fingerprint"].startswith("SELECT")]
+    assert writes == ["DELETE", "INSERT", "UPDATE"]
+
+
+def test_archive_keeps_reconciled_state(db):
+    purchase_order = save_purchase_order(db, "PO-1", items=1)
+    db.insert_delivery_tracking(purchase_order.items[0].id, "C-1", date(2024, 2, 1), 2, 1, 1)
+    reconcile(db)
+    assert db.archive_purchase_orders([purchase_order.id]) == 1
+
+    [po_row] = db.fetch_query("SELECT fulfilment_status, reconciled_at FROM PurchaseOrderArchive")
+    assert po_row["fulfilment_status"] == "fulfilled" and po_row["reconciled_at"] is not None
+    [status_row] = db.fetch_query("SELECT delivered_qty, approved_qty, rejected_qty, remaining_qty FROM ItemStatusArchive")
+    assert status_row == {"delivered_qty": 2, "approved_qty": 1, "rejected_qty": 1, "remaining_qty": 0}
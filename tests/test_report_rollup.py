@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+
+from POManager.query_instrumentation import QueryInstrumentation
+from tests.conftest import save_purchase_order
+
+
+def rollup_rows(db_handler):
+    rows = db_handler.fetch_query("SELECT * FROM ReportRollup ORDER BY day, country_of_origin, a_unit")
+    return [{key: (float(value) if isinstance(value, Decimal) else value) for key, value in row.items()} for row in rows]
+
+
+def check_rollup_after_writes(db_handler):
+    purchase_order = save_purchase_order(db_handler, "PO-1")
+    [row] = db_handler.fetch_query("SELECT * FROM ReportRollup")
+    assert row["item_count"] == 2
+    assert row["total_qty"] == 3
+    assert float(row["spend"]) == 1 * 10 + 2 * 11
+
+    db_handler.insert_delivery_tracking(purchase_order.items[0].id, "C-1", date(2024, 2, 1), 1, 0, 1)
+    [row] = db_handler.fetch_query("SELECT * FROM ReportRollup")
+    assert row["delivered_qty"] == 1
+    assert row["approved_qty"] == 1
+
+    db_handler.update_purchase_order_dates(["PO-1"], date(2024, 3, 1))
+    [row] = db_handler.fetch_query("SELECT * FROM ReportRollup")
+    assert str(row["day"]) == "2024-03-01"
+
+    db_handler.delete_purchase_orders(["PO-1"])
+    assert db_handler.fetch_query("SELECT * FROM ReportRollup") == []
+
+
+def test_rollup_follows_writes(db):
+    check_rollup_after_writes(db)
+
+
+def test_rollup_follows_writes_on_mysql(mysql_db):
+    check_rollup_after_writes(mysql_db)
+
+
+def test_incremental_rollup_matches_rebuild(db):
+    first = save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2", items=3, order_date=date(2024, 1, 16))
+    db.insert_delivery_tracking(first.items[1].id, "C-1", date(2024, 2, 1), 2, 0, 2)
+    first.items[0].qty = 7
+    db.update_purchase_order_items(first, [first.items[0]])
+
+    incremental = rollup_rows(db)
+    db.rebuild_report_rollup()
+    assert rollup_rows(db) == incremental
+
+
+def test_rollup_statements_are_not_batched(db):
+    # mysql.connector rewrites executemany INSERTs into a VALUES list, which breaks the rollup upsert
+    records = []
+    db.instrumentation = QueryInstrumentation()
+    db.instrumentation.add_hook(records.append)
+    save_purchase_order(db, "PO-1")
+    db.rebuild_report_rollup()
+    rollup_writes = [record for record in records if "REPORTROLLUP" in record["fingerprint"]]
+    assert rollup_writes
+    assert all(record.get("batch_size") is None for record in rollup_writes)
+
+
+def test_report_groups_by_dimension(db):
+    save_purchase_order(db, "PO-1")
+    save_purchase_order(db, "PO-2", order_date=date(2024, 2, 1))
+    rows = db.get_report_rollup("country_of_origin", start=date(2024, 1, 1), end=date(2024, 2, 1))
+    assert [(row["dimension"], int(row["item_count"])) for row in rows] == [("USA", 2)]
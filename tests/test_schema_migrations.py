@@ -0,0 +1,97 @@
+from POManager import db_handler as db_module
+from POManager.db_handler import DBHandler
+from POManager.storage_backends import create_backend
+
+
+def columns(db_handler, table):
+    cursor = db_handler.connection.cursor()
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    return {description[0] for description in cursor.description}
+
+
+def test_fresh_database_gets_every_migration(db):
+    assert db.get_schema_version() == db_module.SCHEMA_VERSION
+    assert db.schema_is_current()
+    assert {"delivered_qty", "reconciled_at"} <= columns(db, "ItemStatus")
+    assert {"fulfilment_status", "reconciled_at"} <= columns(db, "PurchaseOrderArchive")
+    assert "table_hash" in columns(db, "ImageHash")
+    # Every archive table can hold what ARCHIVE_TABLES copies into it
+    for archive_table, copied in db_module.ARCHIVE_TABLES.values():
+        assert {column.strip() for column in copied.split(",")} <= columns(db, archive_table)
+
+
+def test_old_database_is_upgraded_in_place(sqlite_path, monkeypatch):
+    old_migrations = [migration for migration in db_module.SCHEMA_MIGRATIONS if migration[0] <= 5]
+    monkeypatch.setattr(db_module, "SCHEMA_MIGRATIONS", old_migrations)
+    monkeypatch.setattr(db_module, "SCHEMA_VERSION", 5)
+    old = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    # The current write paths need the current schema, so the old rows are written directly
+    old.execute_query("INSERT INTO PurchaseOrder (po_number, order_date, total_qty, total_amount) "
+                      "VALUES ('PO-1', '2024-01-15', 3, 32)")
+    for part, qty in (("P-0", 1), ("P-1", 2)):
+        old.execute_query("INSERT INTO Item (purchase_order_id, cart_part_no, country_of_origin, a_unit, qty, "
+                          "rate_include_gst) VALUES (1, %s, 'USA', 'NOS', %s, 10)", (part, qty))
+    assert "table_hash" not in columns(old, "ImageHash")
+    old.close_connection()
+
+    monkeypatch.undo()
+    upgraded = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    try:
+        assert upgraded.get_schema_version() == db_module.SCHEMA_VERSION
+        assert "table_hash" in columns(upgraded, "ImageHash")
+        # Migration 6 backfills the rollup from the rows written before it existed
+        [row] = upgraded.fetch_query("SELECT item_count FROM ReportRollup")
+        assert row["item_count"] == 2
+        assert upgraded.get_purchase_order_by_po_number("PO-1").items
+    finally:
+        upgraded.close_connection()
+
+
+def test_current_database_skips_the_ddl(db, sqlite_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(DBHandler, "create_tables_if_not_exists", lambda self: calls.append(self))
+    DBHandler(backend=create_backend("sqlite", path=sqlite_path)).close_connection()
+    assert calls == []
+
+
+def test_failed_migration_is_not_recorded_and_is_retried(db, sqlite_path, monkeypatch):
+    broken = (db_module.SCHEMA_VERSION + 1, [
+        "CREATE INDEX idx_item_nomenclature ON Item (nomenclature)",
+        "ALTER TABLE NoSuchTable ADD COLUMN note TEXT",
+    ])
+    monkeypatch.setattr(db_module, "SCHEMA_MIGRATIONS", db_module.SCHEMA_MIGRATIONS + [broken])
+    monkeypatch.setattr(db_module, "SCHEMA_VERSION", broken[0])
+    failed = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    assert failed.connection is None
+    assert db.get_schema_version() == broken[0] - 1
+
+    fixed = (broken[0], [broken[1][0], "ALTER TABLE Item ADD COLUMN note TEXT"])
+    monkeypatch.setattr(db_module, "SCHEMA_MIGRATIONS", db_module.SCHEMA_MIGRATIONS[:-1] + [fixed])
+    retried = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    try:
+        assert retried.get_schema_version() == fixed[0]
+        assert "note" in columns(retried, "Item")
+    finally:
+        retried.close_connection()
+
+
+def test_interrupted_migration_runs_again(db, sqlite_path):
+    # Migration 9 added its columns, but the version was not stored
+    db.set_schema_version(8)
+    again = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    try:
+        assert again.connection is not None
+        assert again.get_schema_version() == db_module.SCHEMA_VERSION
+    finally:
+        again.close_connection()
+
+
+def test_current_database_skips_the_ddl(db, sqlite_path, monkeypatch):
+    statements = []
+    monkeypatch.setattr(DBHandler, "execute_ddl", lambda self, statement: statements.append(statement))
+    reopened = DBHandler(backend=create_backend("sqlite", path=sqlite_path))
+    try:
+        assert reopened.connection is not None
+        assert statements == []
+    finally:
+        reopened.close_connection()
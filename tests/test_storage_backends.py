@@ -0,0 +1,73 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from POManager.storage_backends import SQLiteBackend, create_backend, to_sqlite_placeholders
+
+
+def test_ddl_is_translated_for_sqlite():
+    backend = SQLiteBackend(":memory:")
+    assert backend.translate_ddl("CREATE TABLE T (id INT AUTO_INCREMENT PRIMARY KEY, n INT)") == \
+        "CREATE TABLE T (id INTEGER PRIMARY KEY AUTOINCREMENT, n INT)"
+    assert backend.translate_ddl("CREATE INDEX idx_t_n ON T (n)") == "CREATE INDEX IF NOT EXISTS idx_t_n ON T (n)"
+    assert backend.translate_ddl("CREATE INDEX IF NOT EXISTS idx ON T (n)") == "CREATE INDEX IF NOT EXISTS idx ON T (n)"
+    assert to_sqlite_placeholders("SELECT * FROM T WHERE a = %s AND b = %s") == "SELECT * FROM T WHERE a = ? AND b = ?"
+
+
+def test_sqlite_returns_the_types_mysql_connector_does(tmp_path):
+    connection = SQLiteBackend(str(tmp_path / "types.sqlite3")).connect()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("CREATE TABLE T (d DATE, ts TIMESTAMP, amount DECIMAL(10, 2))")
+    cursor.execute("INSERT INTO T VALUES (%s, %s, %s)", (date(2024, 1, 15), datetime(2024, 1, 15, 9, 30), Decimal("12.50")))
+    connection.commit()
+    cursor.execute("SELECT d, ts, amount FROM T")
+    assert cursor.fetchall() == [{"d": date(2024, 1, 15), "ts": datetime(2024, 1, 15, 9, 30), "amount": Decimal("12.50")}]
+    connection.close()
+    assert not connection.is_connected()
+
+
+def test_sqlite_connection_applies_its_pragmas(tmp_path):
+    connection = SQLiteBackend(str(tmp_path / "pragmas.sqlite3"), pragmas={"cache_size": "-1024"}).connect()
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()[0] == "wal"
+    cursor.execute("PRAGMA cache_size")
+    assert cursor.fetchone()[0] == -1024
+    connection.close()
+
+
+def test_sqlite_accumulate_clause_adds_onto_the_existing_row(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "upsert.sqlite3"))
+    connection = backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE T (k TEXT PRIMARY KEY, n INT, m INT)")
+    query = "INSERT INTO T (k, n, m) VALUES (%s, %s, %s)" + backend.accumulate_clause(["k"], ["n", "m"])
+    cursor.execute(query, ("a", 1, 10))
+    cursor.execute(query, ("a", 2, -3))
+    cursor.execute("SELECT k, n, m FROM T")
+    assert cursor.fetchall() == [("a", 3, 7)]
+    connection.close()
+
+
+def test_duplicate_object_errors_are_recognised():
+    backend = SQLiteBackend(":memory:")
+    assert backend.is_duplicate_object_error(Exception("table Item already exists"))
+    assert backend.is_duplicate_object_error(Exception("duplicate column name: note"))
+    assert not backend.is_duplicate_object_error(Exception("no such table: Item"))
+
+
+def test_create_backend_rejects_unknown_names():
+    assert create_backend("sqlite", path="po.sqlite3").describe() == "SQLite database po.sqlite3"
+    with pytest.raises(ValueError):
+        create_backend("postgres")
+
+
+def test_db_handler_runs_on_sqlite(db):
+    from tests.conftest import save_purchase_order
+
+    purchase_order = save_purchase_order(db, "PO-1")
+    assert purchase_order.id == 1
+    loaded = db.get_purchase_order_by_po_number("PO-1", target="primary")
+    assert (loaded.po_number, loaded.added_date, loaded.total_amount) == ("PO-1", date(2024, 1, 15), Decimal("32"))
+    assert [item.cart_part_no for item in loaded.items] == ["PO-1-P0", "PO-1-P1"]
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+
+from tests.conftest import make_purchase_order, save_purchase_order
+
+
+@pytest.fixture
+def commits(db, monkeypatch):
+    """Count the commits made on the db fixture's connection."""
+    counter = []
+    commit = db.connection.commit
+    monkeypatch.setattr(db.connection, "commit", lambda: (counter.append(1), commit())[1])
+    return counter
+
+
+def test_po_writes_commit_once_with_their_change_log_entries(db, commits):
+    purchase_order = make_purchase_order("PO-1")
+    purchase_order.id = db.add_purchase_order(purchase_order)
+    db.add_purchase_order_items(purchase_order)
+    assert len(commits) == 2
+
+    purchase_order.items = db.get_items(purchase_order.id, target="primary")
+    purchase_order.total_qty = 10
+    db.update_purchase_order(purchase_order)
+    db.update_purchase_order_items(purchase_order, purchase_order.items[:1])
+    db.insert_purchase_order("PO-2", date(2024, 2, 1), 0, 0)
+    assert len(commits) == 5
+
+
+def test_write_rolls_back_when_its_change_log_entry_fails(db):
+    purchase_order = save_purchase_order(db, "PO-1")
+    db.execute_query("ALTER TABLE ChangeLog RENAME TO ChangeLogMoved")
+
+    purchase_order.total_qty = 99
+    with pytest.raises(Exception):
+        db.update_purchase_order(purchase_order)
+    with pytest.raises(Exception):
+        db.add_purchase_order(make_purchase_order("PO-2"))
+    with pytest.raises(Exception):
+        db.insert_purchase_order("PO-3", date(2024, 2, 1), 0, 0)
+
+    rows = db.fetch_query("SELECT po_number, total_qty FROM PurchaseOrder")
+    assert rows == [{"po_number": "PO-1", "total_qty": 3}]
+
+
+def test_delivery_and_its_rollup_adjustment_commit_together(db, commits):
+    purchase_order = save_purchase_order(db, "PO-1")
+    commits.clear()
+    db.insert_delivery_tracking(purchase_order.items[0].id, "C-1", date(2024, 2, 1), 1, 0, 1)
+    assert len(commits) == 1
+
+    db.execute_query("ALTER TABLE ReportRollup RENAME TO ReportRollupMoved")
+    with pytest.raises(Exception):
+        db.insert_delivery_tracking(purchase_order.items[0].id, "C-2", date(2024, 2, 2), 1, 0, 1)
+    db.execute_query("ALTER TABLE ReportRollupMoved RENAME TO ReportRollup")
+    assert [row["challan_no"] for row in db.fetch_query("SELECT challan_no FROM DeliveryTracking")] == ["C-1"]